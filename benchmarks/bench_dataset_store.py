@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Compare JSON vs columnar (npy) load time and peak RSS for the universe dataset.
+
+Usage: python benchmarks/bench_dataset_store.py [--rows 1000 10000 100000]
+
+Each load runs in a fresh interpreter so RSS numbers aren't polluted by earlier cases.
+"""
+import argparse
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+import dataset_store  # noqa: E402
+
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {scripts!r})
+import dataset_store
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t = time.perf_counter()
+if {mode!r} == "records":
+    n = len(dataset_store.load_records({path!r}))
+else:
+    cols, _ = dataset_store.load_columns({path!r}, columns=["symbol", "price", "marketCap"])
+    n = len(cols["price"]); float(cols["price"].sum())
+elapsed = time.perf_counter() - t
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"rows": n, "seconds": elapsed, "rss_kb": peak - base}}))
+"""
+
+
+def synthetic_stocks(n):
+    rng = random.Random(n)
+    rows = []
+    for i in range(n):
+        sym = "".join(rng.choices(string.ascii_uppercase, k=4)) + str(i)
+        rows.append({
+            "symbol": sym,
+            "name": f"{sym} Holdings Inc.",
+            "market": "stocks",
+            "price": round(rng.uniform(1, 500), 2) if rng.random() > 0.05 else None,
+            "marketCap": rng.randint(10**7, 10**12) if rng.random() > 0.3 else None,
+        })
+    return rows
+
+
+def run_child(path, mode):
+    out = subprocess.run([sys.executable, "-c", CHILD.format(scripts=SCRIPTS_DIR, path=path, mode=mode)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", nargs="+", type=int, default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'format':<16} {'write s':>9} {'load s':>9} {'load RSS MB':>12} {'disk MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            rows = synthetic_stocks(n)
+            for fmt in ("json", "npy"):
+                path = os.path.join(tmp, f"stocks_{n}_{fmt}.json")
+                t = time.perf_counter()
+                dataset_store.save(path, rows, formats=[fmt])
+                write_s = time.perf_counter() - t
+                if fmt == "json":
+                    disk = os.path.getsize(path)
+                else:
+                    d = dataset_store.columnar_dir(path)
+                    disk = sum(os.path.getsize(os.path.join(d, f)) for f in os.listdir(d))
+                modes = ["records"] if fmt == "json" else ["records", "columns"]
+                for mode in modes:
+                    r = run_child(path, mode)
+                    label = fmt if mode == "records" else f"{fmt} (mmap cols)"
+                    print(f"{n:>8} {label:<16} {write_s:>9.3f} {r['seconds']:>9.3f} "
+                          f"{r['rss_kb'] / 1024:>12.1f} {disk / 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
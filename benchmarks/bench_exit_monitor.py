@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Exit monitor throughput: replayed ticks per second against a few hundred positions.
+
+Usage: python benchmarks/bench_exit_monitor.py [--positions 300] [--ticks 200000]
+                                               [--trailing 0.03] [--check] [--json report.json]
+
+Opens `--positions` MockBroker positions, writes a random-walk tick file (NDJSON
+{"symbol", "price", "ts"}, one symbol per tick) to a scratch directory, and
+replays it through scripts/exit_monitor.py with exits sent via the
+ExecutionEngine. Reports ticks/s, exits by reason and the sell orders the mock
+filled. `--check` recomputes every position's first crossing by brute force
+and fails if the monitor's exits differ.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import replace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+
+from broker_mock import MockBroker, MockPosition  # noqa: E402
+from execution import ExecutionEngine  # noqa: E402
+from exit_monitor import ExitMonitor, replay_source  # noqa: E402
+from policy_engine import DEFAULT_PARAMS  # noqa: E402
+
+
+def write_ticks(path, symbols, n, rng, vol=0.002):
+    """n ticks of a per-symbol random walk starting at each symbol's entry price."""
+    prices = dict(symbols)
+    names = list(prices)
+    now = time.time()
+    with open(path, "w") as f:
+        for i in range(n):
+            s = rng.choice(names)
+            prices[s] *= 1 + rng.gauss(0, vol)
+            f.write(json.dumps({"symbol": s, "price": round(prices[s], 4), "ts": now + i / 1000}) + "\n")
+
+
+def expected_exits(path, entries, params):
+    """First tick crossing each position's stop / target / trailing stop, by brute force."""
+    high = dict(entries)
+    exits = {}
+    for i, tick in enumerate(replay_source(path, 1)):
+        s, price = tick[0]["symbol"], tick[0]["price"]
+        if s in exits:
+            continue
+        high[s] = max(high[s], price)
+        stop = entries[s] * (1 - params.stop_loss_pct) if params.stop_loss_pct > 0 else 0.0
+        if params.trailing_stop_pct > 0:
+            stop = max(stop, high[s] * (1 - params.trailing_stop_pct))
+        target = entries[s] * (1 + params.take_profit_pct) if params.take_profit_pct > 0 else float("inf")
+        if price <= stop or price >= target:
+            exits[s] = i
+    return exits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=300)
+    parser.add_argument("--ticks", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--trailing", type=float, default=0.03, help="trailing stop pct (0 = off)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--check", action="store_true", help="verify exits against a brute-force replay")
+    parser.add_argument("--json", help="also write the report here")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    params = replace(DEFAULT_PARAMS, trailing_stop_pct=args.trailing)
+    entries = {f"SYM{i:04d}": round(rng.uniform(5, 500), 2) for i in range(args.positions)}
+    broker = MockBroker(cash=0)
+    broker.positions = {s: MockPosition(s, 10.0, price) for s, price in entries.items()}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "ticks.ndjson")
+        write_ticks(path, entries, args.ticks, rng)
+        engine = ExecutionEngine(broker)
+        monitor = ExitMonitor(broker, engine, params=params, resync_seconds=float("inf"))
+        if args.check:
+            monitor.index.trail_step = 0  # index every trailing rise, so exits match tick for tick
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            monitor.run(replay_source(path, args.batch))
+            elapsed = time.perf_counter() - started
+            monitor.close()
+            engine.close()
+        reasons = Counter(o.reason.split()[0] for o in monitor.exits)
+        sells = sum(1 for o in broker.orders if o["side"] == "sell" and o["status"] == "filled")
+        report = {"positions": args.positions, "ticks": monitor.ticks, "seconds": round(elapsed, 3),
+                  "ticks_per_second": round(monitor.ticks / elapsed), "exits": len(monitor.exits),
+                  "by_reason": dict(reasons), "sells_filled": sells, "still_guarded": len(monitor.index)}
+        if args.check:
+            expected = expected_exits(path, entries, params)
+            got = {o.symbol for o in monitor.exits}
+            report["check"] = "ok" if got == set(expected) else f"mismatch: {sorted(got ^ set(expected))[:10]}"
+
+    print(f"👀 {report['ticks']:,} ticks / {report['positions']} positions in {report['seconds']:.2f}s "
+          f"→ {report['ticks_per_second']:,} ticks/s")
+    print(f"🔻 {report['exits']} exits {report['by_reason']}, {report['sells_filled']} sells filled, "
+          f"{report['still_guarded']} still guarded")
+    if "check" in report:
+        print(f"{'✅' if report['check'] == 'ok' else '❌'} brute-force check: {report['check']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Wrote {args.json}")
+    if report.get("check", "ok") != "ok":
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
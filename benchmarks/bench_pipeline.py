@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""End-to-end pipeline benchmark against local fake services (no network, no keys).
+
+Usage: python benchmarks/bench_pipeline.py [--symbols 1000 10000 100000] [--latency-ms 20]
+                                           [--rates polygon=50,coingecko=5] [--json report.json]
+
+For each universe size: start benchmarks/fake_services.py (Polygon, CoinGecko,
+Dexscreener, OpenAI, Alpaca), run the rank_and_trade pipeline (update -> rank ->
+merge -> trade, via scripts/pipeline.py) in a scratch directory with every script
+pointed at the fakes, then report per stage: wall time, items/s, and p50/p95/p99
+of every timed span (one http.get span per request, per service) from the stage's
+metrics file, plus 429s seen and the requests each fake served.
+
+Stages whose client library isn't installed here fail (rank_whales needs openai)
+or fall back (trade runs as a MockBroker dry run without alpaca_trade_api); the
+report says which.
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import dataset_store  # noqa: E402
+import pipeline  # noqa: E402
+from fake_services import SERVICES, FakeServices, parse_rates  # noqa: E402
+
+# What a stage's throughput is counted in: the records of these files (after the run)
+STAGE_ITEMS = {
+    "universe": ("data/stocks.json",),
+    "crypto": ("data/crypto.json",),
+    "whales": ("data/whales.json",),
+    "rank_whales": ("data/whales.json",),
+    "rank": ("data/stocks.json",),
+    "merge": ("data/gpt_recommendations.json", "data/whale_recs.json"),
+    "trade": ("data/merged_recommendations.json",),
+}
+
+
+def count_records(path):
+    if not dataset_store.exists(path):
+        return 0
+    try:
+        return sum(1 for _ in dataset_store.iter_records(path))
+    except (ValueError, OSError):
+        return 0
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def read_metrics(directory, host_names):
+    """Span latencies and counters from every metrics file a stage wrote."""
+    spans, counters = defaultdict(list), defaultdict(float)
+    if not os.path.isdir(directory):
+        return spans, counters
+    for name in os.listdir(directory):
+        if not name.endswith(".jsonl"):
+            continue
+        with open(os.path.join(directory, name)) as f:
+            for line in f:
+                event = json.loads(line)
+                host = event.get("labels", {}).get("host")
+                label = f"{event.get('name')} {host_names.get(host, host)}" if host else event.get("name")
+                if event.get("type") == "span":
+                    spans[label].append(event["seconds"])
+                elif event.get("type") == "counter":
+                    counters[label] += event["value"]
+    return spans, counters
+
+
+def has_module(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def run_size(n, args, log):
+    notes = []
+    with FakeServices(symbols=n, coins=args.coins, trades=args.trades, latency_ms=args.latency_ms,
+                      jitter_ms=args.jitter_ms, rates=parse_rates(args.rates)) as fake, \
+            tempfile.TemporaryDirectory() as workdir:
+        os.symlink(os.path.abspath(SCRIPTS_DIR), os.path.join(workdir, "scripts"))
+        env = {
+            **fake.env(),
+            "METRICS": "true",
+            "METRICS_FORMAT": "jsonl",
+            "DRY_RUN": "false",
+            "QUOTE_PROVIDER": "polygon",
+            "UNIVERSE_LIMIT": "0",
+            "PRICING_MODE": "bulk",
+            "CRYPTO_PAGES": str(max(1, math.ceil(args.coins / 250))),
+            "EXEC_POLL_SECONDS": "0.2",
+        }
+        if not has_module("alpaca_trade_api"):
+            for key in ("ALPACA_API_KEY", "ALPACA_SECRET_KEY"):
+                env.pop(key)
+            env["DRY_RUN"] = "true"
+            notes.append("trade: alpaca_trade_api not installed, dry run against MockBroker")
+        if not has_module("openai"):
+            notes.append("rank_whales: openai not installed, stage fails (optional)")
+
+        stages = pipeline.rank_and_trade(args.top)
+        for stage in stages:
+            stage.env["METRICS_DIR"] = os.path.join(workdir, "metrics", stage.name)
+        runner = pipeline.Pipeline(stages, state_file=os.path.join(workdir, "data/cache/pipeline_state.json"))
+
+        saved_env, saved_cwd = dict(os.environ), os.getcwd()
+        os.environ.update(env)
+        os.chdir(workdir)
+        try:
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(log):
+                runner.run(force=True)
+            wall = time.perf_counter() - started
+
+            host_names = {fake.url(s).split("//", 1)[1]: s for s in SERVICES}
+            stage_reports = []
+            for stage in stages:
+                spans, counters = read_metrics(stage.env["METRICS_DIR"], host_names)
+                items = sum(count_records(p) for p in STAGE_ITEMS.get(stage.name, ()))
+                stage_reports.append({
+                    "stage": stage.name, "status": stage.status, "seconds": round(stage.seconds, 3),
+                    "items": items, "items_per_second": round(items / stage.seconds, 1) if stage.seconds else None,
+                    "http_429": int(sum(v for k, v in counters.items() if k.startswith("http_429"))),
+                    "spans": {name: {"count": len(v), "p50": percentile(v, 50), "p95": percentile(v, 95),
+                                     "p99": percentile(v, 99), "max": v[-1]}
+                              for name, v in ((k, sorted(v)) for k, v in sorted(spans.items()))},
+                })
+        finally:
+            os.chdir(saved_cwd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+        return {"symbols": n, "wall_seconds": round(wall, 3), "stages": stage_reports,
+                "services": fake.stats(), "notes": notes}
+
+
+def print_report(report):
+    print(f"\n=== {report['symbols']:,} symbols: pipeline wall {report['wall_seconds']:.2f}s ===")
+    print(f"{'stage':<12} {'status':<8} {'seconds':>8} {'items':>9} {'items/s':>10} {'429s':>6}")
+    for s in report["stages"]:
+        rate = f"{s['items_per_second']:,.0f}" if s["items_per_second"] is not None else "-"
+        print(f"{s['stage']:<12} {s['status']:<8} {s['seconds']:>8.2f} {s['items']:>9,} {rate:>10} {s['http_429']:>6}")
+    print(f"\n{'stage':<12} {'span':<38} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for s in report["stages"]:
+        for name, p in s["spans"].items():
+            print(f"{s['stage']:<12} {name[:38]:<38} {p['count']:>7} "
+                  f"{p['p50'] * 1000:>9.1f} {p['p95'] * 1000:>9.1f} {p['p99'] * 1000:>9.1f}")
+    served = ", ".join(f"{name}={st['requests']} ({st['throttled']} throttled)"
+                       for name, st in report["services"].items() if st["requests"])
+    print(f"\nrequests served: {served}")
+    for note in report["notes"]:
+        print(f"ℹ️ {note}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", nargs="+", type=int, default=[1_000, 10_000])
+    parser.add_argument("--coins", type=int, default=2_000)
+    parser.add_argument("--trades", type=int, default=500, help="synthetic whale trades on the fake Dexscreener")
+    parser.add_argument("--top", type=int, default=50, help="stocks kept by the rank stage")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--rates", default="", help='fake-side rate limits in requests/second, "polygon=50,..."')
+    parser.add_argument("--log", default=os.devnull, help="where the stages' own output goes")
+    parser.add_argument("--json", help="also write the reports here")
+    args = parser.parse_args()
+
+    reports = []
+    with open(args.log, "a") as log:
+        for n in args.symbols:
+            report = run_size(n, args, log)
+            print_report(report)
+            reports.append(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n✅ Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Cold-start time and peak RSS for each entry point, in a fresh interpreter per run.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--rows 5000] [--strict]
+
+Two modes per entry point:
+- import: `import <module>` only (what every invocation pays before doing anything)
+- run:    the script's main path on synthetic local data, offline: auto_trade as a
+          dry run (no Alpaca keys -> MockBroker), gpt_rank_stocks with fresh streamed
+          whale signals, merge_recommendations on two inputs. update_universe needs
+          the network, so it is import-only.
+
+"heavy" lists the slow optional libraries a run ended up loading (yfinance, pandas,
+alpaca_trade_api, requests); none of the run paths above should need them.
+--strict exits non-zero if one did, or if a median exceeds --max-seconds.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+import dataset_store  # noqa: E402
+
+HEAVY = ("yfinance", "pandas", "alpaca_trade_api", "requests")
+# Modules allowed to load requests: it is how they fetch
+NETWORK_ENTRY_POINTS = {"update_universe"}
+
+RUNS = {
+    "auto_trade": [],
+    "gpt_rank_stocks": ["--top", "50"],
+    "merge_recommendations": ["--inputs", "data/gpt_recommendations.json", "data/whale_recs.json",
+                              "--output", "data/merged_recommendations.json"],
+}
+ENTRY_POINTS = ("auto_trade", "gpt_rank_stocks", "update_universe", "merge_recommendations")
+
+CHILD = """
+import importlib, json, resource, runpy, sys, time
+t = time.perf_counter()
+sys.path.insert(0, {scripts!r})
+sys.argv = [{module!r}] + {args!r}
+if {mode!r} == "import":
+    importlib.import_module({module!r})
+else:
+    runpy.run_path({path!r}, run_name="__main__")
+elapsed = time.perf_counter() - t
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print("BENCH " + json.dumps({{"seconds": elapsed, "rss_kb": peak,
+                             "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def write_fixtures(workdir, rows):
+    """Universe, whale signals and two recommendation files under workdir/data."""
+    rng = random.Random(rows)
+    data = os.path.join(workdir, "data")
+    os.makedirs(data, exist_ok=True)
+    stocks = [{"symbol": f"S{i}", "name": f"S{i} Inc.", "market": "stocks",
+               "price": round(rng.uniform(1, 500), 2), "marketCap": rng.randint(10**7, 10**12)}
+              for i in range(rows)]
+    dataset_store.save(os.path.join(data, "stocks.json"), stocks)
+    with open(os.path.join(data, "whale_signals.json"), "w") as f:
+        json.dump({"updated_at": int(time.time()) + 86400,  # stays fresh for the whole benchmark
+                   "signals": {f"S{i}": {"signal": "whale_buy", "boost": 0.3} for i in range(0, rows, 50)}}, f)
+    for name in ("gpt_recommendations.json", "whale_recs.json"):
+        recs = [{"symbol": f"S{rng.randrange(rows)}", "price": round(rng.uniform(1, 500), 2),
+                 "score": round(rng.random(), 3), "reason": "synthetic"} for _ in range(min(rows, 200))]
+        dataset_store.save(os.path.join(data, name), recs, json_key="ranked")
+
+
+def run_child(module, mode, workdir):
+    args = RUNS.get(module, []) if mode == "run" else []
+    code = CHILD.format(scripts=os.path.abspath(SCRIPTS_DIR), module=module, args=args, mode=mode,
+                        path=os.path.join(os.path.abspath(SCRIPTS_DIR), f"{module}.py"), heavy=HEAVY)
+    env = {k: v for k, v in os.environ.items() if not k.startswith("ALPACA_")}
+    env.update(DRY_RUN="true", HTTP_OFFLINE="true", METRICS="false")
+    t = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - t
+    lines = [line for line in out.stdout.splitlines() if line.startswith("BENCH ")]
+    if out.returncode != 0 or not lines:
+        raise RuntimeError(f"{module} ({mode}) failed:\n{out.stdout[-2000:]}\n{out.stderr[-2000:]}")
+    return {"wall": wall, **json.loads(lines[-1][len("BENCH "):])}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entry-points", nargs="+", default=list(ENTRY_POINTS), choices=ENTRY_POINTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=5_000, help="synthetic universe size for run mode")
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="--strict budget per median wall time")
+    parser.add_argument("--strict", action="store_true", help="exit 1 on a heavy import or a blown budget")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        write_fixtures(workdir, args.rows)
+        baseline = statistics.median(run_child("json", "import", workdir)["wall"] for _ in range(args.repeat))
+        print(f"interpreter baseline: {baseline:.3f}s\n")
+        print(f"{'entry point':<24} {'mode':<7} {'wall s':>8} {'in-proc s':>10} {'peak RSS MB':>12}  heavy")
+        for module in args.entry_points:
+            for mode in ("import", "run") if module in RUNS else ("import",):
+                results = [run_child(module, mode, workdir) for _ in range(args.repeat)]
+                wall = statistics.median(r["wall"] for r in results)
+                inproc = statistics.median(r["seconds"] for r in results)
+                rss = max(r["rss_kb"] for r in results) / 1024
+                heavy = sorted({m for r in results for m in r["heavy"]})
+                print(f"{module:<24} {mode:<7} {wall:>8.3f} {inproc:>10.3f} {rss:>12.1f}  {','.join(heavy) or '-'}")
+                unexpected = [m for m in heavy if not (m == "requests" and module in NETWORK_ENTRY_POINTS)]
+                if unexpected:
+                    failures.append(f"{module} ({mode}) loaded {', '.join(unexpected)}")
+                if wall > args.max_seconds:
+                    failures.append(f"{module} ({mode}) took {wall:.2f}s > {args.max_seconds}s")
+
+    for failure in failures:
+        print(f"⚠️ {failure}")
+    if args.strict and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
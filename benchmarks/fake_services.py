@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Local stand-ins for the HTTP APIs the pipeline talks to, for offline benchmarks.
+
+One threaded HTTP server per service on 127.0.0.1 (so each is its own host to
+http_client's rate limits), serving a synthetic market of `symbols` stocks and
+`coins` crypto assets:
+
+- polygon:     /v3/reference/tickers (cursor paging), /v2/aggs/grouped/..., /v2/aggs/ticker/<T>/prev
+- coingecko:   /coins/markets
+- dexscreener: /latest/dex/search, /latest/dex/trades (scripts/whale/mock_whale.py trades)
+- openai:      /v1/chat/completions (scores every symbol found in the prompt)
+- alpaca:      /v2/account, /v2/positions[/<symbol>], /v2/orders, /v2/orders:by_client_order_id
+               (market orders fill at once at the synthetic price)
+
+Every request sleeps `latency_ms` (+ up to `jitter_ms`); with a `rate` (requests per
+second) a service answers 429 + Retry-After once its token bucket is empty.
+
+    with FakeServices(symbols=10_000, latency_ms=20, rates={"polygon": 50}) as fake:
+        env = fake.env()   # POLYGON_BASE_URL, COINGECKO_URL, ... pointing at the fakes
+
+`python benchmarks/fake_services.py --symbols 10000` serves until interrupted.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "whale"))
+
+from mock_whale import mock_trades  # noqa: E402
+from ratelimit import TokenBucket  # noqa: E402
+
+SERVICES = ("polygon", "coingecko", "dexscreener", "openai", "alpaca")
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def synthetic_tickers(n, prefix=""):
+    """n distinct upper-case tickers: A..Z, AA..ZZ, AAA.. (no separators, so canonical as-is)."""
+    out, width = [], 1
+    while len(out) < n:
+        for i in range(len(LETTERS) ** width):
+            if len(out) == n:
+                break
+            s, k = "", i
+            for _ in range(width):
+                k, r = divmod(k, len(LETTERS))
+                s = LETTERS[r] + s
+            out.append(prefix + s)
+        width += 1
+    return out
+
+
+class Market:
+    """The synthetic universe every fake serves from (deterministic for a seed)."""
+
+    def __init__(self, symbols=1_000, coins=2_000, trades=500, seed=0):
+        rng = random.Random(seed)
+        self.symbols = synthetic_tickers(symbols)
+        self.stocks = {s: {"price": round(rng.uniform(1, 500), 2),
+                           "market_cap": rng.randint(10**7, 10**12) if rng.random() > 0.2 else None,
+                           "open": None, "volume": rng.randint(10**3, 10**8)} for s in self.symbols}
+        for bar in self.stocks.values():
+            bar["open"] = round(bar["price"] * rng.uniform(0.95, 1.05), 2)
+        self.coins = synthetic_tickers(coins, prefix="X")
+        self.coin_caps = sorted((rng.randint(10**5, 10**12) for _ in self.coins), reverse=True)
+        # Whale flow touches both universes so rank_stocks finds signals to merge
+        self.trades = mock_trades(self.symbols[:200] + self.coins[:200], trades, rng=rng)
+        self.rng = rng
+
+    def price(self, symbol):
+        stock = self.stocks.get(symbol)
+        return stock["price"] if stock else None
+
+
+class Service:
+    """Routing, latency, rate limiting and request stats for one fake API."""
+
+    def __init__(self, name, market, latency_ms=0.0, jitter_ms=0.0, rate=None):
+        self.name = name
+        self.market = market
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.bucket = TokenBucket(rate) if rate else None
+        self.base_url = None
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.routes = defaultdict(int)
+        self.orders = {}      # alpaca: client_order_id -> order
+        self.positions = {}   # alpaca: symbol -> qty
+        self.cash = 1_000_000.0
+
+    def handle(self, method, path, query, body):
+        """-> (status, payload, headers)"""
+        with self.lock:
+            self.requests += 1
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        if self.bucket and not self.bucket.try_acquire():
+            with self.lock:
+                self.throttled += 1
+            return 429, {"error": "rate limited"}, {"Retry-After": f"{1 / self.bucket.rate:.3f}"}
+        route = getattr(self, f"route_{self.name}")
+        return route(method, path, query, body)
+
+    def count(self, route):
+        with self.lock:
+            self.routes[route] += 1
+
+    # ----- Polygon -----
+
+    def route_polygon(self, method, path, query, body):
+        m = self.market
+        if path == "/v3/reference/tickers":
+            self.count("tickers")
+            if query.get("active", "true") == "false":
+                return 200, {"results": [], "status": "OK"}, {}
+            limit, cursor = int(query.get("limit", 100)), int(query.get("cursor", 0))
+            page = m.symbols[cursor:cursor + limit]
+            rows = [{"ticker": s, "name": f"{s} Inc.", "market": "stocks", "active": True,
+                     "market_cap": m.stocks[s]["market_cap"], "last_updated_utc": "2024-01-01T00:00:00Z"}
+                    for s in page]
+            payload = {"results": rows, "status": "OK", "count": len(rows)}
+            if cursor + limit < len(m.symbols):
+                payload["next_url"] = f"{self.base_url}/v3/reference/tickers?cursor={cursor + limit}&limit={limit}"
+            return 200, payload, {}
+        if path.startswith("/v2/aggs/grouped/"):
+            self.count("grouped")
+            rows = [{"T": s, "o": b["open"], "h": max(b["open"], b["price"]), "l": min(b["open"], b["price"]),
+                     "c": b["price"], "v": b["volume"]} for s, b in m.stocks.items()]
+            return 200, {"results": rows, "resultsCount": len(rows), "status": "OK"}, {}
+        match = re.fullmatch(r"/v2/aggs/ticker/([^/]+)/prev", path)
+        if match:
+            self.count("prev")
+            price = m.price(match.group(1))
+            return 200, {"results": [{"c": price, "T": match.group(1)}] if price else []}, {}
+        return 404, {"error": f"no route {path}"}, {}
+
+    # ----- CoinGecko -----
+
+    def route_coingecko(self, method, path, query, body):
+        if path != "/coins/markets":
+            return 404, {"error": f"no route {path}"}, {}
+        self.count("markets")
+        m = self.market
+        per_page, page = int(query.get("per_page", 100)), int(query.get("page", 1))
+        start = (page - 1) * per_page
+        rows = [{"id": s.lower(), "symbol": s.lower(), "name": s, "market_cap_rank": i + 1,
+                 "current_price": round(cap / 10**9, 6), "market_cap": cap, "total_volume": cap // 20}
+                for i, (s, cap) in enumerate(zip(m.coins[start:start + per_page], m.coin_caps[start:start + per_page]),
+                                             start=start)]
+        return 200, rows, {}
+
+    # ----- Dexscreener -----
+
+    def route_dexscreener(self, method, path, query, body):
+        m = self.market
+        if path == "/latest/dex/trades":
+            self.count("trades")
+            return 200, {"trades": m.trades[:int(query.get("limit", 50))]}, {}
+        if path == "/latest/dex/search":
+            self.count("search")
+            totals = defaultdict(lambda: {"buys": 0, "sells": 0, "usd": 0.0})
+            for t in m.trades:
+                agg = totals[t["baseToken"]["symbol"]]
+                agg["buys" if t["type"] == "buy" else "sells"] += 1
+                agg["usd"] += t["amountUsd"]
+            pairs = [{"baseToken": {"symbol": s}, "txns": {"h24": {"buys": a["buys"], "sells": a["sells"]}},
+                      "volume": {"h24": a["usd"] * 20}} for s, a in totals.items()]
+            return 200, {"pairs": pairs}, {}
+        return 404, {"error": f"no route {path}"}, {}
+
+    # ----- OpenAI -----
+
+    def route_openai(self, method, path, query, body):
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"no route {path}"}}, {}
+        self.count("chat")
+        request = json.loads(body or b"{}")
+        prompt = " ".join(str(msg.get("content", "")) for msg in request.get("messages", []))
+        symbols = sorted(set(re.findall(r'"symbol":\s*"([^"]+)"', prompt)) - {"XXX"})
+        rng = random.Random(prompt)
+        answer = [{"symbol": s, "score": round(rng.uniform(0.3, 1.0), 2), "reason": "synthetic whale flow"}
+                  for s in symbols]
+        content = json.dumps(answer)
+        return 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }, {}
+
+    # ----- Alpaca -----
+
+    def _account(self):
+        return {"id": "fake", "status": "ACTIVE", "currency": "USD", "cash": f"{self.cash:.2f}",
+                "buying_power": f"{self.cash:.2f}", "equity": f"{self.cash:.2f}"}
+
+    def _position(self, symbol, qty):
+        price = self.market.price(symbol) or 0.0
+        return {"symbol": symbol, "qty": str(qty), "side": "long", "avg_entry_price": str(price),
+                "market_value": f"{qty * price:.2f}", "current_price": str(price)}
+
+    def route_alpaca(self, method, path, query, body):
+        if path == "/v2/account":
+            self.count("account")
+            return 200, self._account(), {}
+        if path == "/v2/positions":
+            self.count("positions")
+            with self.lock:
+                return 200, [self._position(s, q) for s, q in self.positions.items()], {}
+        if path.startswith("/v2/positions/"):
+            self.count("position")
+            symbol = path.rsplit("/", 1)[1]
+            with self.lock:
+                if symbol not in self.positions:
+                    return 404, {"code": 40410000, "message": "position does not exist"}, {}
+                return 200, self._position(symbol, self.positions[symbol]), {}
+        if path == "/v2/orders:by_client_order_id":
+            self.count("order_status")
+            order = self.orders.get(query.get("client_order_id"))
+            return (200, order, {}) if order else (404, {"code": 40410000, "message": "order not found"}, {})
+        if path == "/v2/orders" and method == "POST":
+            self.count("submit")
+            return self._submit(json.loads(body or b"{}"))
+        return 404, {"code": 40410000, "message": f"no route {path}"}, {}
+
+    def _submit(self, req):
+        symbol, side, qty = req.get("symbol"), req.get("side"), float(req.get("qty") or 0)
+        coid = req.get("client_order_id") or uuid.uuid4().hex
+        price = self.market.price(symbol)
+        with self.lock:
+            if coid in self.orders:
+                return 422, {"code": 40010001, "message": "client_order_id must be unique"}, {}
+            if price is None or qty <= 0:
+                return 422, {"code": 40010001, "message": f"invalid order for {symbol}"}, {}
+            held = self.positions.get(symbol, 0.0)
+            if side == "sell" and qty > held:
+                return 403, {"code": 40310000, "message": "insufficient qty available for order"}, {}
+            if side == "buy" and qty * price > self.cash:
+                return 403, {"code": 40310000, "message": "insufficient buying power"}, {}
+            self.positions[symbol] = held + (qty if side == "buy" else -qty)
+            if not self.positions[symbol]:
+                del self.positions[symbol]
+            self.cash += qty * price * (-1 if side == "buy" else 1)
+            now = datetime.now(timezone.utc).isoformat()
+            order = self.orders[coid] = {
+                "id": uuid.uuid4().hex, "client_order_id": coid, "symbol": symbol, "side": side,
+                "qty": str(qty), "type": req.get("type", "market"), "order_class": req.get("order_class", ""),
+                "status": "filled", "filled_qty": str(qty), "filled_avg_price": str(price),
+                "submitted_at": now, "filled_at": now,
+            }
+        return 200, order, {}
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "throttled": self.throttled, "routes": dict(self.routes)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs behind http_client's session
+
+    def _serve(self, method):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, payload, headers = self.server.service.handle(method, url.path, query, body)
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._serve("GET")
+
+    def do_POST(self):
+        self._serve("POST")
+
+    def do_DELETE(self):
+        self._serve("DELETE")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeServices:
+    def __init__(self, symbols=1_000, coins=2_000, trades=500, latency_ms=0.0, jitter_ms=0.0,
+                 rates=None, seed=0):
+        self.market = Market(symbols, coins, trades, seed)
+        rates = rates or {}
+        self.services = {name: Service(name, self.market, latency_ms, jitter_ms, rates.get(name))
+                         for name in SERVICES}
+        self._servers = []
+
+    def start(self):
+        for service in self.services.values():
+            server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+            server.daemon_threads = True
+            server.service = service
+            service.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            threading.Thread(target=server.serve_forever, name=f"fake-{service.name}", daemon=True).start()
+            self._servers.append(server)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def url(self, name):
+        return self.services[name].base_url
+
+    def env(self):
+        """Environment that points every script at the fakes (dummy keys, no client-side throttling)."""
+        hosts = [self.url(n).split("//", 1)[1] for n in SERVICES]
+        return {
+            "POLYGON_BASE_URL": self.url("polygon"),
+            "POLYGON_API_KEY": "fake",
+            "POLYGON_RATE_LIMIT": "600000",
+            "COINGECKO_URL": self.url("coingecko"),
+            "DEXSCREENER_URL": self.url("dexscreener"),
+            "OPENAI_BASE_URL": f"{self.url('openai')}/v1",
+            "OPENAI_API_KEY": "fake",
+            "ALPACA_BASE_URL": self.url("alpaca"),
+            "ALPACA_API_KEY": "fake",
+            "ALPACA_SECRET_KEY": "fake",
+            "HTTP_RATE_LIMITS": ",".join(f"{h}=600000" for h in hosts),
+        }
+
+    def stats(self):
+        return {name: s.stats() for name, s in self.services.items()}
+
+
+def parse_rates(spec):
+    """"polygon=50,coingecko=5" -> {"polygon": 50.0, "coingecko": 5.0} (requests per second)."""
+    rates = {}
+    for item in filter(None, (s.strip() for s in (spec or "").split(","))):
+        name, _, value = item.partition("=")
+        if name not in SERVICES:
+            raise ValueError(f"unknown service {name!r} (expected one of {', '.join(SERVICES)})")
+        rates[name] = float(value)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=1_000)
+    parser.add_argument("--coins", type=int, default=2_000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rates", default="", help='per-service requests/second, e.g. "polygon=50,coingecko=5"')
+    args = parser.parse_args()
+
+    with FakeServices(args.symbols, args.coins, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                      rates=parse_rates(args.rates)) as fake:
+        for k, v in fake.env().items():
+            print(f"export {k}={v}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,30 @@
-import json
 import os
-import alpaca_trade_api as tradeapi
 from pathlib import Path
 
+import numpy as np
+
+import instruments
+
 DATA_PATH = Path("data/stocks.json")
 
 API_KEY = os.getenv("ALPACA_API_KEY")
 SECRET_KEY = os.getenv("ALPACA_SECRET_KEY")
-BASE_URL = "https://paper-api.alpaca.markets"
+BASE_URL = os.getenv("ALPACA_BASE_URL", "https://paper-api.alpaca.markets")
 
 def paper_trade():
-    with open(DATA_PATH, "r") as f:
-        stocks = json.load(f)
+    registry = instruments.build(stocks=str(DATA_PATH), crypto=None, whale_signals=None)
+    stocks = registry.tables.get("stock")
+    if not stocks or "marketCap" not in stocks:
+        print(f"❌ No stock universe at {DATA_PATH}")
+        return
 
-    top_picks = sorted(stocks.items(), key=lambda x: x[1].get("marketCap", 0), reverse=True)[:5]
+    caps = np.nan_to_num(np.asarray(stocks["marketCap"], dtype=np.float64), nan=0.0)
+    top_rows = np.argsort(-caps, kind="stable")[:5]
+    import alpaca_trade_api as tradeapi
     api = tradeapi.REST(API_KEY, SECRET_KEY, BASE_URL, api_version="v2")
 
-    for ticker, info in top_picks:
+    for row in top_rows.tolist():
+        ticker = registry.value("stock", row, "symbol")
         try:
             api.submit_order(
                 symbol=ticker,
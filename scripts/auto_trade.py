@@ -8,9 +8,17 @@ Autonomous trading loop:
 
 import os
 import json
+import hashlib
 from pathlib import Path
 from typing import Dict, Any
 
+import dataset_store
+import instruments
+import quotes
+from execution import EXEC_WAIT_SECONDS, ExecutionEngine
+from policy_engine import should_enter
+from portfolio import PortfolioSnapshot, reconcile, submit_orders
+
 # ✅ Use merged file as default
 RECS_FILE = os.getenv("RECS_FILE", "data/merged_recommendations.json")
 RECS_PATH = Path(RECS_FILE)
@@ -31,7 +39,112 @@ except Exception:
     DRY_RUN = os.getenv("DRY_RUN", "true").lower() == "true"
 
 # ----- Broker -----
-try:
-    from broker_alpaca import BrokerAlpaca
-except Exception as e:
-    raise RuntimeError(f"Failed to import BrokerAlpaca: {e}")
+def make_broker(dry_run: bool = DRY_RUN):
+    """Live/paper Alpaca broker (imported here so dry runs against a mock don't need alpaca).
+
+    A dry run without Alpaca keys previews against an empty MockBroker instead, so it
+    never loads alpaca_trade_api.
+    """
+    if dry_run and not (os.getenv("ALPACA_API_KEY") and os.getenv("ALPACA_SECRET_KEY")):
+        from broker_mock import MockBroker
+        return MockBroker()
+    try:
+        from broker_alpaca import BrokerAlpaca
+    except Exception as e:
+        raise RuntimeError(f"Failed to import BrokerAlpaca: {e}")
+    return BrokerAlpaca()
+
+
+def load_recommendations(path: Path = RECS_PATH) -> Dict[str, Dict[str, Any]]:
+    """Recommendations keyed by canonical symbol (highest score wins if a symbol repeats)."""
+    if not dataset_store.exists(path):
+        print(f"⚠️ No recommendations at {path}")
+        return {}
+    recs: Dict[str, Dict[str, Any]] = {}
+    for r in dataset_store.load_records(path):
+        symbol = instruments.canonical(r.get("symbol"))
+        if not symbol:
+            continue
+        if symbol not in recs or (r.get("score") or 0) > (recs[symbol].get("score") or 0):
+            recs[symbol] = r
+    return recs
+
+
+def entry_price(rec: Dict[str, Any]):
+    price = rec.get("price") or instruments.default_registry().price(rec["symbol"], instruments.rec_kind(rec))
+    if price:
+        return float(price)
+    return quotes.get_quote(rec["symbol"])
+
+
+def warm_prices(recs: Dict[str, Dict[str, Any]]):
+    """Quote every priceless entry candidate in one batched lookup, so reconcile hits the cache."""
+    registry = instruments.default_registry()
+    need = [r["symbol"] for r in recs.values()
+            if not r.get("price") and should_enter(r.get("score"))
+            and registry.price(r["symbol"], instruments.rec_kind(r)) is None]
+    if need:
+        quotes.get_quotes(need)
+
+
+def recs_cycle(recs: Dict[str, Dict[str, Any]]) -> str:
+    """Cycle id for client order ids: a hash of the recommendations, not the clock.
+
+    A restarted or retried run over the same recommendations re-derives the same ids,
+    so the broker rejects the repeats instead of filling them twice; the same order
+    isn't re-placed until the recommendations change.
+    """
+    raw = json.dumps(recs, sort_keys=True, default=str)
+    return "recs-" + hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def run_cycle(broker, recs: Dict[str, Dict[str, Any]], dry_run: bool = DRY_RUN, engine=None):
+    """One pass of exits then entries, reconciled against a single portfolio snapshot.
+
+    With an ExecutionEngine the snapshot comes from its in-memory position book and
+    orders go through its queue (client order ids keyed by `recs_cycle`), waiting
+    (up to EXEC_WAIT_SECONDS) for fills.
+    """
+    snapshot = engine.snapshot() if engine else PortfolioSnapshot.fetch(broker)
+    print(f"📊 {len(snapshot.positions)} open positions | cash=${snapshot.cash:,.2f} | {len(recs)} recommendations")
+
+    warm_prices(recs)
+    orders = reconcile(snapshot, recs, entry_price)
+    for o in orders:
+        if o.side == "sell":
+            print(f"🔻 EXIT {o.symbol}: {o.reason}")
+        else:
+            print(f"🟢 BUY {o.symbol} qty={o.qty} @ ~{o.price}: {o.reason}")
+
+    quotes.print_stats()
+    if dry_run or not orders:
+        return orders
+    if engine is None:
+        submit_orders(broker, orders)
+        return orders
+
+    tracked = engine.submit(orders, cycle=recs_cycle(recs))
+    if not engine.wait(tracked):
+        print(f"⏳ {sum(1 for t in tracked if not t.done)} orders still open after {EXEC_WAIT_SECONDS:.0f}s")
+    for t in tracked:
+        price = f" @ {t.filled_avg_price}" if t.filled_avg_price else ""
+        print(f"📬 {t.order.side.upper()} {t.order.symbol}: {t.status} {t.filled_qty:g}/{t.order.qty:g}{price}")
+    return orders
+
+
+def main():
+    broker = make_broker()
+    broker.authenticate()
+    if DRY_RUN:  # nothing is submitted, so no engine (or its worker threads)
+        run_cycle(broker, load_recommendations(), dry_run=True)
+    else:
+        engine = ExecutionEngine(broker)
+        try:
+            run_cycle(broker, load_recommendations(), dry_run=False, engine=engine)
+        finally:
+            engine.close()
+    print("✅ Trading cycle complete" + (" (dry run, no orders sent)" if DRY_RUN else ""))
+
+
+if __name__ == "__main__":
+    main()
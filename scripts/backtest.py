@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Vectorized backtester for the trading policy:
+- replays a directory of recommendation snapshots (any file merge_recommendations
+  can read), or a dataset's history from snapshot_store (--history), against
+  daily OHLC bars loaded from local files
+- applies the policy_engine thresholds (a PolicyParams) across all symbols at
+  once per bar: exits below exit_below_confidence, entries above min_confidence
+  by score, max_portfolio_size slots, position_size sizing
+- simulates the bracket orders (stop_loss_pct / take_profit_pct, plus
+  trailing_stop_pct when set) on each bar
+- reports PnL, max drawdown, turnover and trade stats
+
+Timing model: a snapshot is acted on at the open of the first bar after it was
+published; brackets are checked against that bar's low/high. When both the stop
+and the target are inside one bar the stop is assumed to fill first.
+"""
+import argparse
+import csv
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List
+
+import numpy as np
+
+import dataset_store
+from instruments import canonical
+from policy_engine import DEFAULT_PARAMS, PolicyParams
+
+DAY = 86400
+
+
+@dataclass
+class Bars:
+    """Daily OHLC bars aligned on one calendar: arrays are [days, symbols], NaN where missing."""
+    days: np.ndarray      # int64 days since epoch
+    symbols: List[str]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+    def save(self, path):
+        np.savez(path, days=self.days, symbols=np.array(self.symbols), open=self.open,
+                 high=self.high, low=self.low, close=self.close)
+
+
+def _to_day(value) -> int:
+    return int(np.datetime64(str(value)[:10], "D").astype(np.int64))
+
+
+def load_bars(path) -> Bars:
+    """Load bars from an .npz file or a directory of per-symbol CSVs (Date,Open,High,Low,Close).
+
+    .npz members are read into memory (np.load can't map them); sweep.py shares bars
+    across workers as memory-mapped .npy files instead.
+    """
+    if str(path).endswith(".npz"):
+        data = np.load(path)
+        return Bars(data["days"], [str(s) for s in data["symbols"]], data["open"],
+                    data["high"], data["low"], data["close"])
+
+    series = {}
+    for name in sorted(os.listdir(path)):
+        if not name.endswith(".csv"):
+            continue
+        rows = {}
+        with open(os.path.join(path, name), newline="") as f:
+            for r in csv.DictReader(f):
+                r = {k.lower(): v for k, v in r.items()}
+                try:
+                    rows[_to_day(r["date"])] = tuple(float(r[k]) for k in ("open", "high", "low", "close"))
+                except (KeyError, ValueError):
+                    continue
+        if rows:
+            series[name[:-4]] = rows
+
+    days = np.array(sorted({d for rows in series.values() for d in rows}), dtype=np.int64)
+    symbols = list(series)
+    ohlc = np.full((4, len(days), len(symbols)), np.nan)
+    for j, sym in enumerate(symbols):
+        idx = np.searchsorted(days, np.fromiter(series[sym], dtype=np.int64))
+        ohlc[:, idx, j] = np.array(list(series[sym].values())).T
+    return Bars(days, symbols, *ohlc)
+
+
+def _snapshot_time(path, meta) -> float:
+    for key in ("updated_at", "as_of", "timestamp"):
+        if isinstance(meta.get(key), (int, float)):
+            return float(meta[key])
+    stem = os.path.splitext(os.path.basename(path))[0].split(".")[0]
+    try:
+        return float(stem)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(stem).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return os.path.getmtime(path)
+
+
+def load_snapshot_files(recs_dir):
+    """[(ts, records)] from a directory of recommendation files, oldest first."""
+    snapshots = []
+    for name in os.listdir(recs_dir):
+        path = os.path.join(recs_dir, name)
+        if name.endswith(".json") and os.path.isfile(path):
+            records, meta = dataset_store.load(path)
+            snapshots.append((_snapshot_time(path, meta), records))
+    snapshots.sort(key=lambda s: s[0])
+    return snapshots
+
+
+def load_score_matrix(recs_dir, bars: Bars, snapshots=None) -> np.ndarray:
+    """[days, symbols] score matrix: each snapshot applies from the next bar on, forward-filled.
+
+    `snapshots` ([(ts, records)], e.g. from SnapshotStore.range) replaces reading `recs_dir`.
+    """
+    if snapshots is None:
+        snapshots = load_snapshot_files(recs_dir)
+
+    col = {canonical(s): j for j, s in enumerate(bars.symbols)}
+    raw = np.full((len(bars.days), len(bars.symbols)), np.nan)
+    stamp = np.zeros(len(bars.days), dtype=bool)
+    for ts, records in snapshots:
+        # first bar strictly after the day the snapshot was published
+        t = np.searchsorted(bars.days, int(ts // DAY), side="right")
+        if t >= len(bars.days):
+            continue
+        raw[t] = np.nan  # a later snapshot for the same bar replaces an earlier one
+        stamp[t] = True
+        for r in records:
+            j = col.get(canonical(r.get("symbol")))
+            if j is not None and r.get("score") is not None:
+                raw[t, j] = float(r["score"])
+
+    # Forward-fill whole snapshots: symbols absent from a snapshot have no score (NaN)
+    last = np.maximum.accumulate(np.where(stamp, np.arange(len(stamp)), -1))
+    scores = np.full_like(raw, np.nan)
+    valid = last >= 0
+    scores[valid] = raw[last[valid]]
+    return scores
+
+
+def run_backtest(bars: Bars, scores: np.ndarray, params: PolicyParams = DEFAULT_PARAMS,
+                 initial_cash=100_000.0, fee_bps=0.0) -> dict:
+    """Replay scores through the policy thresholds and bracket exits. Returns a report dict."""
+    p = params
+    n_days, n_sym = scores.shape
+    fee = fee_bps / 10_000
+    held = np.zeros(n_sym, dtype=bool)
+    qty = np.zeros(n_sym)
+    entry = np.zeros(n_sym)
+    peak = np.zeros(n_sym)  # highest high since entry, for the trailing stop
+    cash = float(initial_cash)
+    equity = np.empty(n_days)
+    traded = 0.0
+    trades = wins = 0
+    # Mark-to-market uses the last known close for symbols with gaps
+    has_close = ~np.isnan(bars.close)
+    last_row = np.maximum.accumulate(np.where(has_close, np.arange(n_days)[:, None], 0), axis=0)
+    last_close = np.nan_to_num(bars.close[last_row, np.arange(n_sym)])
+
+    for t in range(n_days):
+        o, h, l = bars.open[t], bars.high[t], bars.low[t]
+        tradable = ~np.isnan(o)
+
+        # --- signal exits at the open (policy: score missing or below exit threshold) ---
+        s = scores[t]
+        exit_now = held & tradable & ~(s >= p.exit_below_confidence)
+        if exit_now.any():
+            proceeds = qty[exit_now] * o[exit_now]
+            cash += proceeds.sum() * (1 - fee)
+            traded += proceeds.sum()
+            trades += int(exit_now.sum())
+            wins += int((o[exit_now] > entry[exit_now]).sum())
+            held &= ~exit_now
+
+        # --- entries at the open: best scores first into the free slots ---
+        slots = p.max_portfolio_size - int(held.sum())
+        cand = np.flatnonzero(~held & tradable & (s >= p.min_confidence))
+        if slots > 0 and cand.size:
+            if cand.size > slots:
+                cand = cand[np.argpartition(-s[cand], slots - 1)[:slots]]
+            for j in cand[np.argsort(-s[cand], kind="stable")]:
+                price = o[j]
+                n = max(int(min(cash / 10.0, p.max_position_usd) // price), 1)
+                cost = n * price * (1 + fee)
+                if cost > cash:
+                    continue
+                cash -= cost
+                traded += n * price
+                held[j], qty[j], entry[j], peak[j] = True, n, price, price
+
+        # --- bracket exits inside the bar (stop first if both are touched) ---
+        # the trailing stop trails the high up to the previous bar (this bar's path is unknown)
+        stop = np.maximum(entry * (1 - p.stop_loss_pct), peak * (1 - p.trailing_stop_pct)) \
+            if p.trailing_stop_pct > 0 else entry * (1 - p.stop_loss_pct)
+        target = entry * (1 + p.take_profit_pct)
+        live = held & tradable
+        hit_stop = live & (l <= stop)
+        hit_target = live & ~hit_stop & (h >= target)
+        fill = np.where(hit_stop, np.minimum(o, stop), np.where(hit_target, np.maximum(o, target), 0.0))
+        out = hit_stop | hit_target
+        if out.any():
+            proceeds = qty[out] * fill[out]
+            cash += proceeds.sum() * (1 - fee)
+            traded += proceeds.sum()
+            trades += int(out.sum())
+            wins += int(hit_target.sum())
+            held &= ~out
+        peak = np.where(held & tradable, np.fmax(peak, h), peak)
+
+        equity[t] = cash + (qty[held] * last_close[t, held]).sum()
+
+    peak = np.maximum.accumulate(equity) if n_days else equity
+    drawdown = (equity / peak - 1) if n_days else equity
+    daily = np.diff(equity) / equity[:-1] if n_days > 1 else np.zeros(0)
+    final = float(equity[-1]) if n_days else float(initial_cash)
+    return {
+        "days": int(n_days),
+        "symbols": int(n_sym),
+        "initial_cash": float(initial_cash),
+        "final_equity": round(final, 2),
+        "pnl": round(final - initial_cash, 2),
+        "return_pct": round((final / initial_cash - 1) * 100, 3),
+        "max_drawdown_pct": round(float(drawdown.min()) * 100, 3) if n_days else 0.0,
+        "turnover": round(float(traded / max(float(equity.mean()) if n_days else initial_cash, 1e-9)), 3),
+        "trades": trades,
+        "win_rate": round(wins / trades, 3) if trades else None,
+        "sharpe": round(float(daily.mean() / daily.std() * np.sqrt(252)), 3) if daily.size and daily.std() else None,
+        "open_positions": int(held.sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--recs-dir", help="directory of recommendation snapshot files")
+    source.add_argument("--history", help="dataset name in the snapshot store, e.g. gpt_recommendations")
+    parser.add_argument("--bars", required=True, help="bars .npz file or directory of per-symbol CSVs")
+    parser.add_argument("--cash", type=float, default=100_000.0)
+    parser.add_argument("--fee-bps", type=float, default=0.0)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    bars = load_bars(args.bars)
+    snapshots = None
+    if args.history:
+        from snapshot_store import SnapshotStore
+        snapshots = list(SnapshotStore(args.history).range())
+    scores = load_score_matrix(args.recs_dir, bars, snapshots)
+    report = run_backtest(bars, scores, initial_cash=args.cash, fee_bps=args.fee_bps)
+    for k, v in report.items():
+        print(f"📈 {k:<17} {v}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Saved backtest report → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 import os
-import alpaca_trade_api as tradeapi
+import time
+
+import metrics
+
+# How long a sell waits for the position's cancelled bracket legs to release its shares
+CANCEL_WAIT_SECONDS = float(os.getenv("ALPACA_CANCEL_WAIT_SECONDS", "5"))
 
 class BrokerAlpaca:
     def __init__(self):
         self.api_key = os.getenv("ALPACA_API_KEY")
         self.secret_key = os.getenv("ALPACA_SECRET_KEY")
-        self.base_url = "https://paper-api.alpaca.markets"  # switch to live if ready
+        self.base_url = os.getenv("ALPACA_BASE_URL", "https://paper-api.alpaca.markets")  # switch to live if ready
 
         if not self.api_key or not self.secret_key:
             raise RuntimeError(
@@ -13,23 +18,32 @@ class BrokerAlpaca:
                 f"ALPACA_SECRET_KEY={'SET' if self.secret_key else 'MISSING'}"
             )
 
+        import alpaca_trade_api as tradeapi  # heavy (pandas); only loaded when a live broker is built
         self.api = tradeapi.REST(self.api_key, self.secret_key, self.base_url)
 
+    @metrics.timed("broker.authenticate")
     def authenticate(self):
         account = self.api.get_account()
         print(f"✅ Connected to Alpaca | Cash=${account.cash} | Buying power=${account.buying_power}")
         return account
 
+    @metrics.timed("broker.get_cash")
     def get_cash(self) -> float:
         return float(self.api.get_account().cash)
 
+    @metrics.timed("broker.get_positions")
     def get_positions(self):
         positions = self.api.list_positions()
         return {p.symbol: p for p in positions}
 
+    @metrics.timed("broker.market_buy_qty")
     def market_buy_qty(self, symbol: str, qty: int, bracket=True, entry_price=None,
-                       stop_loss_pct=0.05, take_profit_pct=0.1):
+                       stop_loss_pct=0.05, take_profit_pct=0.1, client_order_id=None):
         print(f"🟢 Submitting BUY order: {symbol} qty={qty}")
+        bracket = bracket and stop_loss_pct > 0 and take_profit_pct > 0  # 0 = exits left to exit_monitor.py
+        if bracket and not entry_price:
+            import quotes
+            entry_price = quotes.get_quote(symbol)  # cached if this cycle already priced it
         if bracket and entry_price:
             stop_loss = round(entry_price * (1 - stop_loss_pct), 2)
             take_profit = round(entry_price * (1 + take_profit_pct), 2)
@@ -41,7 +55,8 @@ class BrokerAlpaca:
                 time_in_force="gtc",
                 order_class="bracket",
                 stop_loss={"stop_price": stop_loss},
-                take_profit={"limit_price": take_profit}
+                take_profit={"limit_price": take_profit},
+                client_order_id=client_order_id
             )
         else:
             order = self.api.submit_order(
@@ -49,21 +64,64 @@ class BrokerAlpaca:
                 qty=qty,
                 side="buy",
                 type="market",
-                time_in_force="gtc"
+                time_in_force="gtc",
+                client_order_id=client_order_id
             )
         return order
 
-    def market_sell_all(self, symbol: str):
-        pos = self.api.get_position(symbol)
-        if not pos or float(pos.qty) == 0:
+    @metrics.timed("broker.market_sell_all")
+    def market_sell_all(self, symbol: str, qty=None, client_order_id=None):
+        """Sell the whole position; pass `qty` from a portfolio snapshot to skip the lookup."""
+        if qty is None:
+            pos = self.api.get_position(symbol)
+            if not pos or float(pos.qty) == 0:
+                print(f"⚠️ No active position in {symbol}")
+                return
+            qty = pos.qty
+        qty = abs(int(float(qty)))
+        if qty == 0:
             print(f"⚠️ No active position in {symbol}")
             return
-        qty = abs(int(float(pos.qty)))
+        self.cancel_open_sells(symbol)
         print(f"🔻 Submitting SELL order: {symbol} qty={qty}")
         return self.api.submit_order(
             symbol=symbol,
             qty=qty,
             side="sell",
             type="market",
-            time_in_force="gtc"
+            time_in_force="gtc",
+            client_order_id=client_order_id
         )
+
+    @metrics.timed("broker.cancel_open_sells")
+    def cancel_open_sells(self, symbol: str, timeout=CANCEL_WAIT_SECONDS) -> bool:
+        """Cancel the symbol's open sell orders (a bracket's stop/limit legs hold all its shares,
+        so a market sell is rejected until they're gone). True once none are left open."""
+        def open_sells():
+            return [o for o in self.api.list_orders(status="open", symbols=[symbol]) if o.side == "sell"]
+
+        orders = open_sells()
+        if not orders:
+            return True
+        for o in orders:
+            try:
+                self.api.cancel_order(o.id)
+            except Exception as e:  # e.g. the other OCO leg just cancelled it
+                print(f"⚠️ Cancel {symbol} {o.type} leg failed: {e}")
+        print(f"🧹 Cancelled {len(orders)} open sell order(s) on {symbol}")
+        deadline = time.time() + timeout
+        while open_sells():
+            if time.time() >= deadline:
+                print(f"⚠️ {symbol} still has open sell orders after {timeout:g}s")
+                return False
+            time.sleep(0.25)
+        return True
+
+    @metrics.timed("broker.get_order_status")
+    def get_order_status(self, client_order_id: str):
+        """Status and fill progress of an order we submitted, by its client_order_id."""
+        order = self.api.get_order_by_client_order_id(client_order_id)
+        price = getattr(order, "filled_avg_price", None)
+        return {"status": str(order.status).lower(),
+                "filled_qty": float(order.filled_qty or 0),
+                "filled_avg_price": float(price) if price else None}
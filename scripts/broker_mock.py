@@ -0,0 +1,110 @@
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class MockPosition:
+    symbol: str
+    qty: float
+    avg_entry_price: float
+
+
+class MockBroker:
+    """In-memory stand-in for BrokerAlpaca with the same methods, for dry runs and offline tests.
+
+    Market orders fill at `entry_price` (or the price in `prices`): immediately, or
+    `fill_delay` seconds later on a timer. Fills are pushed to `subscribe`d callbacks
+    (the fake trade-update stream) and visible through `get_order_status`.
+    """
+
+    def __init__(self, cash: float = 100_000.0, prices: Optional[Dict[str, float]] = None, fill_delay: float = 0.0):
+        self.cash = float(cash)
+        self.prices = dict(prices or {})
+        self.fill_delay = fill_delay
+        self.positions: Dict[str, MockPosition] = {}
+        self.orders = []
+        self._by_client_id: Dict[str, dict] = {}
+        self._subscribers = []
+        self._lock = threading.Lock()  # orders may be submitted concurrently
+
+    def authenticate(self):
+        print(f"🧪 Mock broker | Cash=${self.cash:,.2f}")
+        return self
+
+    def get_cash(self) -> float:
+        return self.cash
+
+    def get_positions(self):
+        return dict(self.positions)
+
+    def subscribe(self, callback):
+        """callback(client_order_id, status, filled_qty, filled_avg_price) on every fill."""
+        self._subscribers.append(callback)
+
+    def get_order_status(self, client_order_id: str):
+        order = self._by_client_id.get(client_order_id)
+        if order is None:
+            return None
+        return {k: order[k] for k in ("status", "filled_qty", "filled_avg_price")}
+
+    def _accept(self, order, client_order_id):
+        """Register a new order (rejecting reused client ids like Alpaca) and schedule its fill."""
+        order.update(client_order_id=client_order_id or f"mock-{uuid.uuid4().hex[:16]}",
+                     status="new", filled_qty=0.0, filled_avg_price=None)
+        with self._lock:
+            if order["client_order_id"] in self._by_client_id:
+                raise ValueError("client_order_id must be unique")
+            self._by_client_id[order["client_order_id"]] = order
+            self.orders.append(order)
+        if self.fill_delay > 0:
+            threading.Timer(self.fill_delay, self._fill, args=(order,)).start()
+        else:
+            self._fill(order)
+        return order
+
+    def _fill(self, order):
+        symbol, qty, price = order["symbol"], order["qty"], order["price"]
+        with self._lock:
+            if order["side"] == "buy":
+                pos = self.positions.get(symbol)
+                if pos:
+                    total = pos.qty + qty
+                    pos.avg_entry_price = (pos.avg_entry_price * pos.qty + price * qty) / total
+                    pos.qty = total
+                else:
+                    self.positions[symbol] = MockPosition(symbol, float(qty), float(price))
+                self.cash -= qty * price
+            else:
+                pos = self.positions.get(symbol)
+                if pos:
+                    pos.qty -= qty
+                    if pos.qty <= 0:
+                        self.positions.pop(symbol)
+                self.cash += qty * price
+            order.update(status="filled", filled_qty=float(qty), filled_avg_price=float(price))
+        for callback in list(self._subscribers):
+            callback(order["client_order_id"], "filled", float(qty), float(price))
+
+    def market_buy_qty(self, symbol: str, qty: int, bracket=True, entry_price=None,
+                       stop_loss_pct=0.05, take_profit_pct=0.1, client_order_id=None):
+        price = entry_price or self.prices.get(symbol)
+        if not price:
+            raise ValueError(f"No price for {symbol}")
+        print(f"🟢 [mock] BUY {symbol} qty={qty} @ {price}")
+        order = {"symbol": symbol, "qty": qty, "side": "buy", "price": price,
+                 "bracket": bool(bracket and entry_price and stop_loss_pct > 0 and take_profit_pct > 0),
+                 "stop_loss_pct": stop_loss_pct, "take_profit_pct": take_profit_pct}
+        return self._accept(order, client_order_id)
+
+    def market_sell_all(self, symbol: str, qty=None, client_order_id=None):
+        with self._lock:
+            pos = self.positions.get(symbol)
+            if not pos or pos.qty == 0:
+                print(f"⚠️ No active position in {symbol}")
+                return
+            qty = pos.qty if qty is None else min(abs(float(qty)), pos.qty)
+            price = self.prices.get(symbol, pos.avg_entry_price)
+        print(f"🔻 [mock] SELL {symbol} qty={qty} @ {price}")
+        return self._accept({"symbol": symbol, "qty": qty, "side": "sell", "price": price}, client_order_id)
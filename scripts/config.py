@@ -17,6 +17,8 @@ EXIT_BELOW_CONFIDENCE = float(os.getenv("EXIT_BELOW_CONFIDENCE", "0.5"))
 # Stops / targets for bracket orders
 STOP_LOSS_PCT   = float(os.getenv("STOP_LOSS_PCT", "0.05"))  # 5%
 TAKE_PROFIT_PCT = float(os.getenv("TAKE_PROFIT_PCT", "0.10"))  # 10%
+# Trailing stop below the high since entry, enforced by exit_monitor.py (0 = off)
+TRAILING_STOP_PCT = float(os.getenv("TRAILING_STOP_PCT", "0.0"))
 
 # Universe / ranking
 UNIVERSE_SOURCE = os.getenv("UNIVERSE_SOURCE", "sp500")  # or 'file'
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Persistent trading daemon:
+- imports the pipeline once and keeps the broker session, HTTP caches and
+  datasets warm between runs
+- runs fetch → rank → merge → trade stages (stocks and whale trades) on per-stage intervals; a stage that
+  finishes makes its downstream stages due immediately
+- re-runs the trade stage within seconds when the recommendations file changes
+- `--dry-run` trades against an in-memory MockBroker so it can run fully offline
+
+Data stages and the trade stage run in separate lanes, so a slow universe fetch
+never delays reacting to new recommendations.
+"""
+import argparse
+import os
+import signal
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+TICK_SECONDS = float(os.getenv("DAEMON_TICK_SECONDS", "1"))
+INTERVALS = {
+    "universe": float(os.getenv("DAEMON_UNIVERSE_INTERVAL", str(6 * 3600))),
+    "crypto": float(os.getenv("DAEMON_CRYPTO_INTERVAL", "3600")),
+    "whales": float(os.getenv("DAEMON_WHALES_INTERVAL", "900")),
+    "rank": float(os.getenv("DAEMON_RANK_INTERVAL", "3600")),
+    "merge": float(os.getenv("DAEMON_MERGE_INTERVAL", "900")),
+    "trade": float(os.getenv("DAEMON_TRADE_INTERVAL", "900")),
+}
+WHALE_RECS_FILE = os.getenv("DAEMON_WHALE_RECS_FILE", "data/whale_recs.json")
+MERGE_INPUTS = os.getenv("MERGE_INPUTS", f"data/gpt_recommendations.json {WHALE_RECS_FILE}").split()
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[], object]
+    interval: float
+    lane: str = "data"
+    then: Tuple[str, ...] = ()
+    next_run: float = 0.0
+    runs: int = 0
+    failures: int = 0
+    last_seconds: float = 0.0
+
+
+class Daemon:
+    """Tick-driven scheduler: at most one running stage per lane."""
+
+    def __init__(self, stages, watch: Dict[str, str] = None, tick=TICK_SECONDS, on_close=()):
+        self.stages = {s.name: s for s in stages}
+        self.on_close = list(on_close)  # run once every lane has drained (e.g. engine.close)
+        self.watch = dict(watch or {})  # path -> stage to trigger when it changes
+        self.tick_seconds = tick
+        self._mtimes = {p: self._mtime(p) for p in self.watch}
+        self._lanes = {}
+        self._pools = {lane: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"lane-{lane}")
+                       for lane in {s.lane for s in stages}}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def trigger(self, name):
+        with self._lock:
+            self.stages[name].next_run = 0.0
+
+    def _run_stage(self, stage):
+        started = time.time()
+        try:
+            stage.fn()
+            ok = True
+        except BaseException as e:  # rank_stocks & co. sys.exit() on bad input
+            stage.failures += 1
+            ok = False
+            print(f"❌ Stage {stage.name} failed: {e!r}")
+            if not isinstance(e, SystemExit):
+                traceback.print_exc()
+        finished = time.time()
+        with self._lock:
+            stage.runs += 1
+            stage.last_seconds = finished - started
+            stage.next_run = finished + stage.interval
+            if ok:
+                for downstream in stage.then:
+                    self.stages[downstream].next_run = 0.0
+                # Our own writes to a watched file are already covered by `then`
+                for path, target in self.watch.items():
+                    if target in stage.then:
+                        self._mtimes[path] = self._mtime(path)
+        print(f"⏱️ {stage.name} {'ok' if ok else 'failed'} in {stage.last_seconds:.2f}s")
+
+    def tick(self, now=None):
+        """One scheduling step: check watched files, start due stages on idle lanes."""
+        now = now or time.time()
+        for path, stage_name in self.watch.items():
+            mtime = self._mtime(path)
+            if mtime != self._mtimes[path]:
+                self._mtimes[path] = mtime
+                print(f"👀 {path} changed → {stage_name}")
+                self.trigger(stage_name)
+
+        with self._lock:
+            due = sorted((s for s in self.stages.values() if s.next_run <= now), key=lambda s: s.next_run)
+        for stage in due:
+            running = self._lanes.get(stage.lane)
+            if running is not None and not running.done():
+                continue
+            with self._lock:
+                stage.next_run = float("inf")  # rescheduled when it finishes
+            self._lanes[stage.lane] = self._pools[stage.lane].submit(self._run_stage, stage)
+
+    def run(self, max_seconds=None):
+        started = time.time()
+        try:
+            while not self._stop.is_set():
+                self.tick()
+                if max_seconds is not None and time.time() - started >= max_seconds:
+                    break
+                self._stop.wait(self.tick_seconds)
+        except KeyboardInterrupt:
+            print("🛑 Stopping daemon")
+        finally:
+            for pool in self._pools.values():
+                pool.shutdown(wait=True)
+            self.close()
+            self.report()
+
+    def run_once(self, order):
+        """Run the given stages once, sequentially (handy for smoke tests and CI)."""
+        try:
+            for name in order:
+                self._run_stage(self.stages[name])
+        finally:
+            self.close()
+        self.report()
+
+    def close(self):
+        for fn in self.on_close:
+            try:
+                fn()
+            except Exception as e:
+                print(f"⚠️ Shutdown step failed: {e!r}")
+        self.on_close = []
+
+    def stop(self):
+        self._stop.set()
+
+    def report(self):
+        for s in self.stages.values():
+            print(f"📋 {s.name:<9} runs={s.runs} failures={s.failures} last={s.last_seconds:.2f}s")
+
+
+def build(dry_run=False, top=None):
+    """Wire the pipeline stages to a single warm broker."""
+    import auto_trade
+    import dataset_store
+    import fetch_whales
+    import gpt_rank_stocks
+    import gpt_rank_whales
+    import merge_recommendations
+    import update_universe
+    import update_universe_crypto
+    from config import GPT_TOP_N
+    from execution import ExecutionEngine
+
+    if dry_run:
+        from broker_mock import MockBroker
+        broker = MockBroker()
+    else:
+        broker = auto_trade.make_broker()
+    broker.authenticate()
+    # One engine for the daemon's lifetime: its position book replaces re-listing positions each cycle
+    engine = ExecutionEngine(broker)
+
+    def rank_whales():
+        recs = gpt_rank_whales.analyze_with_gpt(gpt_rank_whales.load_whales())
+        if recs:
+            dataset_store.save(WHALE_RECS_FILE, recs)
+            print(f"✅ Saved whale recommendations → {WHALE_RECS_FILE}")
+
+    def trade():
+        # Against the mock, orders are the point of the dry run; against Alpaca honour DRY_RUN
+        auto_trade.run_cycle(broker, auto_trade.load_recommendations(),
+                             dry_run=False if dry_run else auto_trade.DRY_RUN, engine=engine)
+
+    stages = [
+        Stage("universe", update_universe.main, INTERVALS["universe"], then=("rank",)),
+        Stage("crypto", update_universe_crypto.fetch_top_crypto, INTERVALS["crypto"]),
+        Stage("whales", fetch_whales.main, INTERVALS["whales"], then=("rank_whales",)),
+        Stage("rank_whales", rank_whales, INTERVALS["whales"], then=("merge",)),
+        Stage("rank", lambda: gpt_rank_stocks.rank_stocks(top or GPT_TOP_N), INTERVALS["rank"], then=("merge",)),
+        Stage("merge", lambda: merge_recommendations.merge(MERGE_INPUTS, auto_trade.RECS_FILE),
+              INTERVALS["merge"], then=("trade",)),
+        Stage("trade", trade, INTERVALS["trade"], lane="trade"),
+    ]
+    return Daemon(stages, watch={auto_trade.RECS_FILE: "trade"}, on_close=[engine.close]), broker
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="trade against an in-memory mock broker")
+    parser.add_argument("--once", action="store_true", help="run every stage once in order, then exit")
+    parser.add_argument("--top", type=int, default=None)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    daemon, _ = build(dry_run=args.dry_run, top=args.top)
+    if args.once:
+        daemon.run_once(["universe", "crypto", "whales", "rank_whales", "rank", "merge", "trade"])
+    else:
+        print("🚀 Trading daemon started" + (" (dry run, mock broker)" if args.dry_run else ""))
+        # SIGTERM (systemd, docker stop) shuts down like Ctrl-C: lanes drain, the engine closes
+        signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+        daemon.run(max_seconds=args.max_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""Dataset store for the universe and recommendation files.
+
+Datasets are addressed by their JSON path (e.g. "data/stocks.json") and can be
+written in two formats, chosen with DATASET_FORMATS (default "npy,json"):
+
+- npy:  one NumPy column file per field in a sibling "<name>.cols/" directory,
+        memory-mapped on read
+- json: the original pretty-printed file, kept as an export for the workflows
+        and anything else that reads it directly
+
+Readers prefer the columnar copy unless the JSON file is newer (e.g. written by
+a script that doesn't use the store).
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+import metrics
+
+FORMATS = [f.strip() for f in os.getenv("DATASET_FORMATS", "npy,json").split(",") if f.strip()]
+SCHEMA_FILE = "_schema.json"
+# Keys under which list payloads are wrapped in dict-shaped JSON files
+RECORD_KEYS = ("ranked", "top", "data")
+# Streaming reads (iter_records): bytes per JSON read, rows per columnar slice
+STREAM_CHUNK = 1 << 16
+STREAM_ROWS = 4096
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+
+def columnar_dir(path) -> str:
+    root, _ = os.path.splitext(str(path))
+    return f"{root}.cols"
+
+
+# ----- Column encoding -----
+
+def _column_kind(values):
+    kinds = set()
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, bool):
+            kinds.add("json")
+        elif isinstance(v, int):
+            kinds.add("int")
+        elif isinstance(v, float):
+            kinds.add("float")
+        elif isinstance(v, str):
+            kinds.add("str")
+        else:
+            kinds.add("json")
+    if not kinds:
+        return "float"  # all-null column
+    if kinds <= {"int", "float"}:
+        return "int" if kinds == {"int"} else "float"
+    return kinds.pop() if len(kinds) == 1 else "json"
+
+
+def _encode(values):
+    """Return (kind, nullable, array or None) for a list of python values."""
+    kind = _column_kind(values)
+    nullable = any(v is None for v in values)
+    if kind == "int" and not nullable:
+        return kind, False, np.asarray(values, dtype=np.int64)
+    if kind in ("int", "float"):
+        return kind, nullable, np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    if kind == "str":
+        width = max((len(v) for v in values if v is not None), default=1) or 1
+        return kind, nullable, np.array(["" if v is None else v for v in values], dtype=f"<U{width}")
+    return "json", nullable, None
+
+
+def _decode(kind, nullable, array, mask=None):
+    values = array.tolist()
+    if kind == "int" and nullable:
+        return [None if v != v else int(v) for v in values]
+    if kind == "float" and nullable:
+        return [None if v != v else v for v in values]
+    if kind == "str" and mask is not None:
+        return [None if m else v for v, m in zip(values, mask.tolist())]
+    return values
+
+
+# ----- Writing -----
+
+def _write_columnar(path, records, meta):
+    target = columnar_dir(path)
+    tmp = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    fields = list(dict.fromkeys(k for r in records for k in r))
+    schema = {"rows": len(records), "columns": {}, "meta": meta or {}}
+    for i, field in enumerate(fields):
+        values = [r.get(field) for r in records]
+        kind, nullable, array = _encode(values)
+        fname = f"c{i}"
+        if array is None:
+            with open(os.path.join(tmp, f"{fname}.json"), "w") as f:
+                json.dump(values, f)
+        else:
+            np.save(os.path.join(tmp, f"{fname}.npy"), array)
+            if kind == "str" and nullable:
+                np.save(os.path.join(tmp, f"{fname}.null.npy"), np.array([v is None for v in values]))
+        schema["columns"][field] = {"kind": kind, "nullable": nullable, "file": fname}
+
+    with open(os.path.join(tmp, SCHEMA_FILE), "w") as f:
+        json.dump(schema, f)
+
+    # Swap the finished directory into place so readers never see a half-written dataset
+    old = f"{target}.old-{os.getpid()}"
+    if os.path.exists(target):
+        os.replace(target, old)
+    os.replace(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _write_json(path, records, meta, json_key, indent):
+    payload = records if json_key is None else {**(meta or {}), json_key: records}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=indent)
+    os.replace(tmp, path)
+
+
+@metrics.timed("file.write")
+def save(path, records, meta=None, json_key=None, formats=None, indent=2):
+    """Write `records` (list of flat dicts) in every configured format.
+
+    `json_key` wraps the JSON export as {**meta, json_key: records} instead of a bare list.
+    """
+    path = str(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    formats = formats or FORMATS
+    # JSON first: readers take the columnar copy only if it is at least as new
+    if "json" in formats:
+        _write_json(path, records, meta, json_key, indent)
+    if "npy" in formats:
+        _write_columnar(path, records, meta)
+    elif os.path.isdir(columnar_dir(path)):
+        shutil.rmtree(columnar_dir(path))  # don't leave a stale copy that readers would prefer
+
+
+# ----- Reading -----
+
+def _use_columnar(path) -> bool:
+    schema = os.path.join(columnar_dir(path), SCHEMA_FILE)
+    if not os.path.exists(schema):
+        return False
+    if not os.path.exists(path):
+        return True
+    return os.path.getmtime(schema) >= os.path.getmtime(path)
+
+
+def exists(path) -> bool:
+    return os.path.exists(str(path)) or os.path.exists(os.path.join(columnar_dir(path), SCHEMA_FILE))
+
+
+def _read_schema(path):
+    with open(os.path.join(columnar_dir(path), SCHEMA_FILE), "r") as f:
+        return json.load(f)
+
+
+def _read_json(path):
+    """Return (records, meta) from a JSON file shaped as a list or a dict wrapping one."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data, {}
+    if isinstance(data, dict):
+        for key in RECORD_KEYS:
+            if isinstance(data.get(key), list):
+                return data[key], {k: v for k, v in data.items() if k != key}
+        return [], data
+    return [], {}
+
+
+@metrics.timed("file.read_columns")
+def load_columns(path, columns=None):
+    """Return ({field: array}, meta); numeric/string columns are memory-mapped.
+
+    Nullable numbers come back as float64 with NaN; JSON-encoded columns as lists.
+    Falls back to building arrays from the JSON file when there is no columnar copy.
+    """
+    path = str(path)
+    if not _use_columnar(path):
+        records, meta = _read_json(path)
+        fields = columns or list(dict.fromkeys(k for r in records for k in r))
+        out = {}
+        for field in fields:
+            values = [r.get(field) for r in records]
+            kind, _, array = _encode(values)
+            out[field] = array if array is not None else values
+        return out, meta
+
+    schema = _read_schema(path)
+    base = columnar_dir(path)
+    out = {}
+    for field, col in schema["columns"].items():
+        if columns is not None and field not in columns:
+            continue
+        if col["kind"] == "json":
+            with open(os.path.join(base, f"{col['file']}.json"), "r") as f:
+                out[field] = json.load(f)
+        else:
+            out[field] = np.load(os.path.join(base, f"{col['file']}.npy"), mmap_mode="r")
+    return out, schema.get("meta", {})
+
+
+@metrics.timed("file.read")
+def load(path):
+    """Return (records, meta) for a dataset, from whichever format is current."""
+    path = str(path)
+    if not _use_columnar(path):
+        return _read_json(path)
+
+    schema = _read_schema(path)
+    base = columnar_dir(path)
+    decoded = {}
+    for field, col in schema["columns"].items():
+        if col["kind"] == "json":
+            with open(os.path.join(base, f"{col['file']}.json"), "r") as f:
+                decoded[field] = json.load(f)
+            continue
+        array = np.load(os.path.join(base, f"{col['file']}.npy"), mmap_mode="r")
+        mask_path = os.path.join(base, f"{col['file']}.null.npy")
+        mask = np.load(mask_path) if os.path.exists(mask_path) else None
+        decoded[field] = _decode(col["kind"], col["nullable"], array, mask)
+
+    fields = list(decoded)
+    rows = zip(*(decoded[f] for f in fields)) if fields else iter(())
+    records = [dict(zip(fields, row)) for row in rows]
+    return records, schema.get("meta", {})
+
+
+def load_records(path):
+    return load(path)[0]
+
+
+# ----- Streaming -----
+
+class _JsonStream:
+    """Just enough of an incremental JSON reader to walk a top-level list or dict value by value."""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(STREAM_CHUNK)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """Next non-whitespace character ("" at end of file), without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def take(self, expected):
+        ch = self.peek()
+        if ch not in expected:
+            raise ValueError(f"Expected one of {expected!r}, got {ch!r}")
+        self.pos += 1
+        return ch
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A value ending exactly at the buffer edge may be a truncated number
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            self._fill()
+
+    def array(self):
+        self.take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.take(",]") == "]":
+                return
+
+
+def _iter_json(path):
+    with open(path, "r") as f:
+        stream = _JsonStream(f)
+        first = stream.peek()
+        if first == "[":
+            yield from stream.array()
+            return
+        if first != "{":
+            return
+        stream.take("{")
+        while stream.peek() not in ("}", ""):
+            key = stream.value()
+            stream.take(":")
+            if key in RECORD_KEYS and stream.peek() == "[":
+                yield from stream.array()
+                return
+            stream.value()  # metadata
+            if stream.peek() == ",":
+                stream.pos += 1
+
+
+def _iter_columnar(path):
+    schema = _read_schema(path)
+    base = columnar_dir(path)
+    columns = {}
+    for field, col in schema["columns"].items():
+        if col["kind"] == "json":
+            with open(os.path.join(base, f"{col['file']}.json"), "r") as f:
+                columns[field] = (col, json.load(f), None)
+            continue
+        mask_path = os.path.join(base, f"{col['file']}.null.npy")
+        columns[field] = (col, np.load(os.path.join(base, f"{col['file']}.npy"), mmap_mode="r"),
+                          np.load(mask_path, mmap_mode="r") if os.path.exists(mask_path) else None)
+
+    fields = list(columns)
+    for start in range(0, schema["rows"], STREAM_ROWS):
+        stop = start + STREAM_ROWS
+        sliced = []
+        for col, values, mask in columns.values():
+            if col["kind"] == "json":
+                sliced.append(values[start:stop])
+            else:
+                sliced.append(_decode(col["kind"], col["nullable"], values[start:stop],
+                                      None if mask is None else mask[start:stop]))
+        for row in zip(*sliced):
+            yield dict(zip(fields, row))
+
+
+def iter_records(path):
+    """Yield a dataset's records one at a time, holding at most a slice of it in memory.
+
+    Reads NDJSON (.ndjson/.jsonl) line by line, the columnar copy in row slices,
+    or the JSON export incrementally (a bare list, or a dict wrapping one under ranked/top/data).
+    """
+    path = str(path)
+    if path.endswith(NDJSON_SUFFIXES):
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif _use_columnar(path):
+        yield from _iter_columnar(path)
+    else:
+        yield from _iter_json(path)
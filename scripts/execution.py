@@ -0,0 +1,244 @@
+"""Order execution engine: queued concurrent submission with fill tracking.
+
+- orders go onto a queue drained by a pool of submit workers, so one slow broker
+  response doesn't hold up the rest (sells are acknowledged before buys start)
+- every order carries a deterministic client_order_id (cycle + symbol + side);
+  resubmitting the same order is a no-op here and rejected as a duplicate by the
+  broker, in which case the existing order is looked up instead (its fills so far
+  are already in the synced book, so only later ones are applied). Callers pass a
+  cycle derived from stable input (auto_trade: the recommendations' content), so
+  a restarted or retried run re-derives the same ids
+- fills are tracked from the broker's update stream when it has one
+  (`broker.subscribe(callback)`, e.g. MockBroker) or by polling
+  `broker.get_order_status(client_order_id)`
+- fills are applied to an in-memory position book, so the next cycle's snapshot
+  comes from the engine instead of re-listing positions; the book is re-synced
+  from the broker every EXEC_RESYNC_SECONDS to pick up bracket exits
+"""
+import hashlib
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from portfolio import Order, PortfolioSnapshot
+
+EXEC_WORKERS = int(os.getenv("EXEC_WORKERS", os.getenv("ORDER_WORKERS", "8")))
+EXEC_POLL_SECONDS = float(os.getenv("EXEC_POLL_SECONDS", "1.0"))
+EXEC_RESYNC_SECONDS = float(os.getenv("EXEC_RESYNC_SECONDS", "300"))
+EXEC_WAIT_SECONDS = float(os.getenv("EXEC_WAIT_SECONDS", "30"))
+
+TERMINAL = {"filled", "canceled", "cancelled", "expired", "rejected", "failed", "done_for_day", "replaced"}
+
+
+def client_order_id(order: Order, cycle) -> str:
+    """Stable id for one order of one cycle (Alpaca allows up to 48 characters).
+
+    Quantity is left out: it's sized from live cash and quotes, which a retried run
+    may see differently, but it's still the same intended order.
+    """
+    raw = f"{cycle}|{order.symbol}|{order.side}"
+    return "mb-" + hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+@dataclass
+class TrackedOrder:
+    order: Order
+    client_order_id: str
+    status: str = "queued"
+    filled_qty: float = 0.0
+    filled_avg_price: Optional[float] = None
+    error: Optional[str] = None
+    submitted_at: float = 0.0
+    updated_at: float = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL
+
+
+def order_state(result) -> dict:
+    """Normalise a broker order (Alpaca entity or mock dict) to status / filled_qty / filled_avg_price."""
+    get = result.get if isinstance(result, dict) else (lambda k, d=None: getattr(result, k, d))
+    price = get("filled_avg_price")
+    return {"status": str(get("status") or "new").lower(),
+            "filled_qty": float(get("filled_qty") or 0),
+            "filled_avg_price": float(price) if price not in (None, "") else None}
+
+
+def _is_duplicate(error) -> bool:
+    return "client_order_id" in str(error) and "unique" in str(error)
+
+
+class ExecutionEngine:
+    def __init__(self, broker, workers=EXEC_WORKERS, poll_seconds=EXEC_POLL_SECONDS,
+                 resync_seconds=EXEC_RESYNC_SECONDS):
+        self.broker = broker
+        self.poll_seconds = poll_seconds
+        self.resync_seconds = resync_seconds
+        self.orders: Dict[str, TrackedOrder] = {}
+        self.positions: Dict[str, float] = {}
+        self.cash: Optional[float] = None
+        self._synced_at = 0.0
+        self._cond = threading.Condition()
+        self._queue: "queue.Queue[Optional[TrackedOrder]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._worker, name=f"exec-{i}", daemon=True) for i in range(workers)]
+        self.streaming = hasattr(broker, "subscribe")
+        if self.streaming:
+            broker.subscribe(self.on_update)
+        else:
+            self._threads.append(threading.Thread(target=self._poll_loop, name="exec-poll", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    # ----- Position book -----
+
+    def sync(self):
+        """Replace the book with the broker's account and positions."""
+        snap = PortfolioSnapshot.fetch(self.broker)
+        with self._cond:
+            self.cash, self.positions = snap.cash, dict(snap.positions)
+            self._synced_at = time.time()
+
+    def snapshot(self) -> PortfolioSnapshot:
+        """Snapshot from the in-memory book (re-synced from the broker when stale)."""
+        if self.cash is None or time.time() - self._synced_at >= self.resync_seconds:
+            self.sync()
+        with self._cond:
+            return PortfolioSnapshot(cash=self.cash, positions=dict(self.positions))
+
+    def _apply_fill(self, order: Order, qty: float, price: Optional[float]):
+        if qty <= 0:
+            return
+        sign = 1 if order.side == "buy" else -1
+        held = self.positions.get(order.symbol, 0.0) + sign * qty
+        if abs(held) < 1e-9:
+            self.positions.pop(order.symbol, None)
+        else:
+            self.positions[order.symbol] = held
+        if self.cash is not None and (price or order.price):
+            self.cash -= sign * qty * (price or order.price)
+
+    # ----- Updates -----
+
+    def on_update(self, client_order_id, status, filled_qty=0.0, filled_avg_price=None, error=None):
+        """Apply one order update (from the stream, a poll or a submit response)."""
+        with self._cond:
+            t = self.orders.get(client_order_id)
+            if t is None:
+                return
+            filled_qty = float(filled_qty or 0)
+            if filled_qty > t.filled_qty:
+                self._apply_fill(t.order, filled_qty - t.filled_qty, filled_avg_price)
+                t.filled_qty = filled_qty
+            t.filled_avg_price = filled_avg_price or t.filled_avg_price
+            if not t.done:
+                t.status = status
+            t.error = error or t.error
+            t.updated_at = time.time()
+            self._cond.notify_all()
+
+    # ----- Submission -----
+
+    def submit(self, orders: Iterable[Order], cycle=None, wait_ack=True) -> List[TrackedOrder]:
+        """Queue orders (sells, then buys once every sell is acknowledged). Returns their trackers.
+
+        With `wait_ack=False` nothing blocks: buys are queued right behind the sells.
+        """
+        cycle = cycle if cycle is not None else int(time.time())
+        tracked = []
+        for side in ("sell", "buy"):
+            batch = []
+            with self._cond:
+                for order in orders:
+                    if order.side != side:
+                        continue
+                    coid = client_order_id(order, cycle)
+                    t = self.orders.get(coid)
+                    if t is None:  # an already-known id is the same order: don't send it twice
+                        t = self.orders[coid] = TrackedOrder(order, coid)
+                        batch.append(t)
+                    tracked.append(t)
+            for t in batch:
+                self._queue.put(t)
+            if side == "sell" and batch and wait_ack:
+                self._wait_for(batch, lambda t: t.status != "queued", EXEC_WAIT_SECONDS)
+        return tracked
+
+    def _send(self, t: TrackedOrder):
+        o = t.order
+        if o.side == "sell":
+            return self.broker.market_sell_all(o.symbol, qty=o.qty, client_order_id=t.client_order_id)
+        return self.broker.market_buy_qty(o.symbol, int(o.qty), bracket=True, entry_price=o.price,
+                                          stop_loss_pct=o.stop_loss_pct, take_profit_pct=o.take_profit_pct,
+                                          client_order_id=t.client_order_id)
+
+    def _worker(self):
+        while True:
+            t = self._queue.get()
+            if t is None:
+                return
+            t.submitted_at = time.time()
+            try:
+                result = self._send(t)
+            except Exception as e:
+                if _is_duplicate(e):
+                    self._refresh(t, adopt=True)
+                    continue
+                print(f"❌ {t.order.side.upper()} {t.order.symbol} failed: {e}")
+                self.on_update(t.client_order_id, "failed", error=str(e))
+                continue
+            if result is None:  # nothing to sell
+                self.on_update(t.client_order_id, "canceled", error="no position")
+            else:
+                self.on_update(t.client_order_id, **order_state(result))
+
+    # ----- Tracking -----
+
+    def _refresh(self, t: TrackedOrder, adopt=False):
+        """Poll one order's status. `adopt` marks an order a previous run placed (duplicate id):
+        whatever it had filled is already in the book synced from the broker, so it's
+        recorded on the tracker without being applied again."""
+        try:
+            state = self.broker.get_order_status(t.client_order_id)
+        except Exception as e:
+            print(f"⚠️ Status check for {t.order.symbol} failed: {e}")
+            return
+        if not state:
+            return
+        if adopt:
+            with self._cond:
+                t.filled_qty = max(t.filled_qty, float(state.get("filled_qty") or 0))
+        self.on_update(t.client_order_id, **state)
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_seconds):
+            with self._cond:
+                open_orders = [t for t in self.orders.values() if t.status != "queued" and not t.done]
+            for t in open_orders:
+                self._refresh(t)
+
+    def _wait_for(self, tracked, predicate, timeout):
+        deadline = time.time() + timeout
+        with self._cond:
+            while not all(predicate(t) for t in tracked):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def wait(self, tracked: List[TrackedOrder], timeout=EXEC_WAIT_SECONDS) -> bool:
+        """Block until every order is filled/terminal or `timeout` passes. True if all finished."""
+        return self._wait_for(tracked, lambda t: t.done, timeout)
+
+    def close(self, timeout=EXEC_WAIT_SECONDS):
+        """Stop the workers once the queue drains (and the poller), waiting up to `timeout` each."""
+        self._stop.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout)
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Real-time exit monitor for open positions:
+- consumes a quote stream (polls the quote cache, or replays a local NDJSON/JSON
+  file of {"symbol", "price", "ts"} ticks)
+- keeps each position's stop-loss, take-profit and trailing-stop levels in a
+  TriggerIndex, so a tick only looks at its own symbol's levels
+- re-reads the merged recommendations when they change and exits positions whose
+  score fell below EXIT_BELOW_CONFIDENCE (or that got a whale_sell) intraday,
+  instead of waiting for the next auto_trade run
+- sends exits through the ExecutionEngine from a sender thread without waiting
+  on fills (many stops firing at once go out concurrently, and a slow broker
+  never stalls tick processing); client order ids are per position, so a level
+  that re-triggers after a resync can't sell twice
+
+Positions are re-synced from the broker every MONITOR_RESYNC_SECONDS. A bracket
+order's stop/limit legs hold all of a position's shares, so BrokerAlpaca cancels
+the symbol's open sell orders before each exit. With STOP_LOSS_PCT and
+TAKE_PROFIT_PCT at 0, buys go out without brackets and only the trailing stop
+and score exits (enforced here) apply. A failed exit is retried after the next
+resync, at most MONITOR_MAX_ATTEMPTS times per position.
+"""
+import argparse
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from policy_engine import DEFAULT_PARAMS, PolicyParams, should_exit
+from portfolio import Order, is_whale_sell
+from whale_stream import replay_source as _replay
+
+MONITOR_POLL_SECONDS = float(os.getenv("MONITOR_POLL_SECONDS", "5"))
+MONITOR_RESYNC_SECONDS = float(os.getenv("MONITOR_RESYNC_SECONDS", "60"))
+MONITOR_SCORE_SECONDS = float(os.getenv("MONITOR_SCORE_SECONDS", "60"))  # recommendations mtime check
+MONITOR_BATCH = int(os.getenv("MONITOR_BATCH", "1000"))
+MONITOR_MAX_ATTEMPTS = int(os.getenv("MONITOR_MAX_ATTEMPTS", "3"))
+# A trailing entry is re-indexed only once the stop has risen this fraction (bounds heap churn)
+TRAIL_STEP = float(os.getenv("MONITOR_TRAIL_STEP", "0.001"))
+
+
+class Lot:
+    """One open position's exit levels. `high` is the highest price seen since it was indexed."""
+
+    __slots__ = ("id", "symbol", "qty", "entry", "stop", "target", "trail_pct", "high", "version")
+
+    def __init__(self, id, symbol, qty, entry, stop, target, trail_pct):
+        self.id = id
+        self.symbol = symbol
+        self.qty = qty
+        self.entry = entry
+        self.stop = stop          # fixed stop level (None = none)
+        self.target = target      # take-profit level (None = none)
+        self.trail_pct = trail_pct
+        self.high = entry
+        self.version = 0
+
+    def stop_level(self) -> Optional[float]:
+        trail = self.high * (1 - self.trail_pct) if self.trail_pct > 0 else None
+        if self.stop is None or trail is None:
+            return trail if self.stop is None else self.stop
+        return max(self.stop, trail)
+
+
+class TriggerIndex:
+    """Stop / target / trailing levels for open positions, in per-symbol heaps.
+
+    Each symbol has a max-heap of stop levels and a min-heap of targets, so a tick
+    checks only the top of its symbol's heaps: O(1) when nothing fires, O(log k)
+    per fired level (k = lots in that symbol). A trailing stop that rises pushes a
+    new entry and leaves the old one to be dropped lazily (entries carry the lot's
+    version); a heap is compacted when stale entries outnumber live ones.
+    """
+
+    def __init__(self, trail_step=TRAIL_STEP):
+        self.trail_step = trail_step
+        self.lots: Dict[str, Lot] = {}
+        self._by_symbol: Dict[str, Dict[str, Lot]] = {}
+        self._stops: Dict[str, list] = {}    # symbol -> [(-level, seq, lot id, version)]
+        self._targets: Dict[str, list] = {}  # symbol -> [(level, seq, lot id)]
+        self._trailing: Dict[str, List[Lot]] = {}
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self.lots)
+
+    def __contains__(self, lot_id):
+        return lot_id in self.lots
+
+    def add(self, lot: Lot):
+        self.remove(lot.id)
+        self.lots[lot.id] = lot
+        self._by_symbol.setdefault(lot.symbol, {})[lot.id] = lot
+        if lot.trail_pct > 0:
+            self._trailing.setdefault(lot.symbol, []).append(lot)
+        self._push_stop(lot)
+        if lot.target is not None:
+            heapq.heappush(self._targets.setdefault(lot.symbol, []), (lot.target, next(self._seq), lot.id))
+
+    def remove(self, lot_id) -> Optional[Lot]:
+        lot = self.lots.pop(lot_id, None)
+        if lot is None:
+            return None
+        lots = self._by_symbol[lot.symbol]
+        lots.pop(lot_id)
+        if lot.trail_pct > 0:
+            self._trailing[lot.symbol].remove(lot)
+        if not lots:  # last lot of the symbol: drop its heaps outright
+            for table in (self._by_symbol, self._stops, self._targets, self._trailing):
+                table.pop(lot.symbol, None)
+        return lot
+
+    def symbols(self):
+        return list(self._by_symbol)
+
+    def _push_stop(self, lot: Lot):
+        level = lot.stop_level()
+        if level is None:
+            return
+        lot.version += 1
+        heap = self._stops.setdefault(lot.symbol, [])
+        heapq.heappush(heap, (-level, next(self._seq), lot.id, lot.version))
+        if len(heap) > 2 * len(self._by_symbol[lot.symbol]) + 8:
+            live = [e for e in heap if e[2] in self.lots and self.lots[e[2]].version == e[3]]
+            heapq.heapify(live)
+            self._stops[lot.symbol] = live
+
+    def tick(self, symbol, price) -> List[tuple]:
+        """Apply one quote; returns [(lot, reason, level)] for every level it crossed (lots removed)."""
+        if symbol not in self._by_symbol:
+            return []
+        for lot in self._trailing.get(symbol, ()):
+            if price > lot.high:
+                old = lot.stop_level()
+                lot.high = price
+                if lot.stop_level() > old * (1 + self.trail_step):
+                    self._push_stop(lot)
+
+        fired = []
+        stops = self._stops.get(symbol)
+        while stops and -stops[0][0] >= price:
+            level, _, lot_id, version = heapq.heappop(stops)
+            lot = self.lots.get(lot_id)
+            if lot is None or lot.version != version:
+                continue  # removed, or superseded by a higher trailing level
+            # the indexed level can lag the trailing stop by < trail_step; report the real one
+            reason = "trailing_stop" if lot.stop is None or lot.stop_level() > lot.stop else "stop_loss"
+            fired.append((lot, reason, lot.stop_level()))
+            self.remove(lot_id)
+        targets = self._targets.get(symbol)
+        while targets and targets[0][0] <= price:
+            level, _, lot_id = heapq.heappop(targets)
+            if lot_id in self.lots:
+                fired.append((self.lots[lot_id], "take_profit", level))
+                self.remove(lot_id)
+        return fired
+
+
+def lot_for(symbol, qty, entry, params: PolicyParams = DEFAULT_PARAMS) -> Lot:
+    """A long position's levels from the policy's percentages (a 0 percentage = no such level)."""
+    return Lot(f"{symbol}|{qty:g}|{entry:g}", symbol, qty, entry,
+               stop=entry * (1 - params.stop_loss_pct) if params.stop_loss_pct > 0 else None,
+               target=entry * (1 + params.take_profit_pct) if params.take_profit_pct > 0 else None,
+               trail_pct=params.trailing_stop_pct)
+
+
+# ----- Quote sources -----
+
+def replay_source(path, batch_size=MONITOR_BATCH):
+    """Batches of {"symbol", "price", "ts"} ticks from a local NDJSON (one per line) or JSON array file."""
+    return _replay(path, batch_size)
+
+
+def poll_source(symbols, interval=MONITOR_POLL_SECONDS):
+    """Batches of ticks for `symbols()` (the currently held symbols) from the quote cache, forever."""
+    import quotes
+    while True:
+        now = time.time()
+        prices = quotes.get_quotes(symbols())
+        yield [{"symbol": s, "price": p, "ts": now} for s, p in prices.items() if p]
+        time.sleep(interval)
+
+
+# ----- Monitor -----
+
+class ExitMonitor:
+    def __init__(self, broker, engine=None, params: PolicyParams = DEFAULT_PARAMS, recs_path=None,
+                 dry_run=False, resync_seconds=MONITOR_RESYNC_SECONDS, score_seconds=MONITOR_SCORE_SECONDS):
+        self.broker = broker
+        self.engine = engine
+        self.params = params
+        self.recs_path = recs_path
+        self.dry_run = dry_run
+        self.resync_seconds = resync_seconds
+        self.score_seconds = score_seconds
+        self.index = TriggerIndex()
+        self.ticks = 0
+        self.exits: List[Order] = []
+        self._pending = set()  # lot ids with an exit in flight (not re-indexed on resync)
+        self._attempts: Dict[str, int] = {}  # lot id -> failed exits (a retry needs a fresh client order id)
+        self._synced_at = self._scored_at = 0.0
+        self._recs_mtime = None
+        self._outbox: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._sender = threading.Thread(target=self._send_loop, name="exit-sender", daemon=True)
+        self._sender.start()
+
+    def sync(self):
+        """Index every held position (entry = broker's average entry price); drop sold ones."""
+        held = self.broker.get_positions()
+        lots = {}
+        for symbol, pos in held.items():
+            qty = float(getattr(pos, "qty", 0) or 0)
+            entry = float(getattr(pos, "avg_entry_price", 0) or 0)
+            if qty > 0 and entry > 0:
+                lot = lot_for(symbol, qty, entry, self.params)
+                lots[lot.id] = lot
+        for lot_id in list(self.index.lots):
+            if lot_id not in lots:
+                self.index.remove(lot_id)
+        self._pending &= set(lots)
+        for lot_id, lot in lots.items():
+            if lot_id not in self.index and lot_id not in self._pending:
+                self.index.add(lot)
+        self._synced_at = time.time()
+
+    def check_scores(self):
+        """Exit held symbols whose merged score dropped below the exit threshold (or got a whale_sell)."""
+        if not self.recs_path or not os.path.exists(self.recs_path):
+            return
+        mtime = os.path.getmtime(self.recs_path)
+        if mtime == self._recs_mtime:
+            return
+        self._recs_mtime = mtime
+        from auto_trade import load_recommendations
+        from instruments import canonical
+        recs = load_recommendations(self.recs_path)
+        for lot in list(self.index.lots.values()):
+            rec = recs.get(canonical(lot.symbol))
+            if rec is None:
+                continue  # not ranked this run: left to auto_trade's reconcile
+            if is_whale_sell(rec) or should_exit(rec.get("score"), self.params):
+                reason = "whale_sell signal" if is_whale_sell(rec) else f"score {rec.get('score')} below exit"
+                self.index.remove(lot.id)
+                self._exit(lot, reason, None)
+
+    def on_batch(self, batch):
+        now = time.time()
+        if now - self._synced_at >= self.resync_seconds:
+            self.sync()
+        if now - self._scored_at >= self.score_seconds:
+            self.check_scores()
+            self._scored_at = now
+        tick = self.index.tick
+        for q in batch:
+            price = q.get("price")
+            if price:
+                for lot, reason, level in tick(q["symbol"], float(price)):
+                    self._exit(lot, f"{reason} {level:.4g} hit @ {price}", price)
+        self.ticks += len(batch)
+
+    def _exit(self, lot: Lot, reason, price):
+        order = Order(lot.symbol, "sell", lot.qty, price=price, reason=reason)
+        self.exits.append(order)
+        print(f"🔻 EXIT {lot.symbol} qty={lot.qty:g}: {reason}")
+        if not self.dry_run:
+            self._pending.add(lot.id)
+            self._outbox.put((lot, order))
+
+    def _send_loop(self):
+        from portfolio import submit_orders
+        inflight = []  # (lot, trackers) not yet filled / terminal
+        while True:
+            try:
+                item = self._outbox.get(timeout=0.2 if inflight else None)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                return
+            if item:
+                lot, order = item
+                if self.engine is not None:
+                    cycle = f"exit|{lot.id}|{self._attempts.get(lot.id, 0)}"
+                    inflight.append((lot, self.engine.submit([order], cycle=cycle, wait_ack=False)))
+                elif isinstance(submit_orders(self.broker, [order])[0][1], Exception):
+                    self._failed(lot)
+            waiting = []
+            for lot, tracked in inflight:
+                if not all(t.done for t in tracked):
+                    waiting.append((lot, tracked))
+                elif any(t.status in ("failed", "rejected") for t in tracked):
+                    self._failed(lot)
+            inflight = waiting
+
+    def _failed(self, lot: Lot):
+        attempts = self._attempts[lot.id] = self._attempts.get(lot.id, 0) + 1
+        if attempts >= MONITOR_MAX_ATTEMPTS:
+            print(f"❌ Giving up on exiting {lot.symbol} after {attempts} failed attempts")
+            return  # stays pending: not re-indexed until the position changes
+        self._pending.discard(lot.id)  # re-indexed on the next resync
+
+    def run(self, source, max_seconds=None):
+        """Feed quote batches from `source` through the index until it ends (or `max_seconds`)."""
+        self.sync()
+        started = time.perf_counter()
+        for batch in source:
+            self.on_batch(batch)
+            if max_seconds is not None and time.perf_counter() - started >= max_seconds:
+                break
+        elapsed = time.perf_counter() - started
+        print(f"👀 {self.ticks} ticks in {elapsed:.2f}s ({self.ticks / max(elapsed, 1e-9):,.0f}/s), "
+              f"{len(self.exits)} exits, {len(self.index)} positions still guarded")
+        return self
+
+    def close(self, timeout=30):
+        self._outbox.put(None)
+        self._sender.join(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", help="NDJSON/JSON tick file to replay instead of polling quotes")
+    parser.add_argument("--interval", type=float, default=MONITOR_POLL_SECONDS)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="print exits without sending orders")
+    args = parser.parse_args()
+
+    from auto_trade import RECS_FILE, make_broker
+    from execution import ExecutionEngine
+
+    broker = make_broker(dry_run=args.dry_run)
+    broker.authenticate()
+    engine = None if args.dry_run else ExecutionEngine(broker)
+    monitor = ExitMonitor(broker, engine, recs_path=RECS_FILE, dry_run=args.dry_run)
+    try:
+        if args.replay:
+            print(f"🚀 Replaying quotes from {args.replay}...")
+            monitor.run(replay_source(args.replay))
+        else:
+            print(f"🚀 Monitoring exits every {args.interval:g}s...")
+            monitor.run(poll_source(monitor.index.symbols, args.interval), max_seconds=args.max_seconds)
+    finally:
+        monitor.close()
+        if engine:
+            engine.close()
+
+
+if __name__ == "__main__":
+    main()
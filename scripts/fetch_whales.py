@@ -1,14 +1,15 @@
 #!/usr/bin/env python3
 import os
 import json
-import requests
 
-DEXSCREENER_URL = "https://api.dexscreener.com/latest/dex/trades"
+import http_client
+
+DEXSCREENER_URL = os.getenv("DEXSCREENER_URL", "https://api.dexscreener.com").rstrip("/")
 OUTPUT_FILE = "data/whales.json"
 
 def fetch_whale_trades(limit=50):
-    url = f"{DEXSCREENER_URL}?limit={limit}"
-    resp = requests.get(url)
+    url = f"{DEXSCREENER_URL}/latest/dex/trades?limit={limit}"
+    resp = http_client.get(url)
 
     if resp.status_code != 200:
         print(f"❌ Dexscreener API error: {resp.status_code}")
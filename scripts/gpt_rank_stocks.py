@@ -1,17 +1,39 @@
 import json
+import os
 import sys
-import requests
 from pathlib import Path
 
+import numpy as np
+
+import dataset_store
+import instruments
+import metrics
+import scoring
+import whale_stream
+
 DATA_PATH = Path("data/stocks.json")
 OUTPUT_PATH = Path("data/gpt_recommendations.json")
 
-DEX_API = "https://api.dexscreener.com/latest/dex/search?q=ETH"  # you can expand query to multiple tokens
+# Universe columns the scoring factors may use
+RANK_COLUMNS = ["symbol", "price", "marketCap", "volume", "changePct"]
+
+# Use whale_stream's published signals when they're at most this old (seconds)
+WHALE_SIGNALS_MAX_AGE = float(os.getenv("WHALE_SIGNALS_MAX_AGE", "900"))
+
+DEXSCREENER_URL = os.getenv("DEXSCREENER_URL", "https://api.dexscreener.com").rstrip("/")
+DEX_API = f"{DEXSCREENER_URL}/latest/dex/search?q=ETH"  # you can expand query to multiple tokens
 
 def fetch_whale_signals():
-    """Fetch whale activity from Dexscreener."""
+    """Fetch whale activity, preferring fresh signals published by whale_stream.py."""
+    streamed = whale_stream.load_signals(max_age=WHALE_SIGNALS_MAX_AGE)
+    if streamed is not None:
+        print(f"🐋 Whale signals from stream: {len(streamed)}")
+        return streamed
+
+    import http_client  # requests is only needed when there are no streamed signals
+
     try:
-        resp = requests.get(DEX_API, timeout=10)
+        resp = http_client.get(DEX_API, timeout=10)
         data = resp.json().get("pairs", [])
     except Exception as e:
         print(f"⚠️ Dexscreener fetch failed: {e}")
@@ -37,52 +59,54 @@ def fetch_whale_signals():
     return signals
 
 
+def _plain(value):
+    """Column value → JSON-friendly python number (integral floats back to int, NaN to None)."""
+    if value is None or value != value:
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+@metrics.timed()
 def rank_stocks(limit=20):
-    if not DATA_PATH.exists():
+    if not dataset_store.exists(DATA_PATH):
         print("❌ ERROR: stocks.json not found. Run update_universe first.")
         sys.exit(1)
 
-    with open(DATA_PATH, "r") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            print("❌ ERROR: Invalid JSON format in stocks.json")
-            sys.exit(1)
+    try:
+        cols, _ = dataset_store.load_columns(DATA_PATH, columns=RANK_COLUMNS)
+    except json.JSONDecodeError:
+        print("❌ ERROR: Invalid JSON format in stocks.json")
+        sys.exit(1)
 
-    if not isinstance(data, list) or not data:
+    if "symbol" not in cols or not len(cols["symbol"]):
         print("❌ ERROR: stocks.json is empty or not in list format.")
         sys.exit(1)
+    for col in ("price", "marketCap"):
+        cols.setdefault(col, [None] * len(cols["symbol"]))
 
-    whale_signals = fetch_whale_signals()
-
-    ranked = []
-    for stock in data:
-        symbol = stock.get("symbol")
-        price = stock.get("price")
-        market_cap = stock.get("marketCap")
-
-        if price is None or market_cap is None:
-            continue
-
-        # Base score heuristic (normalize marketCap a bit)
-        score = (market_cap / 1e9) ** 0.5 if market_cap else 0
+    # Dexscreener tokens and stock tickers meet on canonical symbols (BRK-B == BRK.B); token
+    # aliases (WETH -> ETH) are not applied here, or wrapped-ether flow would boost the ETH stock
+    whale_signals = instruments.canonical_keys(fetch_whale_signals())
+    canon = np.array([instruments.canonical(s) for s in np.asarray(cols["symbol"]).tolist()], dtype=str)
 
-        # Apply whale boost if available
-        if symbol in whale_signals:
-            score += whale_signals[symbol]["boost"]
+    scores, eligible = scoring.score({**cols, "symbol": canon}, whale_signals)
+    scores = np.round(scores, 3)  # rank on the published (rounded) score, ties in file order
+    top = scoring.top_n(scores, limit, eligible)
 
+    ranked = []
+    for i in top.tolist():
+        symbol = str(cols["symbol"][i])
         ranked.append({
             "symbol": symbol,
-            "price": price,
-            "marketCap": market_cap,
-            "score": round(score, 3),
-            "reason": whale_signals.get(symbol, {}).get("signal", "marketCap heuristic")
+            "kind": "stock",
+            "price": _plain(cols["price"][i]),
+            "marketCap": _plain(cols["marketCap"][i]),
+            "score": round(float(scores[i]), 3),
+            "reason": whale_signals.get(canon[i], {}).get("signal", "marketCap heuristic")
         })
 
-    ranked = sorted(ranked, key=lambda x: x["score"], reverse=True)[:limit]
-
-    with open(OUTPUT_PATH, "w") as f:
-        json.dump({"ranked": ranked}, f, indent=2)
+    dataset_store.save(OUTPUT_PATH, ranked, json_key="ranked")
 
     print(f"✅ Ranked {len(ranked)} stocks with whale signals merged")
     return ranked
@@ -1,12 +1,51 @@
 #!/usr/bin/env python3
 import os
 import json
-import openai
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+import dataset_store
+import metrics
 
 WHALES_FILE = "data/whales.json"
-OUTPUT_FILE = "data/gpt_recommendations.json"
+OUTPUT_FILE = os.getenv("WHALE_RECS_FILE", "data/gpt_recommendations.json")
+
+MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Rough token budget for the trades in one request (prompt text excluded)
+CHUNK_TOKENS = int(os.getenv("GPT_CHUNK_TOKENS", "3000"))
+GPT_MAX_WORKERS = int(os.getenv("GPT_MAX_WORKERS", "4"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "data/cache/llm")
+# Cached answers older than this are asked again (0 = never expire)
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "24"))
+
+PROMPT = """
+You are a crypto trading AI. Analyze whale trades and assign confidence scores
+between 0.0 and 1.0 for BUY signals only. Higher = stronger conviction.
+
+Trades:
+{trades}
+
+Return JSON array with objects:
+[{{"symbol": "XXX", "score": 0.85, "reason": "Whales aggressively buying"}}]
+"""
+
+
+class OpenAIChatClient:
+    """Default model client. Anything with the same `complete(model, prompt)` works."""
+
+    def __init__(self, api_key=None):
+        from openai import OpenAI  # deferred so a fake client needs no openai install
+        self._client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+
+    def complete(self, model: str, prompt: str) -> str:
+        response = self._client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0
+        )
+        return response.choices[0].message.content
+
 
 def load_whales():
     if not os.path.exists(WHALES_FILE):
@@ -15,34 +54,140 @@ def load_whales():
     with open(WHALES_FILE, "r") as f:
         return json.load(f)
 
-def analyze_with_gpt(whales):
-    """Send whale trades to GPT and get ranked signals."""
-    prompt = f"""
-You are a crypto trading AI. Analyze whale trades and assign confidence scores
-between 0.0 and 1.0 for BUY signals only. Higher = stronger conviction.
 
-Trades:
-{json.dumps(whales[:20], indent=2)}
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1  # ~4 chars per token for JSON-ish English
 
-Return JSON array with objects:
-[{{"symbol": "XXX", "score": 0.85, "reason": "Whales aggressively buying"}}]
+
+def chunk_trades(whales, token_budget=CHUNK_TOKENS):
+    """Split trades into batches whose serialized size fits the token budget.
+
+    Trades are deduped by txHash and ordered by symbol so a symbol's trades stay
+    together and unchanged input always yields the same batches (and cache keys).
     """
+    seen, unique = set(), []
+    for w in whales:
+        tx = w.get("txHash")
+        if tx and tx in seen:
+            continue
+        seen.add(tx)
+        unique.append(w)
+    unique.sort(key=lambda w: (str(w.get("symbol")), str(w.get("timestamp")), str(w.get("txHash"))))
+
+    chunks, current, used = [], [], 0
+    for w in unique:
+        cost = estimate_tokens(json.dumps(w, separators=(",", ":")))
+        if current and used + cost > token_budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(w)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
 
-    response = openai.ChatCompletion.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0
-    )
 
+def _cache_key(model, prompt_template, payload):
+    return hashlib.sha256(json.dumps([model, prompt_template, payload]).encode()).hexdigest()
+
+
+def _read_cached(path, ttl_hours):
+    """A cached answer that is still fresh and parses, else None."""
     try:
-        return json.loads(response.choices[0].message["content"])
+        with open(path, "r") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    stored_at = entry.get("stored_at", os.path.getmtime(path))
+    if ttl_hours and time.time() - stored_at > ttl_hours * 3600:
+        return None
+    return entry["content"] if _parse(entry.get("content")) is not None else None
+
+
+def cached_complete(client, model, trades, cache_dir=LLM_CACHE_DIR, ttl_hours=LLM_CACHE_TTL_HOURS):
+    """Ask the model about one batch, reusing a fresh stored answer for identical input.
+
+    Only answers that parse are stored, so a garbled completion is asked again next run.
+    """
+    payload = json.dumps(trades, separators=(",", ":"))
+    path = os.path.join(cache_dir, f"{_cache_key(model, PROMPT, payload)}.json") if cache_dir else None
+    cached = _read_cached(path, ttl_hours) if path else None
+    if cached is not None:
+        metrics.incr("llm_cache_hits", model=model)
+        return cached, True
+
+    metrics.incr("llm_requests", model=model)
+    with metrics.span("openai.complete", model=model):
+        content = client.complete(model, PROMPT.format(trades=payload))
+    if path and _parse(content) is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"model": model, "stored_at": time.time(), "content": content}, f)
+        os.replace(tmp, path)
+    return content, False
+
+
+def _parse(content):
+    """The completion's JSON array, or None if it isn't one."""
+    text = (content or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        recs = json.loads(text)
     except Exception:
+        return None
+    return recs if isinstance(recs, list) else None
+
+
+def parse_scores(content):
+    recs = _parse(content)
+    if recs is None:
         print("⚠️ GPT output parse error")
         return []
+    return [r for r in recs if isinstance(r, dict) and r.get("symbol")]
+
+
+def merge_scores(batches):
+    """Dedupe per-symbol scores across batches, keeping the strongest conviction."""
+    best = {}
+    for recs in batches:
+        for r in recs:
+            try:
+                score = min(max(float(r.get("score", 0)), 0.0), 1.0)
+            except (TypeError, ValueError):
+                continue
+            symbol = str(r["symbol"]).upper()
+            if symbol not in best or score > best[symbol]["score"]:
+                best[symbol] = {"symbol": symbol, "kind": "crypto", "score": score, "reason": r.get("reason", "")}
+    return sorted(best.values(), key=lambda r: r["score"], reverse=True)
+
+
+@metrics.timed()
+def analyze_with_gpt(whales, client=None, model=MODEL, max_workers=GPT_MAX_WORKERS, cache_dir=LLM_CACHE_DIR):
+    """Send all whale trades to GPT in token-budgeted batches and merge the ranked signals."""
+    chunks = chunk_trades(whales)
+    if not chunks:
+        return []
+    client = client or OpenAIChatClient()
+
+    def run(trades):
+        try:
+            return cached_complete(client, model, trades, cache_dir)
+        except Exception as e:
+            print(f"⚠️ GPT request failed for a batch of {len(trades)} trades: {e}")
+            return None, False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(run, chunks))
+
+    hits = sum(1 for _, cached in results if cached)
+    print(f"🤖 {len(chunks)} GPT batches ({hits} from cache)")
+    return merge_scores(parse_scores(content) for content, _ in results if content)
+
 
 def save_recommendations(recs):
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(recs, f, indent=2)
+    dataset_store.save(OUTPUT_FILE, recs)
     print(f"✅ Saved GPT recommendations → {OUTPUT_FILE}")
 
 def main():
@@ -0,0 +1,237 @@
+"""Shared HTTP client for the data fetchers.
+
+- one keep-alive `requests.Session` with a sized connection pool
+- per-host token-bucket rate limits
+- a default timeout on every request
+- an optional response cache (memory LRU + disk, TTL) keyed by a hash of the
+  request, which also lets runs be replayed offline (HTTP_OFFLINE=true)
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from ratelimit import TokenBucket
+
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+# Default cache TTL in seconds for every GET (0 = cache only when a call asks for it)
+CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "0"))
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "data/cache/http")
+CACHE_MAX_MEMORY_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_MEMORY_ENTRIES", "1024"))
+CACHE_MAX_DISK_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_DISK_ENTRIES", "20000"))
+# Serve everything from the cache (ignoring TTLs) and never touch the network
+OFFLINE = os.getenv("HTTP_OFFLINE", "false").lower() == "true"
+
+# "host=requests_per_minute,..." e.g. "api.coingecko.com=30,api.dexscreener.com=300"
+RATE_LIMITS = os.getenv("HTTP_RATE_LIMITS", "api.coingecko.com=30,api.dexscreener.com=300")
+
+# Query parameters that carry credentials; never part of a cache key
+SECRET_PARAMS = {"apikey", "api_key", "apiKey", "token", "key"}
+
+_session = None
+_session_lock = threading.Lock()
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled session (connections are reused across calls and threads)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def set_rate_limit(host: str, requests_per_minute: float, burst: float = None):
+    """Throttle every request to `host` through one shared token bucket."""
+    with _limiters_lock:
+        _limiters[host] = TokenBucket.per_minute(requests_per_minute, burst)
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def _load_rate_limits(spec: str):
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        host, _, rpm = item.partition("=")
+        try:
+            set_rate_limit(host.strip(), float(rpm))
+        except ValueError:
+            print(f"⚠️ Ignoring bad HTTP_RATE_LIMITS entry: {item}")
+
+
+_load_rate_limits(RATE_LIMITS)
+
+
+def _throttle(url: str):
+    limiter = _limiters.get(host_of(url))
+    if limiter:
+        limiter.acquire()
+
+
+def redact_url(url: str) -> str:
+    """`url` with credential query parameters masked (what the disk cache stores)."""
+    parts = urlsplit(url)
+    query = [(k, "REDACTED" if k in SECRET_PARAMS else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+def cache_key(method: str, url: str, params=None) -> str:
+    """Hash of the request, with credentials stripped so replays don't need keys."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += list(params.items()) if isinstance(params, dict) else list(params)
+    query = sorted((k, str(v)) for k, v in query if k not in SECRET_PARAMS)
+    canonical = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+    return hashlib.sha256(f"{method.upper()} {canonical}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + disk) cache of successful responses."""
+
+    def __init__(self, directory=CACHE_DIR, max_memory=CACHE_MAX_MEMORY_ENTRIES,
+                 max_disk=CACHE_MAX_DISK_ENTRIES):
+        self.directory = directory
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key, ttl, now=None):
+        """Return the cached entry if younger than `ttl` seconds (ttl=None: any age)."""
+        now = now or time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None and self.directory:
+            path = self._path(key)
+            try:
+                with open(path, "r") as f:
+                    entry = json.load(f)
+                os.utime(path)  # keeps disk eviction LRU rather than FIFO
+            except (OSError, ValueError):
+                return None
+            self._remember(key, entry)
+        if entry is None or (ttl is not None and now - entry["stored_at"] > ttl):
+            return None
+        return entry
+
+    def put(self, key, response):
+        entry = {
+            "stored_at": time.time(),
+            "url": redact_url(response.url),
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+        self._remember(key, entry)
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self._disk_writes += 1
+        if self._disk_writes % 100 == 0:
+            self.evict_disk()
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def evict_disk(self):
+        """Drop least-recently-used files beyond the disk entry cap."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+        excess = len(files) - self.max_disk
+        if excess > 0:
+            for _, path in sorted(files)[:excess]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _to_response(entry) -> requests.Response:
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.url = entry["url"]
+    response.headers.update(entry["headers"])
+    response._content = base64.b64decode(entry["body"])
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers) or "utf-8"
+    response.from_cache = True
+    return response
+
+
+def get(url, params=None, timeout=None, cache_ttl=None, **kwargs) -> requests.Response:
+    """GET through the shared session, host rate limit and (optionally) the response cache.
+
+    `cache_ttl` (seconds) overrides HTTP_CACHE_TTL for this call; 0 disables caching.
+    Only 200 responses are cached. In offline mode a cache miss raises ConnectionError.
+    """
+    ttl = CACHE_TTL if cache_ttl is None else cache_ttl
+    key = cache_key("GET", url, params) if (ttl > 0 or OFFLINE) else None
+    host = host_of(url)
+
+    if key:
+        entry = response_cache.get(key, None if OFFLINE else ttl)
+        if entry is not None:
+            metrics.incr("http_cache_hits", host=host)
+            return _to_response(entry)
+        if OFFLINE:
+            raise requests.ConnectionError(f"HTTP_OFFLINE: no cached response for {url}")
+
+    with metrics.span("http.throttle", host=host):
+        _throttle(url)
+    with metrics.span("http.get", host=host):
+        response = get_session().get(url, params=params, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+    metrics.incr("http_requests", host=host, status=response.status_code)
+    if response.status_code == 429:
+        metrics.incr("http_429", host=host)
+    response.from_cache = False
+    if key and response.status_code == 200:
+        response_cache.put(key, response)
+    return response
@@ -0,0 +1,176 @@
+"""Instrument registry: one symbol index across stocks, crypto and whale data.
+
+Every universe is loaded once (columnar, memory-mapped where possible) and each
+row's symbol is reduced to a canonical form, so "BRK.B", "BRK-B" and "brk/b" all
+resolve to the same instrument and a lookup is one dict probe:
+
+    reg = default_registry()
+    reg.lookup("BRK-B")        # -> ("stock", row offset)
+    reg.row("BTC", "crypto")   # -> {"symbol": "BTC", "current_price": ..., ...}
+    reg.price("ETH", "crypto") # -> the token's price, never the ETH stock's
+    reg.price(rec["symbol"], rec_kind(rec))
+
+Wrapped-token aliases (WETH -> ETH) only apply to token kinds, so Dexscreener
+flow in WETH never lands on a stock ticker.
+
+`default_registry()` is rebuilt only when one of the source files changes.
+"""
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import dataset_store
+
+STOCKS_FILE = os.getenv("UNIVERSE_FILE", "data/stocks.json")
+CRYPTO_FILE = os.getenv("CRYPTO_FILE", "data/crypto.json")
+WHALE_SIGNALS_FILE = os.getenv("WHALE_SIGNALS_FILE", "data/whale_signals.json")
+
+# Lookup order when a symbol exists in several universes and no kind is asked for
+KINDS = ("stock", "crypto", "whale")
+PRICE_FIELDS = {"stock": "price", "crypto": "current_price"}
+# Wrapped/bridged tokens trade as their underlying (token kinds only)
+ALIASES = {"WETH": "ETH", "WBTC": "BTC"}
+TOKEN_KINDS = ("crypto", "whale")
+# A rec's "kind" (or universe "market") value -> registry kind
+MARKET_KINDS = {"stock": "stock", "stocks": "stock", "crypto": "crypto", "token": "crypto"}
+QUOTE_CURRENCIES = ("USD", "USDT", "USDC")
+
+_SEPARATORS = re.compile(r"[\s./_-]+")
+
+
+def canonical(symbol, kind=None) -> str:
+    """Canonical key for a ticker: upper case, '.' as the class separator, no quote currency.
+
+    BRK-B / brk.b / BRK/B -> BRK.B;  BTC-USD / BTC/USDT -> BTC;  $WETH -> WETH, or ETH
+    for a token kind ("crypto"/"whale").
+    """
+    s = str(symbol or "").strip().upper().lstrip("$")
+    parts = [p for p in _SEPARATORS.split(s) if p]
+    if len(parts) > 1 and parts[-1] in QUOTE_CURRENCIES:
+        parts = parts[:-1]
+    s = ".".join(parts)
+    return ALIASES.get(s, s) if kind in TOKEN_KINDS else s
+
+
+def canonical_keys(mapping: Dict[str, object], kind=None) -> Dict[str, object]:
+    """Re-key a {symbol: value} dict canonically (first key wins on a clash)."""
+    out = {}
+    for key, value in mapping.items():
+        out.setdefault(canonical(key, kind), value)
+    return out
+
+
+def rec_kind(rec) -> Optional[str]:
+    """Registry kind a recommendation refers to: its "kind"/"market" field, else crypto for a
+    quote-currency pair (BTC-USD), else None (unknown: stocks are tried first)."""
+    kind = MARKET_KINDS.get(str(rec.get("kind") or rec.get("market") or "").lower())
+    if kind:
+        return kind
+    parts = [p for p in _SEPARATORS.split(str(rec.get("symbol") or "").upper()) if p]
+    return "crypto" if len(parts) > 1 and parts[-1] in QUOTE_CURRENCIES else None
+
+
+class InstrumentRegistry:
+    def __init__(self):
+        self.tables: Dict[str, dict] = {}        # kind -> {field: column}
+        self.canonical: Dict[str, np.ndarray] = {}  # kind -> canonical symbol per row
+        self._index: Dict[str, Dict[str, int]] = {}  # canonical -> {kind: row}
+
+    def add(self, kind, columns, symbol_field="symbol"):
+        """Index a universe given as columns; the first row wins on duplicate symbols."""
+        symbols = columns.get(symbol_field)
+        symbols = symbols.tolist() if isinstance(symbols, np.ndarray) else list(symbols or [])
+        canon = [canonical(s, kind) for s in symbols]
+        self.tables[kind] = columns
+        self.canonical[kind] = np.array(canon, dtype=str)
+        for row, key in enumerate(canon):
+            if key:
+                self._index.setdefault(key, {}).setdefault(kind, row)
+        return self
+
+    def _row(self, symbol, kind) -> Optional[int]:
+        return self._index.get(canonical(symbol, kind), {}).get(kind)
+
+    def lookup(self, symbol, kind=None) -> Optional[Tuple[str, int]]:
+        """(kind, row) in `kind`, or in the first universe (KINDS order) that has the symbol."""
+        for k in ((kind,) if kind is not None else KINDS):
+            row = self._row(symbol, k)
+            if row is not None:
+                return k, row
+        return None
+
+    def kinds(self, symbol):
+        return tuple(k for k in KINDS if self._row(symbol, k) is not None)
+
+    def __contains__(self, symbol):
+        return bool(self.kinds(symbol))
+
+    def __len__(self):
+        return len(self._index)
+
+    def value(self, kind, row, field):
+        column = self.tables[kind].get(field)
+        if column is None:
+            return None
+        value = column[row]
+        if isinstance(value, np.generic):
+            value = value.item()
+        return None if isinstance(value, float) and value != value else value
+
+    def row(self, symbol, kind=None, fields=None) -> Optional[dict]:
+        found = self.lookup(symbol, kind)
+        if found is None:
+            return None
+        kind, row = found
+        return {f: self.value(kind, row, f) for f in (fields or self.tables[kind])}
+
+    def price(self, symbol, kind=None) -> Optional[float]:
+        """Last known price in `kind`'s universe; without a kind, stocks then crypto."""
+        for k in ((kind,) if kind is not None else PRICE_FIELDS):
+            row = self._row(symbol, k) if k in PRICE_FIELDS else None
+            if row is not None:
+                price = self.value(k, row, PRICE_FIELDS[k])
+                if price:
+                    return float(price)
+        return None
+
+    def join(self, symbols, kind) -> np.ndarray:
+        """Row offset in `kind` for each symbol (-1 where absent)."""
+        rows = (self._row(s, kind) for s in symbols)
+        return np.array([-1 if row is None else row for row in rows], dtype=np.int64)
+
+
+def _mtime(path):
+    paths = (path, os.path.join(dataset_store.columnar_dir(path), dataset_store.SCHEMA_FILE))
+    return max((os.path.getmtime(p) for p in paths if os.path.exists(p)), default=None)
+
+
+def build(stocks=STOCKS_FILE, crypto=CRYPTO_FILE, whale_signals=WHALE_SIGNALS_FILE) -> InstrumentRegistry:
+    reg = InstrumentRegistry()
+    for kind, path in (("stock", stocks), ("crypto", crypto)):
+        if path and dataset_store.exists(path):
+            try:
+                reg.add(kind, dataset_store.load_columns(path)[0])
+            except (ValueError, OSError) as e:
+                print(f"⚠️ Could not index {path}: {e}")
+    if whale_signals:
+        import whale_stream
+        signals = whale_stream.load_signals(whale_signals) or {}
+        if signals:
+            reg.add("whale", {"symbol": list(signals),
+                              "signal": [s.get("signal") for s in signals.values()],
+                              "boost": np.array([s.get("boost", 0.0) for s in signals.values()], dtype=np.float64)})
+    return reg
+
+
+_default = {"key": None, "registry": None}
+
+
+def default_registry() -> InstrumentRegistry:
+    """The per-run registry; rebuilt only when a source file has changed since the last build."""
+    key = tuple(_mtime(p) for p in (STOCKS_FILE, CRYPTO_FILE, WHALE_SIGNALS_FILE))
+    if _default["registry"] is None or _default["key"] != key:
+        _default["registry"], _default["key"] = build(), key
+    return _default["registry"]
@@ -1,35 +1,181 @@
 #!/usr/bin/env python3
-import argparse, json, os
-
-def load_json(path):
-    if not os.path.exists(path):
-        return []
-    with open(path, "r") as f:
-        try:
-            data = json.load(f)
-            if isinstance(data, dict):
-                return data.get("ranked") or data.get("top") or data.get("data") or []
-            if isinstance(data, list):
-                return data
-        except Exception:
-            return []
-    return []
+"""
+Merge recommendation files into one ranked list, deduplicated by symbol.
+
+- inputs are streamed record by record (dataset_store.iter_records: NDJSON,
+  the columnar copy, or incrementally parsed JSON in any of the ranked/top/data shapes)
+- duplicate symbols are combined with MERGE_RULE:
+    max       highest score wins (its record is kept)
+    mean      weighted average of the scores (weights per source, default 1)
+    priority  the first source in priority order that scored the symbol wins; a
+              record with no score defers to the next source (and is kept only
+              if no source scored the symbol)
+- pass 1 keeps only a small per-symbol accumulator; the top N are picked with a
+  heap, and pass 2 re-streams the inputs to pull just those N winning records
+
+Sources are named after their file stem (data/whale_recs.json -> whale_recs)
+unless given as name=path.
+"""
+import argparse
+import heapq
+import json
+import os
+
+import dataset_store
+
+MERGE_RULE = os.getenv("MERGE_RULE", "max")
+MERGE_TOP = int(os.getenv("MERGE_TOP", "0"))  # 0 = keep every symbol
+RULES = ("max", "mean", "priority")
+
+
+def parse_sources(inputs):
+    """["name=path" | "path", ...] -> [(name, path)] in the order given."""
+    sources = []
+    for item in inputs:
+        name, sep, path = item.partition("=")
+        if not sep:
+            path, name = item, os.path.splitext(os.path.basename(item))[0]
+        sources.append((name, path))
+    return sources
+
+
+def parse_weights(spec):
+    weights = {}
+    for item in (spec or "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip():
+            weights[name.strip()] = float(value or 1)
+    return weights
+
+
+def stream_source(path):
+    """Yield (ordinal, record) for every record with a symbol; a missing or broken file yields nothing."""
+    if not dataset_store.exists(path):
+        print(f"⚠️ Missing input {path}, skipping")
+        return
+    try:
+        for i, rec in enumerate(dataset_store.iter_records(path)):
+            if isinstance(rec, dict) and rec.get("symbol"):
+                yield i, rec
+    except (ValueError, OSError) as e:
+        print(f"⚠️ Could not read {path}: {e}")
+
+
+def _score(rec):
+    try:
+        return float(rec["score"]) if rec.get("score") is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def combine(sources, rule=MERGE_RULE, weights=None):
+    """Pass 1: {symbol: [score, weight_sum, winner_rank, winner_score, winner_ordinal, source_ranks]}.
+
+    Sources are ranked by list position (0 = highest priority). Under every rule a
+    record without a score only wins a symbol that no other record scored.
+    """
+    if rule not in RULES:
+        raise ValueError(f"Unknown merge rule '{rule}' (known: {', '.join(RULES)})")
+    weights = weights or {}
+    acc = {}
+    for rank, (name, path) in enumerate(sources):
+        w = weights.get(name, 1.0)
+        for ordinal, rec in stream_source(path):
+            s = _score(rec)
+            a = acc.get(rec["symbol"])
+            if a is None:
+                acc[rec["symbol"]] = [s if rule != "mean" else (s or 0.0) * w,
+                                      w if s is not None else 0.0, rank, s, ordinal, [rank]]
+                continue
+            if rank not in a[5]:
+                a[5].append(rank)
+            if rule == "mean" and s is not None:
+                a[0] += s * w
+                a[1] += w
+            if rule == "max":
+                better = s is not None and (a[3] is None or s > a[3])
+            else:  # inputs are read in priority order, so the first scored record wins
+                better = a[3] is None and s is not None
+            if better:
+                a[2], a[3], a[4] = rank, s, ordinal
+                if rule != "mean":
+                    a[0] = s
+    if rule == "mean":
+        for a in acc.values():
+            a[0] = round(a[0] / a[1], 4) if a[1] else None
+    return acc
+
+
+def select_top(acc, top=MERGE_TOP):
+    """Best `top` symbols by combined score (all if top <= 0), as [(symbol, accumulator)]."""
+    def key(item):
+        return item[1][0] if item[1][0] is not None else float("-inf")
+    if top and top > 0:
+        return heapq.nlargest(top, acc.items(), key=key)
+    return sorted(acc.items(), key=key, reverse=True)
+
+
+def collect(sources, chosen):
+    """Pass 2: stream the inputs again and pull the winning record for each chosen symbol."""
+    wanted = {}
+    for symbol, a in chosen:
+        wanted.setdefault(a[2], {})[a[4]] = symbol
+    found = {}
+    for rank, (name, path) in enumerate(sources):
+        need = wanted.get(rank)
+        if not need:
+            continue
+        for ordinal, rec in stream_source(path):
+            if ordinal in need:
+                found[need.pop(ordinal)] = rec
+                if not need:
+                    break
+
+    merged = []
+    for symbol, a in chosen:
+        rec = found.get(symbol)
+        if rec is None:  # the input changed between passes
+            continue
+        merged.append({**rec, "score": a[0], "sources": [sources[r][0] for r in sorted(a[5])]})
+    return merged
+
+
+def write_output(output, records):
+    if str(output).endswith(dataset_store.NDJSON_SUFFIXES):
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        tmp = f"{output}.tmp"
+        with open(tmp, "w") as f:
+            for rec in records:
+                f.write(json.dumps(rec) + "\n")
+        os.replace(tmp, output)
+    else:
+        dataset_store.save(output, records, json_key="ranked")
+
+
+def merge(inputs, output, rule=MERGE_RULE, top=MERGE_TOP, weights=None):
+    sources = parse_sources(inputs)
+    acc = combine(sources, rule, weights)
+    merged = collect(sources, select_top(acc, top))
+    write_output(output, merged)
+
+    print(f"✅ Merged {len(acc)} unique symbols from {len(sources)} inputs ({rule}); "
+          f"wrote {len(merged)} recommendations into {output}")
+    return merged
+
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--inputs", nargs="+", required=True)
+    parser.add_argument("--inputs", nargs="+", required=True,
+                        help="input files in priority order (path or name=path)")
     parser.add_argument("--output", required=True)
+    parser.add_argument("--rule", choices=RULES, default=MERGE_RULE)
+    parser.add_argument("--top", type=int, default=MERGE_TOP, help="keep the N best symbols (0 = all)")
+    parser.add_argument("--weights", default=os.getenv("MERGE_WEIGHTS", ""),
+                        help="per-source weights for --rule mean, e.g. gpt_recommendations=1,whale_recs=0.5")
     args = parser.parse_args()
 
-    merged = []
-    for inp in args.inputs:
-        merged.extend(load_json(inp))
-
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    with open(args.output, "w") as f:
-        json.dump({"ranked": merged}, f, indent=2)
+    merge(args.inputs, args.output, args.rule, args.top, parse_weights(args.weights))
 
-    print(f"✅ Merged {len(merged)} recommendations into {args.output}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,208 @@
+"""Run metrics for the pipeline scripts.
+
+- `span(name, **labels)` / `@timed(name)` time a block or function; spans nest
+  per thread, and every finished span is one JSON line in the run's metrics file
+- `incr(name, **labels)` bumps a counter (retries, 429s, cache hits, ...)
+- at exit a summary (count / total / max seconds per span, and every counter)
+  is appended, or written as Prometheus text when METRICS_FORMAT=prom
+
+One file per run: METRICS_DIR/<script>-<utc timestamp>-<pid>.jsonl (or .prom).
+METRICS=false turns everything into no-ops.
+
+Opt-in profiling for any script that imports this module:
+METRICS_PROFILE=cprofile writes <run>.prof and prints the top functions;
+METRICS_PROFILE=tracemalloc records peak memory and the top allocation sites
+(both: "cprofile,tracemalloc").
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+ENABLED = os.getenv("METRICS", "true").lower() == "true"
+METRICS_DIR = os.getenv("METRICS_DIR", "data/metrics")
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "jsonl").lower()  # jsonl | prom
+PROFILE = {p.strip() for p in os.getenv("METRICS_PROFILE", "").lower().split(",") if p.strip()}
+PROFILE_TOP = int(os.getenv("METRICS_PROFILE_TOP", "20"))
+
+_lock = threading.Lock()
+_local = threading.local()
+_counters = defaultdict(float)                 # (name, labels) -> value
+_spans = defaultdict(lambda: [0, 0.0, 0.0, 0])  # (name, labels) -> [count, total, max, errors]
+_run = {"file": None, "path": None}
+_profiler = None
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def run_name():
+    script = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+    return f"{script}-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{os.getpid()}"
+
+
+def _path(ext):
+    if _run["path"] is None:
+        _run["path"] = os.path.join(METRICS_DIR, run_name())
+    return f"{_run['path']}{ext}"
+
+
+def _emit(event):
+    if METRICS_FORMAT != "jsonl":
+        return
+    line = json.dumps(event, default=str) + "\n"
+    with _lock:
+        if _run["file"] is None:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            _run["file"] = open(_path(".jsonl"), "a", buffering=1 << 16)
+        _run["file"].write(line)
+
+
+def incr(name, value=1, **labels):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[(name, _labels(labels))] += value
+
+
+@contextmanager
+def span(name, **labels):
+    """Time the enclosed block; exceptions are counted as errors and re-raised."""
+    if not ENABLED:
+        yield
+        return
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    started, ok = time.perf_counter(), True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        stack.pop()
+        key = (name, _labels(labels))
+        with _lock:
+            s = _spans[key]
+            s[0] += 1
+            s[1] += seconds
+            s[2] = max(s[2], seconds)
+            s[3] += 0 if ok else 1
+        _emit({"type": "span", "name": name, "labels": dict(key[1]), "parent": parent,
+               "seconds": round(seconds, 6), "ok": ok, "ts": round(time.time(), 3)})
+
+
+def timed(name=None, **labels):
+    """Decorator form of `span`; the name defaults to module.function."""
+    def wrap(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(span_name, **labels):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def snapshot():
+    """Current counters and span summaries (for tests and reports)."""
+    with _lock:
+        counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in _counters.items()]
+        spans = [{"name": n, "labels": dict(l), "count": c, "total_seconds": round(t, 6),
+                  "max_seconds": round(m, 6), "errors": e} for (n, l), (c, t, m, e) in _spans.items()]
+    return {"counters": counters, "spans": spans}
+
+
+def _prom_name(name):
+    return "marketbot_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f"{k}={json.dumps(str(v))}" for k, v in labels.items()) + "}"
+
+
+def write_prometheus(path, snap):
+    lines = []
+    for c in snap["counters"]:
+        lines.append(f"{_prom_name(c['name'])}_total{_prom_labels(c['labels'])} {c['value']}")
+    for s in snap["spans"]:
+        labels = {"span": s["name"], **s["labels"]}
+        base = _prom_name("span_seconds")
+        lines.append(f"{base}_count{_prom_labels(labels)} {s['count']}")
+        lines.append(f"{base}_sum{_prom_labels(labels)} {s['total_seconds']}")
+        lines.append(f"{_prom_name('span_max_seconds')}{_prom_labels(labels)} {s['max_seconds']}")
+        lines.append(f"{_prom_name('span_errors')}_total{_prom_labels(labels)} {s['errors']}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+# ----- Profiling -----
+
+def _start_profiling():
+    global _profiler
+    if "cprofile" in PROFILE:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if "tracemalloc" in PROFILE:
+        import tracemalloc
+        tracemalloc.start(10)
+
+
+def _stop_profiling():
+    if _profiler is not None:
+        import pstats
+        _profiler.disable()
+        path = _path(".prof")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        _profiler.dump_stats(path)
+        print(f"🔬 cProfile stats → {path}")
+        pstats.Stats(_profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    if "tracemalloc" in PROFILE:
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_TOP]
+            tracemalloc.stop()
+            _emit({"type": "memory", "current_bytes": current, "peak_bytes": peak,
+                   "top": [{"where": str(stat.traceback), "bytes": stat.size, "count": stat.count} for stat in top]})
+            print(f"🔬 tracemalloc peak {peak / 1e6:.1f} MB")
+
+
+def flush():
+    """Write the run summary (called automatically at exit)."""
+    if not ENABLED:
+        return
+    _stop_profiling()
+    snap = snapshot()
+    if METRICS_FORMAT == "prom":
+        if snap["counters"] or snap["spans"]:
+            write_prometheus(_path(".prom"), snap)
+        return
+    for c in snap["counters"]:
+        _emit({"type": "counter", **c})
+    for s in snap["spans"]:
+        _emit({"type": "summary", **s})
+    with _lock:
+        if _run["file"] is not None:
+            _run["file"].close()
+            _run["file"] = None
+
+
+if ENABLED:
+    _start_profiling()
+    atexit.register(flush)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Pipeline runner for the workflow jobs:
+- each stage is a script with declared input and output files; a stage runs once
+  every stage producing one of its inputs (or listed in `after`) has finished,
+  so independent fetches (stock universe, crypto universe, whale trades) run in parallel
+- a stage is skipped when its command, script source (with every scripts/ module
+  it imports) and input contents hash the same as on its last successful run and
+  its outputs are still the files it wrote then (state in
+  data/cache/pipeline_state.json); `always` stages (network sources, trading)
+  never skip
+- a failed stage blocks its dependents unless it is `optional`
+- prints a per-stage timing report
+
+`python scripts/pipeline.py rank_and_trade [--force] [--only rank merge]`
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import dataset_store
+
+STATE_FILE = os.getenv("PIPELINE_STATE_FILE", "data/cache/pipeline_state.json")
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+HASH_CHUNK = 1 << 20
+
+_print_lock = threading.Lock()
+
+
+@dataclass
+class Stage:
+    name: str
+    cmd: List[str]                      # script path + args, run with this interpreter
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    after: Tuple[str, ...] = ()         # ordering without a file dependency
+    always: bool = False                # never skip (reads the network or places orders)
+    optional: bool = False              # failure doesn't block dependents or fail the run
+    env: Dict[str, str] = field(default_factory=dict)
+    status: str = "pending"             # ran | skipped | failed | blocked
+    seconds: float = 0.0
+
+
+def _hash_file(h, path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+
+
+def hash_path(path) -> Optional[str]:
+    """Content hash of a dataset (its JSON export or columnar copy), or None if it doesn't exist."""
+    h = hashlib.sha256()
+    if os.path.isfile(path):
+        _hash_file(h, path)
+        return h.hexdigest()
+    cols = dataset_store.columnar_dir(path)
+    if not os.path.isdir(cols):
+        return None
+    for name in sorted(os.listdir(cols)):
+        h.update(name.encode())
+        _hash_file(h, os.path.join(cols, name))
+    return h.hexdigest()
+
+
+def local_imports(script) -> List[str]:
+    """`script` plus every module next to it that it imports, directly or transitively (sorted)."""
+    directory = os.path.dirname(script)
+    seen, todo = set(), [script]
+    while todo:
+        path = todo.pop()
+        if path in seen or not os.path.isfile(path):
+            continue
+        seen.add(path)
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):  # includes imports deferred into functions
+            if isinstance(node, ast.Import):
+                names = [a.name for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            todo += [os.path.join(directory, n.split(".")[0] + ".py") for n in names]
+    return sorted(seen)
+
+
+def stage_key(stage: Stage) -> str:
+    """Hash of everything that determines the stage's outputs, apart from the network."""
+    h = hashlib.sha256(json.dumps([stage.cmd, sorted(stage.env.items())]).encode())
+    for path in (*local_imports(stage.cmd[0]), *stage.inputs):
+        h.update(f"{path}={hash_path(path)}".encode())
+    return h.hexdigest()
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def is_fresh(stage: Stage, key: str, state) -> bool:
+    prev = state.get(stage.name)
+    if stage.always or not prev or prev.get("key") != key:
+        return False
+    return all(hash_path(p) == h and h is not None for p, h in prev.get("outputs", {}).items())
+
+
+def run_command(stage: Stage) -> int:
+    env = {**os.environ, **stage.env}
+    proc = subprocess.Popen([sys.executable, *stage.cmd], env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True, bufsize=1)
+    for line in proc.stdout:
+        with _print_lock:
+            print(f"[{stage.name}] {line}", end="", flush=True)
+    return proc.wait()
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], state_file=STATE_FILE, workers=PIPELINE_WORKERS):
+        self.stages = {s.name: s for s in stages}
+        self.state_file = state_file
+        self.workers = workers
+        producers = {out: s.name for s in stages for out in s.outputs}
+        self.deps = {s.name: {producers[i] for i in s.inputs if i in producers and producers[i] != s.name}
+                     | set(s.after) for s in stages}
+
+    def _execute(self, stage: Stage, state, force):
+        """Run (or skip) one stage; returns it with its new state entry (None unless it ran).
+
+        Runs on a worker thread: `state` is only read here, the main loop applies the entry.
+        """
+        started = time.perf_counter()
+        entry = None
+        key = stage_key(stage)
+        if not force and is_fresh(stage, key, state):
+            stage.status = "skipped"
+        else:
+            code = run_command(stage)
+            missing = [p for p in stage.outputs if hash_path(p) is None
+                       or (os.path.isfile(p) and os.path.getsize(p) == 0)]
+            if code != 0 or (missing and not stage.optional):
+                stage.status = "failed"
+                reason = f"exit code {code}" if code else f"missing outputs {missing}"
+                print(f"❌ Stage {stage.name} failed ({reason})")
+            else:
+                stage.status = "ran"
+                entry = {"key": key, "finished_at": time.time(),
+                         "outputs": {p: hash_path(p) for p in stage.outputs}}
+        stage.seconds = time.perf_counter() - started
+        return stage, entry
+
+    def run(self, only=None, force=False) -> bool:
+        selected = set(only or self.stages)
+        state = load_state(self.state_file)
+        done, started = set(), time.perf_counter()
+        pending = [n for n in self.stages if n in selected]
+        ok = {n for n in self.stages if n not in selected}  # unselected stages count as satisfied
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            while pending or running:
+                for name in list(pending):
+                    deps = self.deps[name]
+                    if not deps <= (done | ok):
+                        continue
+                    pending.remove(name)
+                    if any(d not in ok for d in deps):
+                        self.stages[name].status = "blocked"
+                        done.add(name)
+                        continue
+                    running[pool.submit(self._execute, self.stages[name], state, force)] = name
+                if not running:
+                    if pending:  # dependency cycle or unknown `after` name
+                        print(f"❌ Unschedulable stages: {', '.join(pending)}")
+                        for name in pending:
+                            self.stages[name].status = "blocked"
+                        pending.clear()
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, entry = future.result()
+                    running.pop(future)
+                    done.add(stage.name)
+                    if stage.status in ("ran", "skipped") or stage.optional:
+                        ok.add(stage.name)
+                    if entry is not None:
+                        state[stage.name] = entry
+                        save_state(state, self.state_file)
+
+        self.report(time.perf_counter() - started)
+        return all(s.status in ("ran", "skipped") or s.optional for s in self.stages.values() if s.name in selected)
+
+    def report(self, wall):
+        icons = {"ran": "✅", "skipped": "⏭️", "failed": "❌", "blocked": "⛔", "pending": "·"}
+        print("\n📋 Stage timings")
+        for s in self.stages.values():
+            print(f"  {icons[s.status]} {s.name:<12} {s.status:<8} {s.seconds:7.2f}s")
+        busy = sum(s.seconds for s in self.stages.values())
+        print(f"  ⏱️ wall {wall:.2f}s vs {busy:.2f}s sequential")
+
+
+# ----- Pipeline definitions -----
+
+STOCKS = "data/stocks.json"
+WHALES = "data/whales.json"
+WHALE_SIGNALS = "data/whale_signals.json"
+GPT_RECS = "data/gpt_recommendations.json"
+WHALE_RECS = "data/whale_recs.json"
+MERGED = "data/merged_recommendations.json"
+CRYPTO = "data/crypto.json"
+
+
+def history(*datasets):
+    """Snapshot the datasets into data/history (skipped when none of them changed)."""
+    return Stage("history", ["scripts/snapshot_store.py", "record", *datasets], inputs=datasets, optional=True)
+
+
+def whale_signals():
+    """Fetch whale trades and publish their signals, so `rank` reads them instead of fetching live
+    (a live fetch isn't a declared input, and rank would be skipped on stale data)."""
+    return [
+        Stage("whales", ["scripts/fetch_whales.py"], outputs=(WHALES,), always=True, optional=True),
+        Stage("whale_signals", ["scripts/whale_stream.py", "--replay", WHALES], inputs=(WHALES,),
+              outputs=(WHALE_SIGNALS,), optional=True),
+    ]
+
+
+def rank_and_trade(top=50):
+    return [
+        Stage("universe", ["scripts/update_universe.py"], outputs=(STOCKS,), always=True),
+        Stage("crypto", ["scripts/update_universe_crypto.py"], outputs=(CRYPTO,),
+              always=True, optional=True),
+        *whale_signals(),
+        Stage("rank_whales", ["scripts/gpt_rank_whales.py"], inputs=(WHALES,), outputs=(WHALE_RECS,),
+              optional=True, env={"WHALE_RECS_FILE": WHALE_RECS}),
+        Stage("rank", ["scripts/gpt_rank_stocks.py", "--top", str(top)], inputs=(STOCKS, WHALE_SIGNALS),
+              outputs=(GPT_RECS,)),
+        Stage("merge", ["scripts/merge_recommendations.py", "--inputs", GPT_RECS, WHALE_RECS, "--output", MERGED],
+              inputs=(GPT_RECS, WHALE_RECS), outputs=(MERGED,)),
+        Stage("trade", ["scripts/auto_trade.py"], inputs=(MERGED,), always=True),
+        history(STOCKS, CRYPTO, GPT_RECS),
+    ]
+
+
+def update_universe(top=20):
+    return [
+        Stage("universe", ["scripts/update_universe.py"], outputs=(STOCKS,), always=True),
+        *whale_signals(),
+        Stage("rank", ["scripts/gpt_rank_stocks.py", "--top", str(top)], inputs=(STOCKS, WHALE_SIGNALS),
+              outputs=(GPT_RECS,)),
+        history(STOCKS, GPT_RECS),
+    ]
+
+
+PIPELINES = {"rank_and_trade": rank_and_trade, "update_universe": update_universe}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pipeline", choices=sorted(PIPELINES))
+    parser.add_argument("--top", type=int, default=None, help="stocks to keep in the rank stage")
+    parser.add_argument("--only", nargs="*", help="run just these stages (their inputs must already exist)")
+    parser.add_argument("--force", action="store_true", help="ignore the content-hash skip")
+    args = parser.parse_args()
+
+    build = PIPELINES[args.pipeline]
+    pipeline = Pipeline(build() if args.top is None else build(args.top))
+    print(f"🚀 Running pipeline {args.pipeline}")
+    if not pipeline.run(only=args.only, force=args.force):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,35 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict
-from .config import (
-    MAX_PORTFOLIO_SIZE, MAX_POSITION_USD,
-    MIN_CONFIDENCE, EXIT_BELOW_CONFIDENCE,
-    STOP_LOSS_PCT, TAKE_PROFIT_PCT
-)
-
-@dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+try:
+    from .config import (
+        MAX_PORTFOLIO_SIZE, MAX_POSITION_USD,
+        MIN_CONFIDENCE, EXIT_BELOW_CONFIDENCE,
+        STOP_LOSS_PCT, TAKE_PROFIT_PCT, TRAILING_STOP_PCT
+    )
+except ImportError:  # run as a script from scripts/, like the other entry points
+    from config import (
+        MAX_PORTFOLIO_SIZE, MAX_POSITION_USD,
+        MIN_CONFIDENCE, EXIT_BELOW_CONFIDENCE,
+        STOP_LOSS_PCT, TAKE_PROFIT_PCT, TRAILING_STOP_PCT
+    )
+
+@dataclass(frozen=True)
+class PolicyParams:
+    """Policy thresholds; defaults come from config (env), sweeps/backtests pass their own."""
+    max_portfolio_size: int = MAX_PORTFOLIO_SIZE
+    max_position_usd: float = MAX_POSITION_USD
+    min_confidence: float = MIN_CONFIDENCE
+    exit_below_confidence: float = EXIT_BELOW_CONFIDENCE
+    stop_loss_pct: float = STOP_LOSS_PCT
+    take_profit_pct: float = TAKE_PROFIT_PCT
+    trailing_stop_pct: float = TRAILING_STOP_PCT
+
+DEFAULT_PARAMS = PolicyParams()
+
+@dataclass(slots=True)
 class Decision:
     action: str          # 'buy' | 'hold' | 'exit' | 'skip'
     qty: int = 0
@@ -15,27 +37,157 @@ class Decision:
     take_profit_pct: float = TAKE_PROFIT_PCT
     reason: str = ""
 
-def should_enter(score: float) -> bool:
-    return score is not None and score >= MIN_CONFIDENCE
+def should_enter(score: float, params: PolicyParams = DEFAULT_PARAMS) -> bool:
+    return score is not None and score >= params.min_confidence
 
-def should_exit(score: float) -> bool:
-    return score is None or score < EXIT_BELOW_CONFIDENCE
+def should_exit(score: float, params: PolicyParams = DEFAULT_PARAMS) -> bool:
+    return score is None or score < params.exit_below_confidence
 
-def position_size(cash: float, price: float) -> int:
-    usd_alloc = min(cash / 10.0, MAX_POSITION_USD)
+def position_size(cash: float, price: float, params: PolicyParams = DEFAULT_PARAMS) -> int:
+    usd_alloc = min(cash / 10.0, params.max_position_usd)
     return max(int(usd_alloc // price), 1)
 
-def decide(ticker: str, score: float, price: float, active_positions: Dict[str, object], cash: float) -> Decision:
+def decide(ticker: str, score: float, price: float, active_positions: Dict[str, object], cash: float,
+           params: PolicyParams = DEFAULT_PARAMS) -> Decision:
+    p = params
     if ticker in active_positions:
-        if should_exit(score):
-            return Decision(action="exit", reason=f"score {score} < exit_th={EXIT_BELOW_CONFIDENCE}")
+        if should_exit(score, p):
+            return Decision(action="exit", reason=f"score {score} < exit_th={p.exit_below_confidence}")
         else:
             return Decision(action="hold", reason="already holding")
     else:
-        if len(active_positions) >= MAX_PORTFOLIO_SIZE:
-            return Decision(action="skip", reason=f"portfolio full ({len(active_positions)}/{MAX_PORTFOLIO_SIZE})")
-        if should_enter(score):
-            qty = position_size(cash, price)
-            return Decision(action="buy", qty=qty, reason=f"enter score {score} >= {MIN_CONFIDENCE}")
+        if len(active_positions) >= p.max_portfolio_size:
+            return Decision(action="skip", reason=f"portfolio full ({len(active_positions)}/{p.max_portfolio_size})")
+        if should_enter(score, p):
+            qty = position_size(cash, price, p)
+            return Decision(action="buy", qty=qty, stop_loss_pct=p.stop_loss_pct, take_profit_pct=p.take_profit_pct,
+                            reason=f"enter score {score} >= {p.min_confidence}")
         else:
-            return Decision(action="skip", reason=f"score {score} < enter_th={MIN_CONFIDENCE}")
+            return Decision(action="skip", reason=f"score {score} < enter_th={p.min_confidence}")
+
+# Batch decisions are stored as int8 codes; ACTIONS maps a code back to its Decision.action
+SKIP, BUY, HOLD, EXIT = range(4)
+ACTIONS = ("skip", "buy", "hold", "exit")
+# Why a candidate got its action (see DecisionBatch.reason)
+R_BELOW_ENTRY, R_ENTER, R_HOLDING, R_BELOW_EXIT, R_FULL, R_NO_PRICE, R_NO_CASH = range(7)
+
+
+class DecisionBatch:
+    """Decisions for a batch of tickers as parallel arrays (input order).
+
+    `action`/`reason_code` are int8 codes, `qty` int64; `buy_order` lists the rows
+    bought in allocation (score) order. Indexing materialises a single Decision.
+    """
+    __slots__ = ("tickers", "scores", "prices", "action", "qty", "reason_code", "buy_order",
+                 "cash_left", "slots_left", "params")
+
+    def __init__(self, tickers, scores, prices, params):
+        n = len(tickers)
+        self.tickers = tickers
+        self.scores = scores
+        self.prices = prices
+        self.action = np.full(n, SKIP, dtype=np.int8)
+        self.qty = np.zeros(n, dtype=np.int64)
+        self.reason_code = np.full(n, R_BELOW_ENTRY, dtype=np.int8)
+        self.buy_order = np.zeros(0, dtype=np.int64)
+        self.cash_left = 0.0
+        self.slots_left = 0
+        self.params = params
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, i) -> Decision:
+        p = self.params
+        action = ACTIONS[self.action[i]]
+        if action == "buy":
+            return Decision(action=action, qty=int(self.qty[i]), stop_loss_pct=p.stop_loss_pct,
+                            take_profit_pct=p.take_profit_pct, reason=self.reason(i))
+        return Decision(action=action, reason=self.reason(i))
+
+    def indices(self, action: str) -> np.ndarray:
+        return np.flatnonzero(self.action == ACTIONS.index(action))
+
+    def buys(self) -> np.ndarray:
+        return self.buy_order
+
+    def exits(self) -> np.ndarray:
+        return self.indices("exit")
+
+    def cost(self) -> np.ndarray:
+        """Cash committed per row (qty * price for buys, 0 otherwise)."""
+        return np.where(self.action == BUY, self.qty * np.nan_to_num(self.prices), 0.0)
+
+    def reason(self, i) -> str:
+        p, code = self.params, self.reason_code[i]
+        score = self.scores[i]
+        score = None if score != score else score.item()
+        if code == R_ENTER:
+            return f"enter score {score} >= {p.min_confidence}"
+        if code == R_HOLDING:
+            return "already holding"
+        if code == R_BELOW_EXIT:
+            return f"score {score} < exit_th={p.exit_below_confidence}"
+        if code == R_FULL:
+            return f"portfolio full ({p.max_portfolio_size - self.slots_left}/{p.max_portfolio_size})"
+        if code == R_NO_PRICE:
+            return "no price"
+        if code == R_NO_CASH:
+            return f"not enough cash @ {self.prices[i]}"
+        return f"score {score} < enter_th={p.min_confidence}"
+
+
+def _floats(values) -> np.ndarray:
+    if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+        return values.astype(np.float64, copy=False)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def decide_batch(tickers: Sequence[str], scores, prices, active_positions: Dict[str, object], cash: float,
+                 params: PolicyParams = DEFAULT_PARAMS) -> DecisionBatch:
+    """`decide` for many tickers at once, allocating cash and slots across them.
+
+    Thresholds are evaluated as array ops. Held tickers exit or hold; the rest are
+    bought best score first, each sized with `position_size` against the cash left
+    after the buys before it, until the slots freed by exits plus the empty ones run
+    out. Missing scores/prices are None or NaN; a price is only needed for entries.
+    """
+    p = params
+    tickers = tickers if isinstance(tickers, list) else list(tickers)
+    scores, prices = _floats(scores), _floats(prices)
+    out = DecisionBatch(tickers, scores, prices, p)
+
+    held = np.fromiter((t in active_positions for t in tickers), dtype=bool, count=len(tickers))
+    leave = held & ~(scores >= p.exit_below_confidence)  # NaN (no score) exits too
+    out.action[held] = HOLD
+    out.action[leave] = EXIT
+    out.reason_code[held] = R_HOLDING
+    out.reason_code[leave] = R_BELOW_EXIT
+
+    slots = p.max_portfolio_size - (len(active_positions) - int(leave.sum()))
+    cand = np.flatnonzero(~held & (scores >= p.min_confidence))
+    out.reason_code[cand] = R_FULL
+    cand = cand[np.argsort(-scores[cand], kind="stable")]
+
+    bought: List[int] = []
+    for i, price in zip(cand.tolist(), prices[cand].tolist()):
+        if slots <= 0:
+            break
+        if not price > 0:
+            out.reason_code[i] = R_NO_PRICE
+            continue
+        qty = position_size(cash, price, p)
+        if qty * price > cash:
+            out.reason_code[i] = R_NO_CASH
+            continue
+        out.action[i], out.qty[i], out.reason_code[i] = BUY, qty, R_ENTER
+        cash -= qty * price
+        slots -= 1
+        bought.append(i)
+
+    out.buy_order = np.array(bought, dtype=np.int64)
+    out.cash_left, out.slots_left = cash, max(slots, 0)
+    return out
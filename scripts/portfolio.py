@@ -0,0 +1,117 @@
+"""Portfolio snapshot, diff-based reconciler and concurrent order submission.
+
+A trading cycle fetches account + positions once (`PortfolioSnapshot.fetch`),
+computes every exit and entry against that snapshot (`reconcile`), then submits
+the orders in parallel (`submit_orders`) - one broker round trip per order.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from instruments import canonical
+from policy_engine import (DEFAULT_PARAMS, EXIT, R_NO_CASH, R_NO_PRICE, PolicyParams, decide_batch,
+                           should_enter)
+
+ORDER_WORKERS = int(os.getenv("ORDER_WORKERS", "8"))
+
+
+@dataclass
+class PortfolioSnapshot:
+    cash: float
+    positions: Dict[str, float]  # symbol -> qty
+    taken_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def fetch(cls, broker) -> "PortfolioSnapshot":
+        """One account call and one positions call for the whole cycle."""
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            cash = pool.submit(broker.get_cash)
+            positions = pool.submit(broker.get_positions)
+            raw = positions.result()
+            return cls(cash=float(cash.result()),
+                       positions={s: float(getattr(p, "qty", 0) or 0) for s, p in raw.items()})
+
+
+@dataclass
+class Order:
+    symbol: str
+    side: str  # 'buy' | 'sell'
+    qty: float
+    price: Optional[float] = None
+    stop_loss_pct: float = 0.0
+    take_profit_pct: float = 0.0
+    reason: str = ""
+
+
+def is_whale_sell(rec) -> bool:
+    return "whale_sell" in str(rec.get("reason", ""))
+
+
+def reconcile(snapshot: PortfolioSnapshot, recs: Dict[str, dict],
+              price_of: Callable[[dict], Optional[float]], params: PolicyParams = DEFAULT_PARAMS) -> List[Order]:
+    """Diff the snapshot against the recommendations: exits first, then entries by score.
+
+    Positions and recommendations are matched on canonical symbols (`recs` keyed
+    that way, as auto_trade.load_recommendations does), so BRK-B vs BRK.B can't
+    double up. All decisions come from one `decide_batch` call, which sizes entries
+    against the cash and slots left after the exits and earlier entries, so a cycle
+    can't over-allocate.
+    """
+    keys = [canonical(s) for s in snapshot.positions]
+    held = dict(zip(keys, snapshot.positions.values()))
+    candidates = [r for r in recs.values() if canonical(r["symbol"]) not in held and not is_whale_sell(r)]
+    tickers = keys + [canonical(r["symbol"]) for r in candidates]
+    # A whale sell forces the exit: no score means exit in decide_batch, and frees the slot
+    scores = [None if is_whale_sell(recs.get(k, {})) else recs.get(k, {}).get("score") for k in keys]
+    scores += [r.get("score") for r in candidates]
+    # Only qualifying entries need a price (auto_trade.warm_prices has quoted those already)
+    prices = [None] * len(keys) + [price_of(r) if should_enter(r.get("score"), params) else None
+                                   for r in candidates]
+    batch = decide_batch(tickers, scores, prices, held, snapshot.cash, params)
+
+    orders: List[Order] = []
+    for i, (symbol, qty) in enumerate(snapshot.positions.items()):
+        rec = recs.get(tickers[i], {})
+        if batch.action[i] == EXIT:
+            reason = "whale_sell signal" if is_whale_sell(rec) else batch.reason(i)
+            orders.append(Order(symbol, "sell", abs(qty), reason=reason))
+
+    for i in np.flatnonzero(np.isin(batch.reason_code, (R_NO_PRICE, R_NO_CASH))).tolist():
+        symbol = candidates[i - len(keys)]["symbol"]
+        print(f"⚠️ No price for {symbol}, skipping" if batch.reason_code[i] == R_NO_PRICE
+              else f"⚠️ Not enough cash for {symbol} (@ {batch.prices[i]})")
+    for i in batch.buys().tolist():
+        d = batch[i]
+        orders.append(Order(candidates[i - len(keys)]["symbol"], "buy", d.qty, batch.prices[i].item(),
+                            d.stop_loss_pct, d.take_profit_pct, d.reason))
+
+    return orders
+
+
+def _submit(broker, order: Order):
+    if order.side == "sell":
+        return broker.market_sell_all(order.symbol, qty=order.qty)
+    return broker.market_buy_qty(order.symbol, int(order.qty), bracket=True, entry_price=order.price,
+                                 stop_loss_pct=order.stop_loss_pct, take_profit_pct=order.take_profit_pct)
+
+
+def submit_orders(broker, orders: List[Order], max_workers: int = ORDER_WORKERS):
+    """Submit sells, then buys, each group concurrently. Returns [(order, result or exception)]."""
+    results = []
+    for side in ("sell", "buy"):
+        batch = [o for o in orders if o.side == side]
+        if not batch:
+            continue
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [(o, pool.submit(_submit, broker, o)) for o in batch]
+            for order, future in futures:
+                try:
+                    results.append((order, future.result()))
+                except Exception as e:
+                    print(f"❌ {order.side.upper()} {order.symbol} failed: {e}")
+                    results.append((order, e))
+    return results
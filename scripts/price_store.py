@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Local daily-bar store:
+- one append-only binary file per symbol (data/prices/<SYMBOL>.bin) of fixed-size
+  records (ts, open, high, low, close, volume), read through np.memmap
+- "latest price" reads just the last record; "last N bars" is a memmap tail slice
+- `update()` works out each symbol's missing range and batch-downloads only that,
+  many symbols per yfinance call, then appends the new bars; it stops at the last
+  completed session, so an intraday partial bar is never stored as a daily close
+
+`python scripts/price_store.py --universe data/stocks.json --days 365` backfills or tops up the store.
+"""
+import argparse
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+PRICES_DIR = os.getenv("PRICES_DIR", "data/prices")
+# A stored close older than this is treated as stale by latest_price()
+PRICE_MAX_AGE_DAYS = float(os.getenv("PRICE_MAX_AGE_DAYS", "4"))
+DOWNLOAD_BATCH = int(os.getenv("PRICE_DOWNLOAD_BATCH", "100"))
+
+BAR_DTYPE = np.dtype([("ts", "<i8"), ("open", "<f8"), ("high", "<f8"),
+                      ("low", "<f8"), ("close", "<f8"), ("volume", "<f8")])
+DAY = 86400
+MARKET_TZ = "America/New_York"
+MARKET_CLOSE_HOUR = 16  # a session's bar is final once the market has closed
+
+
+def last_session(now: datetime = None) -> date:
+    """Date of the newest daily bar that is complete: today after the close, else yesterday."""
+    try:
+        from zoneinfo import ZoneInfo
+        tz = ZoneInfo(MARKET_TZ)
+    except Exception:  # no tz database: EST year-round (an hour early in summer at worst)
+        tz = timezone(timedelta(hours=-5))
+    local = (now or datetime.now(timezone.utc)).astimezone(tz)
+    return local.date() if local.hour >= MARKET_CLOSE_HOUR else local.date() - timedelta(days=1)
+
+
+def yahoo_symbol(symbol: str) -> str:
+    return symbol.replace(".", "-")  # Yahoo format (BRK.B -> BRK-B)
+
+
+class PriceStore:
+    def __init__(self, directory=PRICES_DIR):
+        self.directory = directory
+
+    def _path(self, symbol):
+        safe = "".join(c if c.isalnum() or c in "-._^=" else "_" for c in symbol.upper())
+        return os.path.join(self.directory, f"{safe}.bin")
+
+    # ----- Reads -----
+
+    def bars(self, symbol, n=None) -> np.ndarray:
+        """Last `n` bars (all if None) as a read-only structured array; empty if unknown."""
+        path = self._path(symbol)
+        try:
+            size = os.path.getsize(path) // BAR_DTYPE.itemsize
+        except OSError:
+            return np.empty(0, dtype=BAR_DTYPE)
+        if size == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+        data = np.memmap(path, dtype=BAR_DTYPE, mode="r", shape=(size,))
+        return data if n is None else data[-n:]
+
+    def last_bar(self, symbol):
+        """The newest bar without mapping the file: one seek + one small read."""
+        path = self._path(symbol)
+        try:
+            with open(path, "rb") as f:
+                f.seek(-BAR_DTYPE.itemsize, os.SEEK_END)
+                raw = f.read(BAR_DTYPE.itemsize)
+        except OSError:
+            return None
+        return np.frombuffer(raw, dtype=BAR_DTYPE)[0] if len(raw) == BAR_DTYPE.itemsize else None
+
+    def last_ts(self, symbol):
+        bar = self.last_bar(symbol)
+        return int(bar["ts"]) if bar is not None else None
+
+    def latest_price(self, symbol, max_age_days=PRICE_MAX_AGE_DAYS, now=None):
+        """Last stored close, or None if there is none or it's older than `max_age_days`."""
+        bar = self.last_bar(symbol)
+        if bar is None:
+            return None
+        if max_age_days is not None and (now or time.time()) - int(bar["ts"]) > (max_age_days + 1) * DAY:
+            return None
+        close = float(bar["close"])
+        return close if close == close else None
+
+    # ----- Writes -----
+
+    def append(self, symbol, bars: np.ndarray) -> int:
+        """Append bars newer than the last stored one (input need not be sorted). Returns count."""
+        if bars is None or len(bars) == 0:
+            return 0
+        bars = np.sort(np.asarray(bars, dtype=BAR_DTYPE), order="ts")
+        last = self.last_ts(symbol)
+        if last is not None:
+            bars = bars[bars["ts"] > last]
+        bars = bars[np.concatenate(([True], np.diff(bars["ts"]) > 0))] if len(bars) else bars
+        if len(bars) == 0:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(symbol), "ab") as f:
+            f.write(bars.tobytes())
+        return len(bars)
+
+    # ----- Incremental download -----
+
+    def missing_start(self, symbol, default_start: date) -> date:
+        last = self.last_ts(symbol)
+        if last is None:
+            return default_start
+        return datetime.fromtimestamp(last, tz=timezone.utc).date() + timedelta(days=1)
+
+    def update(self, symbols, days=365, end: date = None, downloader=None):
+        """Fetch only the missing daily bars for `symbols`, batching symbols that share a start date.
+
+        `end` defaults to the last completed session. `downloader(symbols, start, end)
+        -> {symbol: bars}` defaults to yfinance. Returns {symbol: bars appended}.
+        """
+        end = end or last_session()
+        default_start = end - timedelta(days=days)
+        downloader = downloader or download_yfinance
+
+        by_start = defaultdict(list)
+        for symbol in dict.fromkeys(symbols):
+            start = self.missing_start(symbol, default_start)
+            if start <= end:
+                by_start[start].append(symbol)
+
+        cutoff = int(datetime(end.year, end.month, end.day, tzinfo=timezone.utc).timestamp()) + DAY
+        appended = {}
+        for start, group in sorted(by_start.items()):
+            for i in range(0, len(group), DOWNLOAD_BATCH):
+                batch = group[i:i + DOWNLOAD_BATCH]
+                for symbol, bars in downloader(batch, start, end).items():
+                    bars = np.asarray(bars, dtype=BAR_DTYPE)
+                    appended[symbol] = self.append(symbol, bars[bars["ts"] < cutoff])
+        return appended
+
+
+def download_yfinance(symbols, start: date, end: date):
+    """One yfinance call for many symbols → {symbol: BAR_DTYPE array}."""
+    import yfinance as yf  # only needed when actually downloading
+
+    tickers = {yahoo_symbol(s): s for s in symbols}
+    frame = yf.download(list(tickers), start=start.isoformat(), end=(end + timedelta(days=1)).isoformat(),
+                        interval="1d", group_by="ticker", auto_adjust=False, progress=False, threads=True)
+    out = {}
+    if frame is None or frame.empty:
+        return out
+    for ysym, symbol in tickers.items():
+        try:
+            df = frame[ysym] if len(tickers) > 1 else frame
+        except KeyError:
+            continue
+        df = df.dropna(subset=["Close"])
+        if df.empty:
+            continue
+        bars = np.empty(len(df), dtype=BAR_DTYPE)
+        bars["ts"] = df.index.normalize().tz_localize(None).values.astype("datetime64[s]").astype(np.int64)
+        for col, src in (("open", "Open"), ("high", "High"), ("low", "Low"), ("close", "Close"), ("volume", "Volume")):
+            bars[col] = df[src].to_numpy(dtype=np.float64)
+        out[symbol] = bars
+    return out
+
+
+_default_store = None
+
+
+def default_store() -> PriceStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+    return _default_store
+
+
+def main():
+    import dataset_store
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--universe", default="data/stocks.json", help="dataset whose symbols to update")
+    parser.add_argument("--symbols", nargs="*", help="explicit symbols (overrides --universe)")
+    parser.add_argument("--days", type=int, default=365, help="history to backfill for new symbols")
+    args = parser.parse_args()
+
+    symbols = args.symbols or [r["symbol"] for r in dataset_store.load_records(args.universe) if r.get("symbol")]
+    print(f"🚀 Updating local bars for {len(symbols)} symbols...")
+    appended = default_store().update(symbols, days=args.days)
+    print(f"✅ Appended {sum(appended.values())} bars across {sum(1 for n in appended.values() if n)} symbols")
+
+
+if __name__ == "__main__":
+    main()
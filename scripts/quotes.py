@@ -0,0 +1,170 @@
+"""In-process quote cache with batched multi-symbol lookups.
+
+`QuoteCache.get_many(symbols, provider)`:
+- serves fresh entries (younger than the TTL) from a size-bounded LRU
+- waits on an in-flight lookup when another thread is already fetching a symbol
+  instead of fetching it again
+- sends every remaining miss to the provider in ONE call (`fetch(symbols) -> {symbol: price}`)
+
+Counters (`stats()`) show how many upstream lookups the cache saved in this run.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, Optional
+
+import metrics
+
+QUOTE_TTL = float(os.getenv("QUOTE_TTL", "60"))  # seconds
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "10000"))
+QUOTE_PROVIDER = os.getenv("QUOTE_PROVIDER", "yfinance")
+# History fetched for a symbol the local price store has never seen
+PRICE_WARMUP_DAYS = int(os.getenv("PRICE_WARMUP_DAYS", "5"))
+
+
+class QuoteCache:
+    def __init__(self, providers: Dict[str, Callable[[list], dict]] = None, ttl=QUOTE_TTL,
+                 max_size=QUOTE_CACHE_SIZE, default_provider=QUOTE_PROVIDER, clock=time.monotonic):
+        self.providers = dict(providers or {})
+        self.ttl = ttl
+        self.max_size = max_size
+        self.default_provider = default_provider
+        self.clock = clock
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # (provider, symbol) -> (price, fetched_at)
+        self._inflight: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = self.upstream_calls = self.evictions = 0
+
+    def register(self, name, fetch: Callable[[list], dict]):
+        self.providers[name] = fetch
+
+    def get(self, symbol, provider=None) -> Optional[float]:
+        return self.get_many([symbol], provider)[symbol]
+
+    def get_many(self, symbols: Iterable[str], provider=None) -> Dict[str, Optional[float]]:
+        provider = provider or self.default_provider
+        fetch = self.providers[provider]
+        result, waiting, mine = {}, {}, []
+        now = self.clock()
+
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                key = (provider, symbol)
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[1] < self.ttl:
+                    self._entries.move_to_end(key)
+                    result[symbol] = entry[0]
+                    self.hits += 1
+                elif key in self._inflight:
+                    waiting[symbol] = self._inflight[key]
+                    self.coalesced += 1
+                else:
+                    self._inflight[key] = Future()
+                    mine.append(symbol)
+                    self.misses += 1
+
+        metrics.incr("quote_cache_hits", len(result), provider=provider)
+        metrics.incr("quote_cache_misses", len(mine), provider=provider)
+        if mine:
+            self._fetch(provider, fetch, mine, result)
+        for symbol, future in waiting.items():
+            result[symbol] = future.result()
+        return result
+
+    def _fetch(self, provider, fetch, symbols, result):
+        prices = {}
+        with self._lock:
+            self.upstream_calls += 1
+        try:
+            prices = fetch(symbols) or {}
+        except Exception as e:
+            print(f"⚠️ Quote provider '{provider}' failed for {len(symbols)} symbols: {e}")
+        finally:
+            now = self.clock()
+            with self._lock:
+                for symbol in symbols:
+                    price = prices.get(symbol)
+                    key = (provider, symbol)
+                    if price is not None:  # misses aren't cached, the next call retries them
+                        self._entries[key] = (price, now)
+                        self._entries.move_to_end(key)
+                    self._inflight.pop(key).set_result(price)
+                    result[symbol] = price
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[1] == symbol]:
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced,
+                "upstream_calls": self.upstream_calls, "evictions": self.evictions,
+                "saved_calls": lookups - self.upstream_calls, "size": len(self._entries)}
+
+
+# ----- Providers -----
+
+def yfinance_quotes(symbols):
+    """Local price store first; one batched yfinance download for whatever it lacks.
+
+    Symbols the batch download still couldn't price get a last-resort live lookup.
+    """
+    from price_store import default_store
+    from utils import safe_price
+
+    store = default_store()
+    prices = {s: store.latest_price(s) for s in symbols}
+    missing = [s for s, p in prices.items() if p is None]
+    if missing:
+        try:
+            store.update(missing, days=PRICE_WARMUP_DAYS)
+        except Exception as e:
+            print(f"⚠️ Batch price download failed for {len(missing)} symbols: {e}")
+        prices.update({s: store.latest_price(s) for s in missing})
+    prices.update({s: safe_price(s) for s, p in prices.items() if p is None})
+    return prices
+
+
+def polygon_quotes(symbols):
+    """Previous closes from one grouped-daily call; per-symbol /prev only for tickers it lacks."""
+    import update_universe
+
+    grouped = update_universe.fetch_grouped_daily()
+    prices = {s: grouped[s]["c"] for s in symbols if grouped.get(s, {}).get("c") is not None}
+    misses = [s for s in symbols if s not in prices]
+    if misses:
+        prices.update(update_universe.fetch_prices(misses))
+    return prices
+
+
+_default_cache = None
+
+
+def default_cache() -> QuoteCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = QuoteCache({"yfinance": yfinance_quotes, "polygon": polygon_quotes})
+    return _default_cache
+
+
+def get_quote(symbol, provider=None) -> Optional[float]:
+    return default_cache().get(symbol, provider)
+
+
+def get_quotes(symbols, provider=None) -> Dict[str, Optional[float]]:
+    return default_cache().get_many(symbols, provider)
+
+
+def print_stats(cache: QuoteCache = None):
+    s = (cache or default_cache()).stats()
+    print(f"📈 Quotes: {s['hits']} hits, {s['misses']} misses, {s['coalesced']} coalesced, "
+          f"{s['upstream_calls']} upstream calls ({s['saved_calls']} saved)")
@@ -0,0 +1,125 @@
+"""Vectorized multi-factor scoring for the ranking step.
+
+Factors are plain functions over column arrays, registered with `@factor`.
+The weighted sum of the enabled factors is the score; `top_n` selects the best
+rows with argpartition instead of sorting the whole universe.
+
+RANK_FACTORS picks the factors and weights, e.g. "market_cap:1,whale:1,momentum:0.5".
+"""
+import os
+
+import numpy as np
+
+DEFAULT_FACTORS = os.getenv("RANK_FACTORS", "market_cap:1,whale:1")
+
+FACTORS = {}
+
+
+def factor(name, requires=()):
+    """Register a factor. Rows missing any `requires` column are not eligible for ranking."""
+    def wrap(fn):
+        FACTORS[name] = (fn, tuple(requires))
+        return fn
+    return wrap
+
+
+def parse_weights(spec: str) -> dict:
+    weights = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, weight = item.partition(":")
+        if name not in FACTORS:
+            raise ValueError(f"Unknown ranking factor '{name}' (known: {', '.join(sorted(FACTORS))})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def _as_float(values) -> np.ndarray:
+    if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+        return values
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def _as_str(values) -> np.ndarray:
+    if isinstance(values, np.ndarray) and values.dtype.kind == "U":
+        return values
+    return np.array(["" if v is None else str(v) for v in values])
+
+
+@factor("market_cap", requires=("marketCap",))
+def market_cap_score(cols, signals):
+    """sqrt of market cap in $bn, a gentle size tilt."""
+    return np.sqrt(np.clip(np.nan_to_num(_as_float(cols["marketCap"])), 0, None) / 1e9)
+
+
+@factor("momentum")
+def momentum_score(cols, signals):
+    """Daily % change squashed into (-1, 1); 0 where unknown."""
+    if "changePct" not in cols:
+        return 0.0
+    return np.tanh(np.nan_to_num(_as_float(cols["changePct"])) / 10.0)
+
+
+@factor("volume")
+def volume_score(cols, signals):
+    """log10 of traded volume, scaled so 10M shares ~ 0.7."""
+    if "volume" not in cols:
+        return 0.0
+    return np.log10(1 + np.clip(np.nan_to_num(_as_float(cols["volume"])), 0, None)) / 10.0
+
+
+@factor("whale")
+def whale_score(cols, signals):
+    """Whale-flow boost, joined onto the universe by symbol."""
+    boosts, _ = join_signals(cols["symbol"], signals)
+    return boosts
+
+
+def join_signals(symbols, signals):
+    """Vectorized join of {symbol: {"boost", "signal"}} onto a symbol column.
+
+    Returns (boost per row, index into the signal list or -1) via a sorted
+    searchsorted lookup rather than a dict probe per row.
+    """
+    symbols = _as_str(symbols)
+    n = len(symbols)
+    if not signals or n == 0:
+        return np.zeros(n), np.full(n, -1)
+    keys = np.array(list(signals))
+    boosts = np.array([s.get("boost", 0.0) for s in signals.values()], dtype=np.float64)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    pos = np.clip(np.searchsorted(sorted_keys, symbols), 0, len(keys) - 1)
+    hit = sorted_keys[pos] == symbols
+    idx = np.where(hit, order[pos], -1)
+    return np.where(hit, boosts[np.maximum(idx, 0)], 0.0), idx
+
+
+def score(cols, signals=None, weights=None):
+    """Return (scores, eligible) arrays for a dict of columns."""
+    weights = weights if weights is not None else parse_weights(DEFAULT_FACTORS)
+    signals = signals or {}
+    n = len(cols["symbol"])
+    eligible = ~np.isnan(_as_float(cols["price"])) if "price" in cols else np.ones(n, dtype=bool)
+    total = np.zeros(n)
+    for name, weight in weights.items():
+        fn, requires = FACTORS[name]
+        for col in requires:
+            eligible &= ~np.isnan(_as_float(cols[col])) if col in cols else False
+        total += weight * fn(cols, signals)
+    return total, eligible
+
+
+def top_n(scores, n, eligible=None):
+    """Indices of the `n` highest scores (ties broken by original order), best first."""
+    candidates = np.flatnonzero(eligible) if eligible is not None else np.arange(len(scores))
+    if n <= 0 or candidates.size == 0:
+        return candidates[:0]
+    values = scores[candidates]
+    if candidates.size > n:
+        # argpartition picks arbitrarily among ties at the cut: keep everything above
+        # the n-th best value, then the earliest rows equal to it
+        kth = -np.partition(-values, n - 1)[n - 1]
+        above = np.flatnonzero(values > kth)
+        keep = np.concatenate((above, np.flatnonzero(values == kth)[:n - above.size]))
+        candidates, values = candidates[keep], values[keep]
+    return candidates[np.lexsort((candidates, -values))]
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Snapshot history for the data/ datasets: compressed, delta-encoded, indexed.
+
+Each `record` of a dataset (every run's data/stocks.json, data/crypto.json,
+data/gpt_recommendations.json, ...) becomes one timestamped file under
+SNAPSHOT_DIR/<name>/:
+
+- a full snapshot (every row) for the first record, every SNAPSHOT_FULL_EVERY
+  records after that, and whenever rows can't be keyed (missing/duplicate keys)
+- otherwise a delta against the previous snapshot: the rows that were added or
+  changed, the keys that were removed, and the key order only if it changed
+- nothing at all when the rows are identical to the previous snapshot
+
+Snapshot files are gzip'd compact JSON, written under a temp name and renamed;
+index.ndjson (one line per snapshot: ts, file, kind, row counts, bytes) is then
+replaced the same way, so a reader never sees a half-written snapshot. `at(ts)`
+loads the nearest full snapshot at or before ts and replays at most
+SNAPSHOT_FULL_EVERY - 1 deltas; `range(start, end)` walks the chain once.
+
+    python scripts/snapshot_store.py record data/stocks.json data/crypto.json
+    python scripts/snapshot_store.py list stocks
+    python scripts/snapshot_store.py at stocks --ts 2024-05-01T12:00 --output /tmp/stocks.json
+"""
+import argparse
+import bisect
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+import dataset_store
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "data/history")
+SNAPSHOT_FULL_EVERY = int(os.getenv("SNAPSHOT_FULL_EVERY", "20"))
+SNAPSHOT_COMPRESSION = int(os.getenv("SNAPSHOT_COMPRESSION", "6"))  # gzip level 1-9
+INDEX_FILE = "index.ndjson"
+
+
+def parse_ts(value) -> float:
+    """Epoch seconds from a number or an ISO date/time (naive = UTC)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        dt = datetime.fromisoformat(str(value))
+        return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def _write_atomic(path, text: str, compress=False):
+    tmp = f"{path}.tmp"
+    if compress:
+        with gzip.open(tmp, "wt", compresslevel=SNAPSHOT_COMPRESSION) as f:
+            f.write(text)
+    else:
+        with open(tmp, "w") as f:
+            f.write(text)
+    os.replace(tmp, path)
+
+
+def _read_gz(path):
+    with gzip.open(path, "rt") as f:
+        return json.load(f)
+
+
+def _keyed(rows, key) -> Optional[dict]:
+    """{key value: row} in row order, or None if a row has no key or a key repeats."""
+    keyed = {}
+    for row in rows:
+        k = row.get(key) if isinstance(row, dict) else None
+        if k is None or k in keyed:
+            return None
+        keyed[k] = row
+    return keyed
+
+
+def diff(old: dict, new: dict) -> dict:
+    """Delta turning keyed state `old` into `new` (see apply)."""
+    upsert = [row for k, row in new.items() if old.get(k) != row]
+    removed = [k for k in old if k not in new]
+    # apply() keeps surviving keys in place and appends new ones; record the order only if that's wrong
+    gone = set(removed)
+    implied = [k for k in old if k not in gone] + [k for k in new if k not in old]
+    return {"upsert": upsert, "removed": removed, "order": None if implied == list(new) else list(new)}
+
+
+def apply(state: dict, delta: dict, key) -> dict:
+    for k in delta["removed"]:
+        state.pop(k, None)
+    for row in delta["upsert"]:
+        state[row[key]] = row
+    if delta.get("order") is not None:
+        state = {k: state[k] for k in delta["order"]}
+    return state
+
+
+class SnapshotStore:
+    def __init__(self, name, directory=SNAPSHOT_DIR, key="symbol", full_every=SNAPSHOT_FULL_EVERY):
+        self.name = name
+        self.directory = os.path.join(directory, name)
+        self.key = key
+        self.full_every = max(1, full_every)
+        self._entries = None
+        self._head = None  # (position, state) of the latest snapshot once reconstructed
+
+    # ----- Index -----
+
+    def entries(self) -> List[dict]:
+        if self._entries is None:
+            path = os.path.join(self.directory, INDEX_FILE)
+            try:
+                with open(path, "r") as f:
+                    self._entries = [json.loads(line) for line in f if line.strip()]
+            except FileNotFoundError:
+                self._entries = []
+        return self._entries
+
+    def times(self) -> List[float]:
+        return [e["ts"] for e in self.entries()]
+
+    def _position(self, ts) -> int:
+        """Index of the last snapshot at or before ts (-1 if none)."""
+        if ts is None:
+            return len(self.entries()) - 1
+        return bisect.bisect_right(self.times(), ts) - 1
+
+    def _load(self, entry):
+        return _read_gz(os.path.join(self.directory, entry["file"]))
+
+    # ----- Reading -----
+
+    def _state_at(self, pos):
+        """Rows at snapshot `pos`: a dict keyed like the snapshots, or a plain list if unkeyed."""
+        if self._head is not None and self._head[0] == pos:
+            return self._head[1]
+        entries = self.entries()
+        start = pos
+        while entries[start]["kind"] != "full":
+            start -= 1
+        state = None
+        for entry in entries[start:pos + 1]:
+            state = self._step(state, entry)
+        return state
+
+    def _step(self, state, entry):
+        data = self._load(entry)
+        if entry["kind"] == "full":
+            rows = data["rows"]
+            return _keyed(rows, self.key) if data.get("keyed") else rows
+        return apply(dict(state), data, self.key)
+
+    @staticmethod
+    def _rows(state) -> list:
+        return list(state.values()) if isinstance(state, dict) else list(state)
+
+    def at(self, ts=None) -> Optional[list]:
+        """Rows as of `ts` (epoch seconds; None = latest), or None before the first snapshot."""
+        pos = self._position(ts)
+        return None if pos < 0 else self._rows(self._state_at(pos))
+
+    def range(self, start=None, end=None) -> Iterator[Tuple[float, list]]:
+        """(ts, rows) for every snapshot with start <= ts <= end, replaying the chain once."""
+        entries = self.entries()
+        first = 0 if start is None else bisect.bisect_left(self.times(), start)
+        last = self._position(end)
+        state = None
+        for pos in range(first, last + 1):
+            state = self._state_at(pos) if state is None else self._step(state, entries[pos])
+            yield entries[pos]["ts"], self._rows(state)
+
+    # ----- Writing -----
+
+    def record(self, rows, ts=None) -> Optional[dict]:
+        """Add a snapshot of `rows`; returns its index entry, or None if nothing changed."""
+        rows = list(rows)
+        entries = self.entries()
+        ts = round(time.time() if ts is None else float(ts), 3)
+        keyed = _keyed(rows, self.key)
+        prev = self._state_at(len(entries) - 1) if entries else None
+        if prev is not None and self._rows(prev) == rows:
+            return None
+        if entries and ts <= entries[-1]["ts"]:
+            ts = round(entries[-1]["ts"] + 0.001, 3)  # keep the index strictly increasing
+
+        since_full = next((i for i, e in enumerate(reversed(entries)) if e["kind"] == "full"), len(entries))
+        if keyed is None or not isinstance(prev, dict) or since_full + 1 >= self.full_every:
+            kind, payload = "full", {"keyed": keyed is not None, "key": self.key, "rows": rows}
+            stats = {"rows": len(rows), "changed": len(rows), "removed": 0}
+        else:
+            kind, payload = "delta", diff(prev, keyed)
+            stats = {"rows": len(rows), "changed": len(payload["upsert"]), "removed": len(payload["removed"])}
+
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{int(ts * 1000)}.{kind}.json.gz"
+        path = os.path.join(self.directory, name)
+        _write_atomic(path, json.dumps(payload, separators=(",", ":")), compress=True)
+        entry = {"ts": ts, "file": name, "kind": kind, **stats, "bytes": os.path.getsize(path)}
+        index = "".join(json.dumps(e) + "\n" for e in [*entries, entry])
+        _write_atomic(os.path.join(self.directory, INDEX_FILE), index)
+
+        entries.append(entry)
+        self._head = (len(entries) - 1, keyed if keyed is not None else rows)
+        return entry
+
+
+def dataset_name(path) -> str:
+    return os.path.basename(str(path)).split(".")[0]
+
+
+def record_file(path, name=None, key="symbol", ts=None, directory=SNAPSHOT_DIR) -> Optional[dict]:
+    """Snapshot a dataset file (any format dataset_store reads) under `name` (default: file stem)."""
+    rows = dataset_store.load_records(path)
+    return SnapshotStore(name or dataset_name(path), directory, key).record(rows, ts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="snapshot dataset files (unchanged ones are skipped)")
+    rec.add_argument("paths", nargs="+")
+    rec.add_argument("--key", default="symbol")
+    ls = sub.add_parser("list", help="show a dataset's snapshots")
+    ls.add_argument("name")
+    at = sub.add_parser("at", help="reconstruct a dataset as of a time")
+    at.add_argument("name")
+    at.add_argument("--ts", help="epoch seconds or ISO time (default: latest)")
+    at.add_argument("--output", help="write the rows here (any dataset_store path) instead of a summary")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        for path in args.paths:
+            if not dataset_store.exists(path):
+                print(f"⚠️ Missing {path}, skipping")
+                continue
+            entry = record_file(path, key=args.key)
+            if entry is None:
+                print(f"⏭️ {path} unchanged since its last snapshot")
+            else:
+                print(f"📸 {path} → {entry['kind']} snapshot ({entry['changed']} changed, "
+                      f"{entry['removed']} removed of {entry['rows']} rows, {entry['bytes'] / 1024:.1f} KB)")
+    elif args.command == "list":
+        store = SnapshotStore(args.name)
+        for e in store.entries():
+            when = datetime.fromtimestamp(e["ts"], timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{when}  {e['kind']:<5} rows={e['rows']:<7} changed={e['changed']:<7} "
+                  f"removed={e['removed']:<6} {e['bytes'] / 1024:>8.1f} KB")
+        total = sum(e["bytes"] for e in store.entries())
+        print(f"📚 {len(store.entries())} snapshots, {total / 1e6:.2f} MB")
+    else:
+        rows = SnapshotStore(args.name).at(parse_ts(args.ts) if args.ts else None)
+        if rows is None:
+            print(f"❌ No snapshot of {args.name} at or before {args.ts}")
+            exit(1)
+        if args.output:
+            dataset_store.save(args.output, rows)
+            print(f"✅ Wrote {len(rows)} rows → {args.output}")
+        else:
+            print(f"📄 {len(rows)} rows")
+
+
+if __name__ == "__main__":
+    main()
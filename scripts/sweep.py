@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Parallel parameter sweep over the policy thresholds:
+- grid (`--grid min_confidence=0.6,0.7,0.8 stop_loss_pct=0.03,0.05`) or random
+  search (`--random 200 --range min_confidence=0.5:0.9 ...`) over PolicyParams fields
+- each combination is a backtest.run_backtest replay, run on a process pool
+- bars and the score matrix are written once as .npy files and memory-mapped
+  read-only by every worker, so workers share the page cache instead of copying
+- results are written as a table ranked by `--rank-by` (CSV)
+"""
+import argparse
+import csv
+import itertools
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields, replace
+
+import numpy as np
+
+from backtest import Bars, load_bars, load_score_matrix, run_backtest
+from policy_engine import DEFAULT_PARAMS, PolicyParams
+
+PARAM_TYPES = {f.name: (int if f.type in (int, "int") else float) for f in fields(PolicyParams)}
+ARRAYS = ("days", "open", "high", "low", "close", "scores")
+
+_worker = {}
+
+
+def parse_grid(items):
+    grid = {}
+    for item in items or []:
+        name, _, values = item.partition("=")
+        if name not in PARAM_TYPES:
+            raise SystemExit(f"❌ Unknown parameter '{name}' (known: {', '.join(PARAM_TYPES)})")
+        grid[name] = [PARAM_TYPES[name](v) for v in values.split(",") if v]
+    return grid
+
+
+def parse_ranges(items):
+    ranges = {}
+    for item in items or []:
+        name, _, span = item.partition("=")
+        if name not in PARAM_TYPES:
+            raise SystemExit(f"❌ Unknown parameter '{name}' (known: {', '.join(PARAM_TYPES)})")
+        lo, _, hi = span.partition(":")
+        ranges[name] = (PARAM_TYPES[name](lo), PARAM_TYPES[name](hi))
+    return ranges
+
+
+def grid_combinations(grid):
+    names = list(grid)
+    for values in itertools.product(*(grid[n] for n in names)):
+        yield dict(zip(names, values))
+
+
+def random_combinations(ranges, n, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield {name: (rng.randint(lo, hi) if PARAM_TYPES[name] is int else round(rng.uniform(lo, hi), 4))
+               for name, (lo, hi) in ranges.items()}
+
+
+def share_arrays(bars: Bars, scores, directory):
+    """Write the replay inputs once; workers memory-map them instead of receiving copies."""
+    for name in ARRAYS:
+        np.save(os.path.join(directory, f"{name}.npy"), scores if name == "scores" else getattr(bars, name))
+    with open(os.path.join(directory, "symbols.txt"), "w") as f:
+        f.write("\n".join(bars.symbols))
+
+
+def _init_worker(directory):
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+    with open(os.path.join(directory, "symbols.txt"), "r") as f:
+        symbols = f.read().split("\n")
+    _worker["bars"] = Bars(arrays["days"], symbols, arrays["open"], arrays["high"], arrays["low"], arrays["close"])
+    _worker["scores"] = arrays["scores"]
+
+
+def _run_one(job):
+    overrides, initial_cash, fee_bps = job
+    params = replace(DEFAULT_PARAMS, **overrides)
+    report = run_backtest(_worker["bars"], _worker["scores"], params, initial_cash=initial_cash, fee_bps=fee_bps)
+    return {**asdict(params), **report}
+
+
+def sweep(bars: Bars, scores, combos, workers=None, initial_cash=100_000.0, fee_bps=0.0):
+    """Run every parameter combination in parallel; returns unranked result rows."""
+    jobs = [(c, initial_cash, fee_bps) for c in combos]
+    with tempfile.TemporaryDirectory(prefix="sweep-") as tmp:
+        share_arrays(bars, scores, tmp)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tmp,)) as pool:
+            return list(pool.map(_run_one, jobs, chunksize=max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))))
+
+
+def rank_results(rows, key="return_pct"):
+    return sorted(rows, key=lambda r: (r.get(key) is None, -(r.get(key) or 0)))
+
+
+def write_table(rows, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["rank", *rows[0].keys()])
+        writer.writeheader()
+        for i, row in enumerate(rows, start=1):
+            writer.writerow({"rank": i, **row})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recs-dir", required=True, help="directory of recommendation snapshot files")
+    parser.add_argument("--bars", required=True, help="bars .npz file or directory of per-symbol CSVs")
+    parser.add_argument("--grid", nargs="*", help="name=v1,v2,... (cartesian product)")
+    parser.add_argument("--random", type=int, default=0, help="number of random samples from --range")
+    parser.add_argument("--range", nargs="*", dest="ranges", help="name=lo:hi for random search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cash", type=float, default=100_000.0)
+    parser.add_argument("--fee-bps", type=float, default=0.0)
+    parser.add_argument("--rank-by", default="return_pct")
+    parser.add_argument("--output", default="data/sweep_results.csv")
+    args = parser.parse_args()
+
+    # An empty grid/range set would "sweep" a single all-default run
+    grid, ranges = parse_grid(args.grid), parse_ranges(args.ranges)
+    if args.random:
+        combos = list(random_combinations(ranges, args.random, args.seed)) if ranges else []
+    else:
+        combos = list(grid_combinations(grid)) if grid else []
+    if not combos:
+        raise SystemExit("❌ Nothing to sweep: pass --grid or --random with --range")
+
+    bars = load_bars(args.bars)
+    scores = load_score_matrix(args.recs_dir, bars)
+    print(f"🚀 Sweeping {len(combos)} parameter sets over {len(bars.days)} bars × {len(bars.symbols)} symbols")
+
+    started = time.perf_counter()
+    rows = rank_results(sweep(bars, scores, combos, args.workers, args.cash, args.fee_bps), args.rank_by)
+    write_table(rows, args.output)
+    print(f"✅ {len(rows)} runs in {time.perf_counter() - started:.1f}s → {args.output}")
+    for row in rows[:5]:
+        shown = {k: row[k] for k in (*combos[0].keys(), args.rank_by, "max_drawdown_pct", "trades")}
+        print(f"🏆 {shown}")
+
+
+if __name__ == "__main__":
+    main()
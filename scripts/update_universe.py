@@ -3,99 +3,302 @@ import os
 import time
 import json
 import requests
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import dataset_store
+import http_client
+import metrics
+from ratelimit import backoff_delay, retry_after_seconds
 
 POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
+POLYGON_BASE_URL = os.getenv("POLYGON_BASE_URL", "https://api.polygon.io").rstrip("/")
 STOCKS_FILE = "data/stocks.json"
 PAGE_SIZE = 200  # Polygon max per request
 
-def fetch_tickers():
-    """Fetch the complete list of active stock tickers from Polygon."""
-    tickers = []
-    url = f"https://api.polygon.io/v3/reference/tickers?market=stocks&active=true&limit={PAGE_SIZE}&apiKey={POLYGON_API_KEY}"
+# Polygon plan limits (free tier: 5 requests/minute)
+POLYGON_RATE_LIMIT = float(os.getenv("POLYGON_RATE_LIMIT", "5"))  # requests per minute
+POLYGON_MAX_WORKERS = int(os.getenv("POLYGON_MAX_WORKERS", "8"))
+POLYGON_MAX_RETRIES = int(os.getenv("POLYGON_MAX_RETRIES", "5"))
+
+# "bulk" prices the universe from one grouped-daily call; "per_symbol" uses /prev per ticker
+PRICING_MODE = os.getenv("PRICING_MODE", "bulk").lower()
+GROUPED_LOOKBACK_DAYS = 7
+GROUPED_CACHE_TTL = 24 * 3600
+PER_SYMBOL_FALLBACK_LIMIT = 300
+# Max tickers to keep (0 = whole market); per-symbol pricing defaults to the old 300 cap
+UNIVERSE_LIMIT = int(os.getenv("UNIVERSE_LIMIT", "0" if PRICING_MODE == "bulk" else "300"))
+
+# Ticker reference cache (see fetch_tickers)
+TICKER_CACHE_FILE = os.getenv("TICKER_CACHE_FILE", "data/cache/tickers.json")
+TICKER_CACHE_TTL_HOURS = float(os.getenv("TICKER_CACHE_TTL_HOURS", "24"))
+TICKER_FULL_SYNC_DAYS = float(os.getenv("TICKER_FULL_SYNC_DAYS", "7"))
+
+# One bucket shared by every request this process makes to Polygon
+http_client.set_rate_limit(http_client.host_of(POLYGON_BASE_URL), POLYGON_RATE_LIMIT)
+
+def _parse_utc(value):
+    """Parse a Polygon/ISO-8601 UTC timestamp ("...Z"), or None."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _format_utc(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def page_tickers(active=True, updated_since=None):
+    """Page through Polygon's ticker reference list.
+
+    With `updated_since`, pages are requested newest-first by last_updated_utc and
+    paging stops at the first row older than that time. Returns (rows, complete).
+    """
+    url = (f"{POLYGON_BASE_URL}/v3/reference/tickers?market=stocks&active={str(active).lower()}"
+           f"&limit={PAGE_SIZE}&apiKey={POLYGON_API_KEY}")
+    if updated_since:
+        url += "&sort=last_updated_utc&order=desc"
+    rows = []
     next_url = url
 
     while next_url:
-        response = requests.get(next_url)
-        if response.status_code == 429:
-            print("⚠️ Hit Polygon rate limit. Sleeping for 12s...")
-            time.sleep(12)
-            continue
+        response = polygon_get(next_url)
+        if response is None:
+            print("❌ Failed to fetch tickers: no response from Polygon")
+            return rows, False
 
         if response.status_code != 200:
             print(f"❌ Failed to fetch tickers: {response.status_code} - {response.text}")
-            break
+            return rows, False
 
         data = response.json()
-        tickers.extend(data.get("results", []))
+        page = data.get("results", [])
+        if updated_since:
+            fresh = [r for r in page if (_parse_utc(r.get("last_updated_utc")) or updated_since) >= updated_since]
+            rows.extend(fresh)
+            if len(fresh) < len(page):
+                break
+        else:
+            rows.extend(page)
         next_url = data.get("next_url")
         if next_url:
             next_url += f"&apiKey={POLYGON_API_KEY}"
 
-    print(f"✅ Fetched {len(tickers)} tickers from Polygon")
-    return tickers
+    return rows, True
 
 
-def fetch_stock_price(symbol):
-    """Fetch the latest close price for a given stock symbol from Polygon."""
-    url = f"https://api.polygon.io/v2/aggs/ticker/{symbol}/prev?apiKey={POLYGON_API_KEY}"
+def load_ticker_cache():
+    if not os.path.exists(TICKER_CACHE_FILE):
+        return None
     try:
-        response = requests.get(url)
-        if response.status_code == 429:
-            print("⚠️ Rate limit hit. Sleeping 12s...")
-            time.sleep(12)
-            return fetch_stock_price(symbol)
+        with open(TICKER_CACHE_FILE, "r") as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        print("⚠️ Ticker cache unreadable, doing a full sync")
+        return None
+    if not _parse_utc(cache.get("synced_at")) or not isinstance(cache.get("tickers"), dict):
+        return None
+    return cache
 
-        if response.status_code != 200:
-            print(f"⚠️ Failed {symbol}: {response.status_code}")
-            return None
 
-        data = response.json()
-        results = data.get("results", [])
-        if not results:
-            return None
-        return results[0].get("c")  # Closing price
-    except Exception as e:
+def save_ticker_cache(cache):
+    """Write the ticker cache atomically so an interrupted run never leaves a torn file."""
+    os.makedirs(os.path.dirname(TICKER_CACHE_FILE), exist_ok=True)
+    tmp = f"{TICKER_CACHE_FILE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, TICKER_CACHE_FILE)
+
+
+@metrics.timed()
+def fetch_tickers():
+    """Return the list of active stock tickers, served from the on-disk cache when possible.
+
+    - cache younger than TICKER_CACHE_TTL_HOURS: no network calls at all
+    - older: pull only tickers updated since the last sync (and drop newly inactive ones)
+    - missing, or last full sync older than TICKER_FULL_SYNC_DAYS: page the whole list
+    """
+    now = datetime.now(timezone.utc)
+    cache = load_ticker_cache()
+
+    if cache:
+        synced_at = _parse_utc(cache["synced_at"])
+        full_sync_at = _parse_utc(cache.get("full_sync_at")) or synced_at
+        if now - synced_at < timedelta(hours=TICKER_CACHE_TTL_HOURS):
+            tickers = [cache["tickers"][k] for k in sorted(cache["tickers"])]
+            print(f"✅ Loaded {len(tickers)} tickers from cache (synced {cache['synced_at']})")
+            return tickers
+        if now - full_sync_at >= timedelta(days=TICKER_FULL_SYNC_DAYS):
+            cache = None
+
+    if cache:
+        # Overlap the window a little so rows updated mid-sync aren't missed
+        since = _parse_utc(cache["synced_at"]) - timedelta(hours=1)
+        updated, ok_active = page_tickers(active=True, updated_since=since)
+        delisted, ok_inactive = page_tickers(active=False, updated_since=since)
+        rows = cache["tickers"]
+        for t in updated:
+            if t.get("ticker"):
+                rows[t["ticker"]] = t
+        for t in delisted:
+            rows.pop(t.get("ticker"), None)
+        if ok_active and ok_inactive:
+            cache["synced_at"] = _format_utc(now)
+            save_ticker_cache(cache)
+        print(f"🔁 Incremental ticker sync: {len(updated)} updated, {len(delisted)} delisted")
+    else:
+        fetched, complete = page_tickers(active=True)
+        rows = {t["ticker"]: t for t in fetched if t.get("ticker")}
+        if complete and rows:
+            save_ticker_cache({"synced_at": _format_utc(now), "full_sync_at": _format_utc(now), "tickers": rows})
+        print(f"✅ Fetched {len(rows)} tickers from Polygon")
+
+    return [rows[k] for k in sorted(rows)]
+
+
+def polygon_get(url, cache_ttl=None):
+    """GET a Polygon URL under the shared rate limit, retrying 429/5xx with jittered backoff.
+
+    Returns the final response, or None if the request never got through.
+    """
+    for attempt in range(POLYGON_MAX_RETRIES + 1):
+        try:
+            response = http_client.get(url, cache_ttl=cache_ttl)
+        except requests.RequestException as e:
+            if attempt == POLYGON_MAX_RETRIES or http_client.OFFLINE:
+                print(f"⚠️ Polygon request failed: {e}")
+                return None
+            metrics.incr("http_retries", host="polygon", reason="error")
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        if response.status_code == 429 or response.status_code >= 500:
+            if attempt == POLYGON_MAX_RETRIES:
+                return response
+            metrics.incr("http_retries", host="polygon", reason=response.status_code)
+            time.sleep(retry_after_seconds(response, backoff_delay(attempt)))
+            continue
+        return response
+    return None
+
+
+@metrics.timed()
+def fetch_stock_price(symbol):
+    """Fetch the latest close price for a given stock symbol from Polygon."""
+    url = f"{POLYGON_BASE_URL}/v2/aggs/ticker/{symbol}/prev?apiKey={POLYGON_API_KEY}"
+    response = polygon_get(url)
+    if response is None:
+        return None
+    if response.status_code != 200:
+        print(f"⚠️ Failed {symbol}: {response.status_code}")
+        return None
+
+    try:
+        results = response.json().get("results", [])
+    except ValueError as e:
         print(f"⚠️ Error fetching {symbol}: {e}")
         return None
+    if not results:
+        return None
+    return results[0].get("c")  # Closing price
 
 
-def build_stock_list(limit=300):
-    """Build stock universe with price + metadata."""
-    tickers = fetch_tickers()
-    stocks = []
+@metrics.timed()
+def fetch_grouped_daily(lookback_days=GROUPED_LOOKBACK_DAYS):
+    """Fetch daily bars for the whole US market from Polygon's grouped-daily endpoint.
 
-    for i, t in enumerate(tickers[:limit], start=1):
-        symbol = t.get("ticker")
-        name = t.get("name", "Unknown")
-        market = t.get("market", "stocks")
+    Walks back from yesterday until a trading day with results is found (weekends
+    and holidays return an empty set). Returns {ticker: bar} with Polygon's o/h/l/c/v keys.
+    """
+    day = datetime.now(timezone.utc).date()
+    for _ in range(lookback_days):
+        day -= timedelta(days=1)
+        url = (f"{POLYGON_BASE_URL}/v2/aggs/grouped/locale/us/market/stocks/{day.isoformat()}"
+               f"?adjusted=true&apiKey={POLYGON_API_KEY}")
+        # A past trading day's bars never change, so they're safe to cache for a while
+        response = polygon_get(url, cache_ttl=GROUPED_CACHE_TTL)
+        if response is None or response.status_code != 200:
+            status = response.status_code if response is not None else "no response"
+            print(f"⚠️ Grouped daily fetch failed for {day}: {status}")
+            return {}
+        results = response.json().get("results") or []
+        if results:
+            print(f"✅ Fetched grouped daily bars for {len(results)} tickers ({day})")
+            return {r["T"]: r for r in results if r.get("T")}
+    print(f"⚠️ No grouped daily data in the last {lookback_days} days")
+    return {}
+
+
+def fetch_prices(symbols, max_workers=POLYGON_MAX_WORKERS):
+    """Fetch closing prices for many symbols concurrently, under the shared rate limit."""
+    prices = {}
+    total = len(symbols)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_stock_price, s): s for s in symbols}
+        for done, future in enumerate(as_completed(futures), start=1):
+            prices[futures[future]] = future.result()
+            if done % 25 == 0:
+                print(f"📦 Processed {done}/{total} stocks")
+    return prices
 
-        price = fetch_stock_price(symbol)
 
+def build_stock_list(limit=300, pricing_mode=None):
+    """Build stock universe with price + metadata.
+
+    In "bulk" mode prices come from one grouped-daily snapshot, joined by ticker;
+    at most PER_SYMBOL_FALLBACK_LIMIT symbols missing from it fall back to
+    per-symbol /prev calls (thousands of untraded warrants/preferreds would take
+    hours at the free-tier rate), and tickers left unpriced are dropped.
+    """
+    pricing_mode = pricing_mode or PRICING_MODE
+    tickers = fetch_tickers()[:limit]
+    symbols = [t.get("ticker") for t in tickers]
+
+    if pricing_mode == "bulk":
+        grouped = fetch_grouped_daily()
+        prices = {s: grouped[s]["c"] for s in symbols if grouped.get(s, {}).get("c") is not None}
+        misses = [s for s in symbols if s not in prices]
+        fallback = misses[:PER_SYMBOL_FALLBACK_LIMIT]
+        if grouped and misses:
+            print(f"🔁 {len(misses)} tickers missing from grouped daily, "
+                  f"falling back to per-symbol calls for {len(fallback)}")
+        prices.update(fetch_prices(fallback))
+        tickers = [t for t in tickers if prices.get(t.get("ticker"))]
+    else:
+        grouped = {}
+        prices = fetch_prices(symbols)
+    stocks = []
+
+    for t in tickers:
+        symbol = t.get("ticker")
+        price = prices.get(symbol)
+        bar = grouped.get(symbol, {})
         stocks.append({
             "symbol": symbol,
-            "name": name,
-            "market": market,
+            "name": t.get("name", "Unknown"),
+            "market": t.get("market", "stocks"),
             "price": price if price else None,
-            "marketCap": t.get("market_cap", None)
+            "marketCap": t.get("market_cap", None),
+            # Only known in bulk mode; used by the volume/momentum ranking factors
+            "volume": bar.get("v"),
+            "changePct": round((bar["c"] / bar["o"] - 1) * 100, 3) if bar.get("o") and bar.get("c") else None
         })
 
-        if i % 25 == 0:
-            print(f"📦 Processed {i}/{limit} stocks")
-
     return stocks
 
 
 def save_stocks(stocks):
-    """Save stocks to JSON."""
-    os.makedirs(os.path.dirname(STOCKS_FILE), exist_ok=True)
-    with open(STOCKS_FILE, "w") as f:
-        json.dump(stocks, f, indent=2)
+    """Save stocks to the dataset store (columnar + JSON export)."""
+    dataset_store.save(STOCKS_FILE, stocks)
     print(f"✅ Saved {len(stocks)} stocks → {STOCKS_FILE}")
 
 
 def main():
     print("🚀 Fetching stock universe from Polygon...")
-    stocks = build_stock_list(limit=300)
+    stocks = build_stock_list(limit=UNIVERSE_LIMIT or None)
 
     if not stocks:
         print("❌ No stock data fetched. Exiting.")
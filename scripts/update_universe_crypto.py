@@ -1,48 +1,164 @@
 import os
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
-# Output path
+import dataset_store
+import http_client
+import metrics
+from ratelimit import backoff_delay, retry_after_seconds
+
+# Output path (the current universe; its change history is kept as compressed
+# deltas by the pipeline's history stage, see scripts/snapshot_store.py)
 OUTPUT_FILE = "data/crypto.json"
 
-def fetch_top_crypto():
-    """Fetches top crypto assets from CoinGecko."""
-    url = "https://api.coingecko.com/api/v3/coins/markets"
+COINGECKO_URL = os.getenv("COINGECKO_URL", "https://api.coingecko.com/api/v3").rstrip("/")
+COINGECKO_API_KEY = os.getenv("COINGECKO_API_KEY")  # optional demo/pro key
+PER_PAGE = 250  # CoinGecko max per request
+CRYPTO_PAGES = int(os.getenv("CRYPTO_PAGES", "8"))  # 8 x 250 = top 2000 coins
+COINGECKO_MAX_WORKERS = int(os.getenv("COINGECKO_MAX_WORKERS", "4"))
+COINGECKO_MAX_RETRIES = int(os.getenv("COINGECKO_MAX_RETRIES", "5"))
+
+
+def coingecko_get(url, params):
+    """GET under the shared CoinGecko rate limit (HTTP_RATE_LIMITS), retrying 429/5xx."""
+    headers = {"x-cg-demo-api-key": COINGECKO_API_KEY} if COINGECKO_API_KEY else None
+    for attempt in range(COINGECKO_MAX_RETRIES + 1):
+        try:
+            response = http_client.get(url, params=params, headers=headers)
+        except requests.RequestException as e:
+            if attempt == COINGECKO_MAX_RETRIES or http_client.OFFLINE:
+                raise
+            metrics.incr("http_retries", host="coingecko", reason="error")
+            time.sleep(backoff_delay(attempt))
+            continue
+        if response.status_code == 429 or response.status_code >= 500:
+            if attempt == COINGECKO_MAX_RETRIES:
+                return response
+            metrics.incr("http_retries", host="coingecko", reason=response.status_code)
+            time.sleep(retry_after_seconds(response, backoff_delay(attempt)))
+            continue
+        return response
+    return None
+
+
+def fetch_page(page):
     params = {
         "vs_currency": "usd",
         "order": "market_cap_desc",
-        "per_page": 50,
-        "page": 1,
+        "per_page": PER_PAGE,
+        "page": page,
         "sparkline": False
     }
-    print(f"Fetching top crypto from {url}...")
-    response = requests.get(url, params=params)
-
+    response = coingecko_get(f"{COINGECKO_URL}/coins/markets", params)
     if response.status_code != 200:
-        raise RuntimeError(f"CoinGecko API failed! Status {response.status_code}: {response.text}")
+        raise RuntimeError(f"CoinGecko API failed on page {page}! Status {response.status_code}: {response.text}")
+    return response.json() or []
 
-    crypto_data = response.json()
-    if not crypto_data:
-        raise RuntimeError("No crypto data received from CoinGecko.")
 
-    # Clean & normalize data
-    cleaned_crypto = []
-    for coin in crypto_data:
-        cleaned_crypto.append({
+def fetch_pages(pages=CRYPTO_PAGES, max_workers=COINGECKO_MAX_WORKERS):
+    """Fetch pages 1..pages concurrently (the shared token bucket paces them); in rank order.
+
+    Stops at the first empty page. A failed page after page 1 truncates the list there
+    instead of failing the run.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fetch_page, p) for p in range(1, pages + 1)]
+        coins = []
+        for page, future in enumerate(futures, start=1):
+            try:
+                rows = future.result()
+            except Exception as e:
+                if page == 1:
+                    raise
+                print(f"⚠️ Stopping at page {page}: {e}")
+                break
+            if not rows:
+                break
+            coins.extend(rows)
+        for future in futures:
+            future.cancel()
+    return coins
+
+
+def index_by_symbol(coins):
+    """{SYMBOL: record}: on a symbol collision the largest market cap keeps the symbol.
+
+    CoinGecko `id`s are unique but symbols are not (forks, bridged copies, scams), and
+    everything downstream joins on symbol; the shadowed coins' ids are kept in `collisions`.
+    """
+    indexed = {}
+    for coin in coins:
+        symbol = (coin.get("symbol") or "").upper()
+        if not symbol or not coin.get("id"):
+            continue
+        record = {
             "id": coin.get("id"),
-            "symbol": coin.get("symbol").upper(),
+            "symbol": symbol,
             "name": coin.get("name"),
+            "rank": coin.get("market_cap_rank"),
             "current_price": coin.get("current_price"),
             "market_cap": coin.get("market_cap"),
-            "volume": coin.get("total_volume")
-        })
+            "volume": coin.get("total_volume"),
+            "collisions": None,
+        }
+        current = indexed.get(symbol)
+        if current is None:
+            indexed[symbol] = record
+            continue
+        if current["id"] == record["id"]:
+            continue  # same coin on two pages (the ranking shifted mid-fetch)
+        keep, shadowed = ((record, current) if (record["market_cap"] or 0) > (current["market_cap"] or 0)
+                          else (current, record))
+        ids = [shadowed["id"], *(shadowed["collisions"] or "").split(","), *(keep["collisions"] or "").split(",")]
+        keep["collisions"] = ",".join(sorted({i for i in ids if i and i != keep["id"]}))
+        indexed[symbol] = keep
+    return indexed
+
+
+def load_previous(path=OUTPUT_FILE):
+    if not dataset_store.exists(path):
+        return {}
+    try:
+        return {r["symbol"]: r for r in dataset_store.iter_records(path) if r.get("symbol")}
+    except (ValueError, OSError):
+        return {}
+
+
+def diff(previous, current):
+    """{symbol: {field: new value}} for changed fields; removed symbols map to None."""
+    changes = {}
+    for symbol, record in current.items():
+        old = previous.get(symbol)
+        changed = {k: v for k, v in record.items() if old is None or old.get(k) != v}
+        if changed:
+            changes[symbol] = changed
+    for symbol in previous.keys() - current.keys():
+        changes[symbol] = None
+    return changes
+
+
+@metrics.timed()
+def fetch_top_crypto(pages=CRYPTO_PAGES):
+    """Fetches top crypto assets from CoinGecko."""
+    print(f"Fetching top {pages * PER_PAGE} crypto from {COINGECKO_URL} ({pages} pages)...")
+    coins = fetch_pages(pages)
+    if not coins:
+        raise RuntimeError("No crypto data received from CoinGecko.")
 
-    # Save to file
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(cleaned_crypto, f, indent=4)
+    current = index_by_symbol(coins)
+    changes = diff(load_previous(), current)
+    if not changes:
+        print(f"✅ {len(current)} crypto assets unchanged, {OUTPUT_FILE} left as is")
+        return list(current.values())
 
-    print(f"✅ Saved {len(cleaned_crypto)} crypto assets to {OUTPUT_FILE}")
+    # Save to file (compact: thousands of rows); only the changed rows reach data/history
+    dataset_store.save(OUTPUT_FILE, list(current.values()), indent=None)
+    collisions = sum(1 for r in current.values() if r["collisions"])
+    print(f"✅ Saved {len(current)} crypto assets to {OUTPUT_FILE} "
+          f"({len(changes)} changed, {collisions} symbols with collisions)")
+    return list(current.values())
 
 
 if __name__ == "__main__":
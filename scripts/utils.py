@@ -1,8 +1,14 @@
-import yfinance as yf
+from price_store import default_store
+
 
 def safe_price(symbol: str) -> float | None:
+    """Latest close from the local price store; falls back to a live yfinance lookup."""
+    px = default_store().latest_price(symbol)
+    if px:
+        return px
     yf_symbol = symbol.replace('.', '-')  # Yahoo format
     try:
+        import yfinance as yf  # pulls in pandas; only paid when the store has no price
         t = yf.Ticker(yf_symbol)
         px = getattr(t, "fast_info", {}).get("last_price") if hasattr(t, "fast_info") else None
         if not px:
@@ -1,16 +1,38 @@
 #!/usr/bin/env python3
 # Emits a mock whale-driven recommendations file compatible with auto_trade.py
+# (also the synthetic trade generator behind benchmarks/fake_services.py)
 import json, time, random
 from pathlib import Path
 
 OUT = Path("data/gpt_recommendations.json")
 CANDS = ["AAPL","MSFT","NVDA","AMZN","META","TSLA"]
+DEXES = ["uniswap", "pancakeswap", "raydium", "curve"]
 
-def main():
+def mock_recommendations(symbols=CANDS, rng=random):
     ranked = []
-    for s in CANDS:
-        size = random.uniform(0, 1)  # pretend whale size -> score
+    for s in symbols:
+        size = rng.uniform(0, 1)  # pretend whale size -> score
         ranked.append({"symbol": s, "score": round(0.5 + size/2, 3), "reason": f"mock_whale size={size:.2f}"})
+    return ranked
+
+def mock_trades(symbols, n, rng=random, now=None):
+    """n Dexscreener-style trades (the /latest/dex/trades shape fetch_whales reads)."""
+    now = int(now or time.time())
+    trades = []
+    for i in range(n):
+        s = rng.choice(symbols)
+        trades.append({
+            "baseToken": {"symbol": s},
+            "type": "buy" if rng.random() < 0.6 else "sell",
+            "amountUsd": round(rng.lognormvariate(11, 1.5), 2),  # median ~$60k, long whale tail
+            "txHash": f"0x{rng.getrandbits(128):032x}",
+            "blockTimestamp": now - rng.randrange(24 * 3600),
+            "dex": {"name": rng.choice(DEXES)},
+        })
+    return trades
+
+def main():
+    ranked = mock_recommendations()
     payload = {"as_of": int(time.time()), "method":"mock_whale", "top": ranked}
     OUT.parent.mkdir(parents=True, exist_ok=True)
     OUT.write_text(json.dumps(payload, indent=2))
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Long-running whale-trade ingestion:
+- polls Dexscreener (or replays a local NDJSON/JSON feed) continuously
+- dedupes trades by txHash
+- keeps per-symbol rolling-window buy/sell counts and USD flow
+- periodically publishes the current signals to data/whale_signals.json,
+  which gpt_rank_stocks.fetch_whale_signals reads instead of re-fetching
+
+Memory is bounded: each symbol holds a fixed ring of time buckets, and both the
+txHash set and the symbol table are LRU-capped.
+"""
+import argparse
+import json
+import os
+import time
+from collections import OrderedDict
+
+SIGNALS_FILE = os.getenv("WHALE_SIGNALS_FILE", "data/whale_signals.json")
+WINDOW_SECONDS = int(os.getenv("WHALE_WINDOW_SECONDS", str(24 * 3600)))
+BUCKETS = int(os.getenv("WHALE_BUCKETS", "96"))  # 15-minute buckets over 24h
+MAX_SYMBOLS = int(os.getenv("WHALE_MAX_SYMBOLS", "5000"))
+MAX_TX_HASHES = int(os.getenv("WHALE_MAX_TX_HASHES", "200000"))
+POLL_SECONDS = float(os.getenv("WHALE_POLL_SECONDS", "30"))
+FLUSH_SECONDS = float(os.getenv("WHALE_FLUSH_SECONDS", "60"))
+
+# Same heuristic as the one-shot Dexscreener check in gpt_rank_stocks
+MIN_FLOW_USD = 1_000_000
+DOMINANCE = 2.0
+BOOST = 0.3
+
+
+class RollingWindow:
+    """Buy/sell counts and USD flow over the last `window` seconds, in `buckets` slots.
+
+    Adding a trade is O(1); totals are kept incrementally and a slot is cleared
+    lazily the first time it is reused for a newer bucket.
+    """
+
+    __slots__ = ("bucket_seconds", "n", "head", "ids", "buys", "sells", "buy_usd", "sell_usd", "totals")
+
+    def __init__(self, window=WINDOW_SECONDS, buckets=BUCKETS):
+        self.bucket_seconds = max(window // buckets, 1)
+        self.n = buckets
+        self.head = -1  # newest bucket id seen
+        self.ids = [-1] * buckets
+        self.buys = [0] * buckets
+        self.sells = [0] * buckets
+        self.buy_usd = [0.0] * buckets
+        self.sell_usd = [0.0] * buckets
+        self.totals = [0, 0, 0.0, 0.0]  # buys, sells, buy_usd, sell_usd
+
+    def _slot(self, bucket_id):
+        slot = bucket_id % self.n
+        if self.ids[slot] != bucket_id:
+            t = self.totals
+            t[0] -= self.buys[slot]
+            t[1] -= self.sells[slot]
+            t[2] -= self.buy_usd[slot]
+            t[3] -= self.sell_usd[slot]
+            self.ids[slot] = bucket_id
+            self.buys[slot] = self.sells[slot] = 0
+            self.buy_usd[slot] = self.sell_usd[slot] = 0.0
+        return slot
+
+    def add(self, ts, side, usd):
+        bucket_id = int(ts // self.bucket_seconds)
+        if bucket_id <= self.head - self.n:
+            return  # already slid out of the window
+        self.head = max(self.head, bucket_id)
+        slot = self._slot(bucket_id)
+        if side == "buy":
+            self.buys[slot] += 1
+            self.buy_usd[slot] += usd
+            self.totals[0] += 1
+            self.totals[2] += usd
+        elif side == "sell":
+            self.sells[slot] += 1
+            self.sell_usd[slot] += usd
+            self.totals[1] += 1
+            self.totals[3] += usd
+
+    def expire(self, now):
+        """Drop buckets that have slid out of the window (O(buckets), done on read)."""
+        oldest = int(now // self.bucket_seconds) - self.n + 1
+        for slot in range(self.n):
+            if 0 <= self.ids[slot] < oldest:
+                self._slot(oldest + ((slot - oldest) % self.n))
+
+    def snapshot(self, now):
+        self.expire(now)
+        buys, sells, buy_usd, sell_usd = self.totals
+        return {"buys": buys, "sells": sells, "buy_usd": round(buy_usd, 2), "sell_usd": round(sell_usd, 2)}
+
+
+class WhaleAggregator:
+    """Deduped, per-symbol rolling aggregates over a stream of whale trades."""
+
+    def __init__(self, window=WINDOW_SECONDS, buckets=BUCKETS, max_symbols=MAX_SYMBOLS, max_tx=MAX_TX_HASHES):
+        self.window = window
+        self.buckets = buckets
+        self.max_symbols = max_symbols
+        self.max_tx = max_tx
+        self._seen = OrderedDict()
+        self._symbols = OrderedDict()
+        self.ingested = 0
+        self.duplicates = 0
+        self.latest_ts = None
+
+    def ingest(self, trade, now=None) -> bool:
+        """Add one trade (fetch_whales format). Returns False for duplicates/unusable rows."""
+        tx = trade.get("txHash")
+        if tx:
+            if tx in self._seen:
+                self.duplicates += 1
+                return False
+            self._seen[tx] = None
+            if len(self._seen) > self.max_tx:
+                self._seen.popitem(last=False)
+
+        symbol = trade.get("symbol")
+        side = (trade.get("side") or "").lower()
+        if not symbol or side not in ("buy", "sell"):
+            return False
+        try:
+            usd = float(trade.get("amountUSD") or 0)
+        except (TypeError, ValueError):
+            usd = 0.0
+        ts = trade.get("timestamp") or now or time.time()
+        ts = ts / 1000 if ts > 1e12 else ts  # Dexscreener block timestamps are in ms
+
+        window = self._symbols.get(symbol)
+        if window is None:
+            window = self._symbols[symbol] = RollingWindow(self.window, self.buckets)
+            if len(self._symbols) > self.max_symbols:
+                self._symbols.popitem(last=False)  # least recently traded symbol
+        else:
+            self._symbols.move_to_end(symbol)
+        window.add(ts, side, usd)
+        self.latest_ts = max(self.latest_ts or ts, ts)
+        self.ingested += 1
+        return True
+
+    def signals(self, now=None):
+        """Current {symbol: signal} in the shape rank_stocks expects (plus the raw aggregates)."""
+        now = now or time.time()
+        out = {}
+        for symbol, window in self._symbols.items():
+            agg = window.snapshot(now)
+            flow = agg["buy_usd"] + agg["sell_usd"]
+            if flow > MIN_FLOW_USD and agg["buys"] > agg["sells"] * DOMINANCE:
+                out[symbol] = {"signal": "whale_buy", "boost": BOOST, **agg}
+            elif flow > MIN_FLOW_USD and agg["sells"] > agg["buys"] * DOMINANCE:
+                out[symbol] = {"signal": "whale_sell", "boost": -BOOST, **agg}
+        return out
+
+
+def save_signals(signals, path=SIGNALS_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"updated_at": int(time.time()), "signals": signals}, f)
+    os.replace(tmp, path)
+
+
+def load_signals(path=SIGNALS_FILE, max_age=None):
+    """Published signals, or None if missing or older than `max_age` seconds."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if max_age is not None and time.time() - data.get("updated_at", 0) > max_age:
+        return None
+    return data.get("signals", {})
+
+
+def poll_source(interval=POLL_SECONDS):
+    """Yield batches of trades from Dexscreener forever.
+
+    A failed poll (network error, non-JSON body) is logged and retried with backoff
+    instead of ending the stream.
+    """
+    import requests
+    from fetch_whales import fetch_whale_trades
+    from ratelimit import backoff_delay
+    attempt = 0
+    while True:
+        try:
+            trades = fetch_whale_trades()
+        except (requests.RequestException, ValueError) as e:
+            delay = backoff_delay(attempt)
+            print(f"⚠️ Whale poll failed (attempt {attempt + 1}): {e}; retrying in {delay:.1f}s")
+            attempt += 1
+            time.sleep(delay)
+            continue
+        attempt = 0
+        yield trades
+        time.sleep(interval)
+
+
+def replay_source(path, batch_size=500):
+    """Yield batches of trades from a local NDJSON (one trade per line) or JSON array file."""
+    with open(path, "r") as f:
+        first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            trades = json.load(f)
+            for i in range(0, len(trades), batch_size):
+                yield trades[i:i + batch_size]
+            return
+        batch = []
+        for line in f:
+            line = line.strip()
+            if line:
+                batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def run(source, aggregator=None, flush_seconds=FLUSH_SECONDS, max_seconds=None, clock=None):
+    """Feed batches from `source` into the aggregator, publishing signals every `flush_seconds`."""
+    aggregator = aggregator or WhaleAggregator()
+    started = last_flush = time.time()
+    for batch in source:
+        for trade in batch:
+            aggregator.ingest(trade)
+        now = time.time()
+        if now - last_flush >= flush_seconds:
+            save_signals(aggregator.signals(clock() if clock else now))
+            last_flush = now
+        if max_seconds is not None and now - started >= max_seconds:
+            break
+    signals = aggregator.signals(clock() if clock else time.time())
+    save_signals(signals)
+    print(f"🐋 Ingested {aggregator.ingested} trades ({aggregator.duplicates} duplicates), "
+          f"{len(signals)} active signals → {SIGNALS_FILE}")
+    return aggregator
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", help="NDJSON/JSON trade file to replay instead of polling Dexscreener")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.replay:
+        print(f"🚀 Replaying whale trades from {args.replay}...")
+        agg = WhaleAggregator()
+        # Evaluate the window as of the last replayed trade, not wall-clock time
+        run(replay_source(args.replay), agg, clock=lambda: agg.latest_ts or time.time())
+    else:
+        print("🚀 Streaming whale trades from Dexscreener...")
+        run(poll_source(args.interval), max_seconds=args.max_seconds)
+
+
+if __name__ == "__main__":
+    main()
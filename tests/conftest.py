@@ -0,0 +1,5 @@
+"""The scripts are run as top-level modules from scripts/ (no package), so import them the same way."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
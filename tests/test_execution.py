@@ -0,0 +1,48 @@
+from broker_mock import MockBroker
+from execution import ExecutionEngine
+from portfolio import Order
+
+
+def run(broker, orders, cycle):
+    engine = ExecutionEngine(broker, workers=2)
+    try:
+        engine.snapshot()
+        tracked = engine.submit(orders, cycle=cycle)
+        assert engine.wait(tracked, timeout=5)
+        return engine, tracked
+    finally:
+        engine.close(timeout=5)
+
+
+def test_fills_are_applied_to_the_book():
+    broker = MockBroker(cash=10_000)
+    engine, tracked = run(broker, [Order("AAA", "buy", 10, price=50.0)], cycle="c1")
+    assert [t.status for t in tracked] == ["filled"]
+    assert engine.positions == {"AAA": 10.0}
+    assert engine.cash == broker.cash == 9_500
+
+
+def test_restart_with_an_already_filled_order_does_not_count_it_twice():
+    broker = MockBroker(cash=10_000)
+    order = Order("AAA", "buy", 10, price=50.0)
+    run(broker, [order], cycle="c1")
+
+    engine, tracked = run(broker, [order], cycle="c1")  # a restarted run re-derives the same id
+    assert [(t.status, t.filled_qty) for t in tracked] == [("filled", 10.0)]
+    assert len(broker.orders) == 1
+    assert engine.positions == {"AAA": 10.0}
+    assert engine.cash == broker.cash == 9_500
+
+
+def test_same_order_in_one_run_is_sent_once():
+    broker = MockBroker(cash=10_000)
+    engine = ExecutionEngine(broker, workers=2)
+    try:
+        engine.snapshot()
+        first = engine.submit([Order("AAA", "buy", 10, price=50.0)], cycle="c1")
+        again = engine.submit([Order("AAA", "buy", 12, price=50.0)], cycle="c1")
+        assert engine.wait(first + again, timeout=5)
+    finally:
+        engine.close(timeout=5)
+    assert first[0] is again[0]
+    assert len(broker.orders) == 1
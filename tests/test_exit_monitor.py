@@ -0,0 +1,83 @@
+from exit_monitor import Lot, TriggerIndex, lot_for
+from policy_engine import PolicyParams
+
+
+def lot(id, symbol="AAA", entry=100.0, stop=95.0, target=110.0, trail_pct=0.0):
+    return Lot(id, symbol, 1, entry, stop, target, trail_pct)
+
+
+def fired(index, symbol, price):
+    return [(l.id, reason, round(level, 6)) for l, reason, level in index.tick(symbol, price)]
+
+
+def test_stop_fires_at_or_below_its_level():
+    index = TriggerIndex()
+    index.add(lot("a"))
+    assert fired(index, "AAA", 95.01) == []
+    assert fired(index, "AAA", 95.0) == [("a", "stop_loss", 95.0)]
+    assert len(index) == 0 and "a" not in index
+
+
+def test_target_fires():
+    index = TriggerIndex()
+    index.add(lot("a"))
+    index.add(lot("b", target=120.0))
+    assert fired(index, "AAA", 112.0) == [("a", "take_profit", 110.0)]
+    assert "b" in index
+
+
+def test_trailing_stop_rises_then_fires():
+    index = TriggerIndex(trail_step=0)
+    index.add(lot("a", stop=None, target=None, trail_pct=0.1))
+    assert fired(index, "AAA", 120.0) == []
+    assert fired(index, "AAA", 108.5) == []
+    assert fired(index, "AAA", 107.9) == [("a", "trailing_stop", 108.0)]
+
+
+def test_trailing_stop_above_the_fixed_stop_is_reported_as_trailing():
+    index = TriggerIndex(trail_step=0)
+    index.add(lot("a", stop=95.0, target=None, trail_pct=0.05))
+    index.tick("AAA", 100.0)
+    assert fired(index, "AAA", 94.0) == [("a", "stop_loss", 95.0)]
+    index.add(lot("b", stop=95.0, target=None, trail_pct=0.05))
+    index.tick("AAA", 110.0)
+    assert fired(index, "AAA", 104.0) == [("b", "trailing_stop", 104.5)]
+
+
+def test_removed_lots_never_fire():
+    index = TriggerIndex()
+    index.add(lot("a"))
+    index.add(lot("b", stop=90.0))
+    assert index.remove("a").id == "a"
+    assert index.remove("a") is None
+    assert fired(index, "AAA", 94.0) == []
+    assert fired(index, "AAA", 89.0) == [("b", "stop_loss", 90.0)]
+    assert index.symbols() == []
+
+
+def test_symbols_are_isolated():
+    index = TriggerIndex()
+    index.add(lot("a", symbol="AAA"))
+    index.add(lot("b", symbol="BBB", entry=10.0, stop=9.0, target=11.0))
+    assert fired(index, "BBB", 50.0) == [("b", "take_profit", 11.0)]
+    assert fired(index, "ZZZ", 1.0) == []
+    assert index.symbols() == ["AAA"]
+
+
+def test_superseded_trailing_entries_are_skipped():
+    index = TriggerIndex(trail_step=0)
+    index.add(lot("a", stop=None, target=None, trail_pct=0.1))
+    for price in range(101, 200):
+        index.tick("AAA", float(price))
+    assert len(index._stops["AAA"]) < 20  # compacted as it went
+    assert fired(index, "AAA", 179.0) == [("a", "trailing_stop", 179.1)]
+    assert index.tick("AAA", 1.0) == []
+
+
+def test_lot_for_leaves_out_zero_percentage_levels():
+    params = PolicyParams(stop_loss_pct=0.0, take_profit_pct=0.0, trailing_stop_pct=0.05)
+    l = lot_for("AAA", 3, 100.0, params)
+    assert (l.stop, l.target, l.trail_pct) == (None, None, 0.05)
+    assert l.stop_level() == 95.0
+    l = lot_for("AAA", 3, 100.0, PolicyParams(stop_loss_pct=0.05, take_profit_pct=0.1, trailing_stop_pct=0.0))
+    assert (round(l.stop, 6), round(l.target, 6)) == (95.0, 110.0)
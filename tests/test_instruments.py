@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import instruments
+from instruments import InstrumentRegistry, canonical, rec_kind
+
+
+@pytest.mark.parametrize("raw, kind, expected", [
+    ("BRK-B", None, "BRK.B"),
+    ("brk.b", None, "BRK.B"),
+    ("BRK/B", None, "BRK.B"),
+    (" aapl ", "stock", "AAPL"),
+    ("BTC-USD", None, "BTC"),
+    ("BTC/USDT", "crypto", "BTC"),
+    ("$WETH", None, "WETH"),
+    ("WETH", "stock", "WETH"),
+    ("WETH", "crypto", "ETH"),
+    ("wbtc", "whale", "BTC"),
+    (None, None, ""),
+])
+def test_canonical(raw, kind, expected):
+    assert canonical(raw, kind) == expected
+
+
+def registry():
+    reg = InstrumentRegistry()
+    reg.add("stock", {"symbol": np.array(["ETH", "BRK-B", "AAPL"]), "price": np.array([30.0, 400.0, np.nan])})
+    reg.add("crypto", {"symbol": ["WETH", "BTC"], "current_price": [3000.0, 60000.0]})
+    return reg
+
+
+def test_price_is_looked_up_in_the_requested_kind():
+    reg = registry()
+    assert reg.price("ETH", "stock") == 30.0
+    assert reg.price("ETH", "crypto") == 3000.0
+    assert reg.price("WETH", "crypto") == 3000.0
+    assert reg.price("WETH", "stock") is None
+    assert reg.price("ETH") == 30.0  # no kind: stocks first
+    assert reg.price("BTC-USD") == 60000.0
+    assert reg.price("AAPL") is None  # NaN price
+
+
+def test_lookup_and_join():
+    reg = registry()
+    assert reg.lookup("brk.b") == ("stock", 1)
+    assert reg.kinds("ETH") == ("stock", "crypto")
+    assert "BTC" in reg and "DOGE" not in reg
+    assert reg.join(["BTC", "DOGE", "WETH"], "crypto").tolist() == [1, -1, 0]
+
+
+@pytest.mark.parametrize("rec, expected", [
+    ({"symbol": "ETH", "kind": "crypto"}, "crypto"),
+    ({"symbol": "ETH", "market": "Stocks"}, "stock"),
+    ({"symbol": "ETH", "kind": "token"}, "crypto"),
+    ({"symbol": "BTC-USD"}, "crypto"),
+    ({"symbol": "AAPL"}, None),
+])
+def test_rec_kind(rec, expected):
+    assert rec_kind(rec) == expected
+
+
+def test_canonical_keys_keeps_the_first_on_a_clash():
+    assert instruments.canonical_keys({"BRK-B": 1, "brk.b": 2, "WETH": 3}) == {"BRK.B": 1, "WETH": 3}
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import dataset_store
+from merge_recommendations import merge
+
+
+@pytest.fixture
+def sources(tmp_path):
+    def write(name, records):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps(records))
+        return f"{name}={path}"
+    return write
+
+
+def merged(tmp_path, rule, *inputs, **kwargs):
+    out = tmp_path / "merged.json"
+    merge(list(inputs), str(out), rule=rule, **kwargs)
+    return {r["symbol"]: (r["score"], r.get("reason"), r["sources"]) for r in dataset_store.load_records(out)}
+
+
+def test_priority_takes_the_first_source_that_scored_the_symbol(sources, tmp_path):
+    gpt = sources("gpt", [{"symbol": "AAA", "score": 0.6, "reason": "gpt"},
+                          {"symbol": "BBB", "score": None, "reason": "gpt"},
+                          {"symbol": "CCC", "score": None, "reason": "gpt"}])
+    whale = sources("whale", [{"symbol": "AAA", "score": 0.9, "reason": "whale"},
+                              {"symbol": "BBB", "score": 0.8, "reason": "whale"}])
+    assert merged(tmp_path, "priority", gpt, whale) == {
+        "AAA": (0.6, "gpt", ["gpt", "whale"]),
+        "BBB": (0.8, "whale", ["gpt", "whale"]),  # gpt's null score defers to whale
+        "CCC": (None, "gpt", ["gpt"]),
+    }
+
+
+def test_max_and_mean(sources, tmp_path):
+    a = sources("a", [{"symbol": "AAA", "score": 0.6, "reason": "a"}, {"symbol": "BBB", "score": None}])
+    b = sources("b", [{"symbol": "AAA", "score": 0.9, "reason": "b"}, {"symbol": "BBB", "score": 0.4}])
+    assert merged(tmp_path, "max", a, b) == {"AAA": (0.9, "b", ["a", "b"]),
+                                                      "BBB": (0.4, None, ["a", "b"])}
+    mean = merged(tmp_path, "mean", a, b, weights={"b": 3})
+    assert mean["AAA"][0] == pytest.approx(0.825) and mean["BBB"][0] == 0.4
+
+
+def test_top_keeps_the_best_symbols(sources, tmp_path):
+    a = sources("a", [{"symbol": s, "score": v} for s, v in [("A", 0.1), ("B", 0.9), ("C", 0.5), ("D", None)]])
+    assert list(merged(tmp_path, "max", a, top=2)) == ["B", "C"]
@@ -0,0 +1,86 @@
+import pytest
+
+from pipeline import PIPELINES, Pipeline, Stage
+
+WRITE = """import sys
+import helper
+with open(sys.argv[1], "w") as f:
+    f.write(helper.TEXT)
+with open("runs.log", "a") as f:
+    f.write(sys.argv[1] + "\\n")
+"""
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "write.py").write_text(WRITE)
+    (tmp_path / "helper.py").write_text('TEXT = "v1"\n')
+    (tmp_path / "fail.py").write_text("raise SystemExit(3)\n")
+    return tmp_path
+
+
+def runs(workdir):
+    log = workdir / "runs.log"
+    return log.read_text().split() if log.exists() else []
+
+
+def two_stages():
+    return [Stage("a", ["write.py", "a.txt"], outputs=("a.txt",)),
+            Stage("b", ["write.py", "b.txt"], inputs=("a.txt",), outputs=("b.txt",))]
+
+
+def test_deps_come_from_inputs_outputs_and_after():
+    pipeline = Pipeline([Stage("a", ["x.py"], outputs=("a.txt",)),
+                         Stage("b", ["x.py"], inputs=("a.txt", "elsewhere.txt"), outputs=("b.txt",)),
+                         Stage("c", ["x.py"], after=("a",))])
+    assert pipeline.deps == {"a": set(), "b": {"a"}, "c": {"a"}}
+
+
+def test_unchanged_stages_are_skipped(workdir):
+    assert Pipeline(two_stages(), state_file="state.json").run()
+    assert sorted(runs(workdir)) == ["a.txt", "b.txt"]
+
+    pipeline = Pipeline(two_stages(), state_file="state.json")
+    assert pipeline.run()
+    assert [s.status for s in pipeline.stages.values()] == ["skipped", "skipped"]
+    assert len(runs(workdir)) == 2
+
+
+def test_changed_helper_module_reruns(workdir):
+    Pipeline(two_stages(), state_file="state.json").run()
+    (workdir / "helper.py").write_text('TEXT = "v2"\n')
+    pipeline = Pipeline(two_stages(), state_file="state.json")
+    assert pipeline.run()
+    assert [s.status for s in pipeline.stages.values()] == ["ran", "ran"]
+    assert (workdir / "b.txt").read_text() == "v2"
+
+
+def test_deleted_output_reruns_its_stage(workdir):
+    Pipeline(two_stages(), state_file="state.json").run()
+    (workdir / "b.txt").unlink()
+    pipeline = Pipeline(two_stages(), state_file="state.json")
+    pipeline.run()
+    assert [s.status for s in pipeline.stages.values()] == ["skipped", "ran"]
+
+
+def test_failed_stage_blocks_dependents(workdir):
+    pipeline = Pipeline([Stage("a", ["fail.py"], outputs=("a.txt",)),
+                         Stage("b", ["write.py", "b.txt"], inputs=("a.txt",)),
+                         Stage("c", ["write.py", "c.txt"])], state_file="state.json")
+    assert not pipeline.run()
+    assert [s.status for s in pipeline.stages.values()] == ["failed", "blocked", "ran"]
+
+
+def test_optional_failure_does_not_block(workdir):
+    pipeline = Pipeline([Stage("a", ["fail.py"], optional=True),
+                         Stage("b", ["write.py", "b.txt"], after=("a",))], state_file="state.json")
+    assert pipeline.run()
+    assert [s.status for s in pipeline.stages.values()] == ["failed", "ran"]
+
+
+@pytest.mark.parametrize("name", sorted(PIPELINES))
+def test_every_declared_input_is_produced_upstream(name):
+    stages = PIPELINES[name]()
+    produced = {out for s in stages for out in s.outputs}
+    assert [(s.name, i) for s in stages for i in s.inputs if i not in produced] == []
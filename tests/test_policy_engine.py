@@ -0,0 +1,66 @@
+import math
+import random
+
+import pytest
+
+from policy_engine import PolicyParams, decide, decide_batch
+
+PARAMS = PolicyParams(max_portfolio_size=5, max_position_usd=1000, min_confidence=0.7,
+                      exit_below_confidence=0.5, stop_loss_pct=0.05, take_profit_pct=0.1)
+
+
+def reference(tickers, scores, prices, active, cash, params):
+    """decide() one ticker at a time: held tickers first, then entries best score first."""
+    active = dict(active)
+    actions, qty = {}, {}
+    for t, s in zip(tickers, scores):
+        if t in active:
+            actions[t] = decide(t, s, None, active, cash, params).action
+    for t in actions:
+        if actions[t] == "exit":
+            del active[t]
+    rest = [(t, s, p) for t, s, p in zip(tickers, scores, prices) if t not in actions]
+    rest.sort(key=lambda r: -r[1] if r[1] is not None else math.inf)
+    for t, s, p in rest:
+        actions[t] = "skip"
+        if len(active) >= params.max_portfolio_size or s is None or s < params.min_confidence or not p:
+            continue
+        d = decide(t, s, p, active, cash, params)
+        if d.action == "buy" and d.qty * p <= cash:
+            actions[t], qty[t] = "buy", d.qty
+            active[t] = object()
+            cash -= d.qty * p
+    return actions, qty, cash
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_decide_batch_matches_decide(seed):
+    rng = random.Random(seed)
+    tickers = [f"T{i}" for i in range(rng.randint(0, 15))]
+    scores = [None if rng.random() < 0.1 else round(rng.random(), 2) for _ in tickers]
+    prices = [None if rng.random() < 0.1 else round(rng.uniform(1, 800), 2) for _ in tickers]
+    active = {t: object() for t in tickers if rng.random() < 0.3}
+    active.update({f"OTHER{i}": object() for i in range(rng.randint(0, 2))})
+    cash = rng.choice([0.0, 50.0, 2500.0, 20000.0])
+
+    batch = decide_batch(tickers, scores, prices, active, cash, PARAMS)
+    actions, qty, cash_left = reference(tickers, scores, prices, active, cash, PARAMS)
+
+    assert [d.action for d in batch] == [actions[t] for t in tickers]
+    assert [int(q) for q in batch.qty] == [qty.get(t, 0) for t in tickers]
+    assert batch.cash_left == pytest.approx(cash_left)
+
+
+def test_buys_come_best_score_first_and_stop_when_full():
+    params = PolicyParams(max_portfolio_size=2, max_position_usd=100, min_confidence=0.7,
+                          exit_below_confidence=0.5)
+    batch = decide_batch(["A", "B", "C", "D"], [0.8, 0.95, 0.3, 0.9], [10, 10, 10, 10], {"C": 1}, 10000, params)
+    assert [batch.tickers[i] for i in batch.buys()] == ["B", "D"]
+    assert [batch.tickers[i] for i in batch.exits()] == ["C"]
+    assert batch[0].action == "skip" and batch[0].reason == "portfolio full (2/2)"
+    assert batch[1].qty == 10
+
+
+def test_missing_price_skips_the_entry():
+    batch = decide_batch(["A"], [0.9], [None], {}, 1000, PARAMS)
+    assert batch[0].action == "skip" and batch[0].reason == "no price"
@@ -0,0 +1,74 @@
+import pytest
+
+import ratelimit
+from ratelimit import TokenBucket, backoff_delay, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+
+def test_bucket_starts_full_and_drains(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_bucket_refills_at_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    while bucket.try_acquire():
+        pass
+    clock.now += 0.5  # one token at 2/s
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now += 60
+    assert sum(bucket.try_acquire() for _ in range(10)) == 3
+
+
+def test_per_minute_defaults_burst_to_the_minute_budget(clock):
+    bucket = TokenBucket.per_minute(5)
+    assert bucket.rate == pytest.approx(5 / 60)
+    assert sum(bucket.try_acquire() for _ in range(10)) == 5
+
+
+def test_acquire_sleeps_for_the_missing_tokens(clock, monkeypatch):
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(ratelimit.time, "sleep", sleep)
+    bucket = TokenBucket(rate=4, capacity=1)
+    bucket.acquire()
+    bucket.acquire()
+    assert slept == [pytest.approx(0.25)]
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_backoff_is_capped():
+    assert all(0 <= backoff_delay(attempt, base=1, cap=5) <= 5 for attempt in range(20))
+
+
+def test_retry_after_parses_numeric_header():
+    class Response:
+        def __init__(self, headers):
+            self.headers = headers
+
+    assert retry_after_seconds(Response({"Retry-After": "7"})) == 7.0
+    assert retry_after_seconds(Response({"Retry-After": "soon"}), default=1.5) == 1.5
+    assert retry_after_seconds(Response({}), default=None) is None
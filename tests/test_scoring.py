@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import scoring
+
+
+def test_join_signals_matches_a_dict_lookup():
+    signals = {"NVDA": {"boost": 0.2}, "AAPL": {"boost": 0.1}, "ZZZ": {"boost": 0.5}}
+    symbols = ["AAPL", "MSFT", "NVDA", "", "AAPL"]
+    boosts, idx = scoring.join_signals(symbols, signals)
+    assert boosts.tolist() == [0.1, 0.0, 0.2, 0.0, 0.1]
+    keys = list(signals)
+    assert [keys[i] if i >= 0 else None for i in idx.tolist()] == ["AAPL", None, "NVDA", None, "AAPL"]
+
+
+def test_join_signals_without_signals():
+    boosts, idx = scoring.join_signals(["A", "B"], {})
+    assert boosts.tolist() == [0.0, 0.0]
+    assert idx.tolist() == [-1, -1]
+
+
+def test_top_n_orders_best_first_with_ties_in_input_order():
+    scores = np.array([0.5, 0.9, 0.5, 0.1, 0.9])
+    assert scoring.top_n(scores, 3).tolist() == [1, 4, 0]
+    assert scoring.top_n(scores, 10).tolist() == [1, 4, 0, 2, 3]
+    assert scoring.top_n(scores, 0).tolist() == []
+
+
+def test_top_n_only_picks_eligible_rows():
+    scores = np.array([0.5, 0.9, 0.7, 0.8])
+    eligible = np.array([True, False, True, True])
+    assert scoring.top_n(scores, 2, eligible).tolist() == [3, 2]
+
+
+def test_top_n_matches_a_full_sort():
+    rng = np.random.default_rng(3)
+    scores = np.round(rng.random(1000), 2)  # plenty of ties
+    expected = sorted(range(len(scores)), key=lambda i: (-scores[i], i))[:50]
+    assert scoring.top_n(scores, 50).tolist() == expected
+
+
+def test_score_skips_rows_missing_required_columns():
+    cols = {"symbol": ["A", "B", "C"], "price": [10.0, None, 5.0], "marketCap": [4e9, 9e9, None]}
+    total, eligible = scoring.score(cols, {"A": {"boost": 0.3}}, {"market_cap": 1, "whale": 1})
+    assert eligible.tolist() == [True, False, False]
+    assert total[0] == pytest.approx(2.0 + 0.3)
+
+
+def test_parse_weights_rejects_unknown_factors():
+    assert scoring.parse_weights("market_cap:2,whale") == {"market_cap": 2.0, "whale": 1.0}
+    with pytest.raises(ValueError):
+        scoring.parse_weights("vibes:1")
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from snapshot_store import SnapshotStore, apply, diff
+
+
+def random_state(rng):
+    keys = rng.sample([f"S{i}" for i in range(30)], rng.randint(0, 20))
+    return {k: {"symbol": k, "price": rng.choice([1.0, 2.0, 3.0])} for k in keys}
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_apply_diff_round_trips(seed):
+    rng = random.Random(seed)
+    old, new = random_state(rng), random_state(rng)
+    if rng.random() < 0.3:  # same rows, shuffled
+        keys = list(old)
+        rng.shuffle(keys)
+        new = {k: old[k] for k in keys}
+    rebuilt = apply(dict(old), diff(old, new), "symbol")
+    assert list(rebuilt.items()) == list(new.items())
+
+
+def test_diff_only_records_the_order_when_it_changed():
+    old = {"A": {"symbol": "A"}, "B": {"symbol": "B"}}
+    assert diff(old, {**old, "C": {"symbol": "C"}})["order"] is None
+    assert diff(old, {"B": old["B"], "A": old["A"]})["order"] == ["B", "A"]
+
+
+def rows(*pairs):
+    return [{"symbol": s, "price": p} for s, p in pairs]
+
+
+def test_record_and_read_back_across_full_and_delta_snapshots(tmp_path):
+    store = SnapshotStore("stocks", directory=tmp_path, full_every=3)
+    history = [
+        rows(("A", 1), ("B", 2)),
+        rows(("A", 1), ("B", 3), ("C", 4)),
+        rows(("C", 4), ("A", 1)),
+        rows(("C", 5), ("A", 1), ("D", 6)),
+        rows(("D", 6)),
+    ]
+    for ts, snapshot in enumerate(history, start=1):
+        assert store.record(snapshot, ts=ts) is not None
+    assert [e["kind"] for e in store.entries()] == ["full", "delta", "delta", "full", "delta"]
+
+    reopened = SnapshotStore("stocks", directory=tmp_path, full_every=3)
+    for ts, snapshot in enumerate(history, start=1):
+        assert reopened.at(ts + 0.5) == snapshot
+    assert reopened.at(0.5) is None
+    assert reopened.at() == history[-1]
+    assert list(reopened.range(2, 4)) == [(2, history[1]), (3, history[2]), (4, history[3])]
+
+
+def test_unchanged_rows_are_not_recorded(tmp_path):
+    store = SnapshotStore("stocks", directory=tmp_path)
+    assert store.record(rows(("A", 1)), ts=1) is not None
+    assert store.record(rows(("A", 1)), ts=2) is None
+    assert len(store.entries()) == 1
+
+
+def test_unkeyed_rows_are_stored_in_full(tmp_path):
+    store = SnapshotStore("stocks", directory=tmp_path)
+    store.record(rows(("A", 1)), ts=1)
+    dupes = rows(("A", 1), ("A", 2)) + [{"price": 3}]
+    assert store.record(dupes, ts=2)["kind"] == "full"
+    store.record(rows(("A", 2)), ts=3)
+    reopened = SnapshotStore("stocks", directory=tmp_path)
+    assert reopened.at(2) == dupes
+    assert [e["kind"] for e in reopened.entries()] == ["full", "full", "full"]
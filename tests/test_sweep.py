@@ -0,0 +1,40 @@
+import sys
+
+import pytest
+
+import sweep
+
+
+def test_parse_grid_casts_to_the_field_types():
+    grid = sweep.parse_grid(["min_confidence=0.6,0.7", "max_portfolio_size=3,5,"])
+    assert grid == {"min_confidence": [0.6, 0.7], "max_portfolio_size": [3, 5]}
+    assert all(isinstance(v, int) for v in grid["max_portfolio_size"])
+
+
+def test_parse_grid_rejects_unknown_parameters():
+    with pytest.raises(SystemExit):
+        sweep.parse_grid(["nope=1,2"])
+
+
+def test_grid_combinations_is_the_cartesian_product():
+    combos = list(sweep.grid_combinations({"min_confidence": [0.6, 0.7], "stop_loss_pct": [0.03, 0.05, 0.1]}))
+    assert len(combos) == 6
+    assert {"min_confidence": 0.7, "stop_loss_pct": 0.1} in combos
+
+
+def test_parse_ranges():
+    assert sweep.parse_ranges(["min_confidence=0.5:0.9"]) == {"min_confidence": (0.5, 0.9)}
+
+
+def test_random_combinations_stay_in_range_and_are_seeded():
+    ranges = {"min_confidence": (0.5, 0.9), "max_portfolio_size": (2, 8)}
+    a = list(sweep.random_combinations(ranges, 20, seed=1))
+    assert a == list(sweep.random_combinations(ranges, 20, seed=1))
+    assert all(0.5 <= c["min_confidence"] <= 0.9 and 2 <= c["max_portfolio_size"] <= 8 for c in a)
+
+
+@pytest.mark.parametrize("argv", [[], ["--random", "5"], ["--grid"]])
+def test_nothing_to_sweep_exits(monkeypatch, argv):
+    monkeypatch.setattr(sys, "argv", ["sweep.py", "--recs-dir", "x", "--bars", "y", *argv])
+    with pytest.raises(SystemExit, match="Nothing to sweep"):
+        sweep.main()
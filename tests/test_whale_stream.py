@@ -0,0 +1,84 @@
+import random
+
+from whale_stream import RollingWindow, WhaleAggregator
+
+
+def brute_force(trades, now, window):
+    """Totals over trades whose bucket is still inside the window (what RollingWindow approximates)."""
+    bucket_seconds = max(window.bucket_seconds, 1)
+    oldest = int(now // bucket_seconds) - window.n + 1
+    live = [t for t in trades if int(t[0] // bucket_seconds) >= oldest]
+    return {"buys": sum(1 for t in live if t[1] == "buy"),
+            "sells": sum(1 for t in live if t[1] == "sell"),
+            "buy_usd": round(sum(t[2] for t in live if t[1] == "buy"), 2),
+            "sell_usd": round(sum(t[2] for t in live if t[1] == "sell"), 2)}
+
+
+def test_window_counts_and_flows():
+    w = RollingWindow(window=3600, buckets=4)
+    w.add(100, "buy", 10.0)
+    w.add(200, "buy", 5.0)
+    w.add(300, "sell", 2.5)
+    assert w.snapshot(300) == {"buys": 2, "sells": 1, "buy_usd": 15.0, "sell_usd": 2.5}
+
+
+def test_window_expires_old_buckets_on_read():
+    w = RollingWindow(window=3600, buckets=4)  # 900s buckets
+    w.add(0, "buy", 1.0)
+    w.add(1000, "sell", 2.0)
+    assert w.snapshot(3599)["buys"] == 1
+    assert w.snapshot(3600) == {"buys": 0, "sells": 1, "buy_usd": 0.0, "sell_usd": 2.0}
+    assert w.snapshot(10_000) == {"buys": 0, "sells": 0, "buy_usd": 0.0, "sell_usd": 0.0}
+
+
+def test_window_ignores_trades_older_than_the_window():
+    w = RollingWindow(window=3600, buckets=4)
+    w.add(10_000, "buy", 1.0)
+    w.add(100, "buy", 50.0)  # slid out long ago
+    assert w.snapshot(10_000)["buy_usd"] == 1.0
+
+
+def test_window_matches_brute_force_on_random_streams():
+    rng = random.Random(5)
+    w = RollingWindow(window=3600, buckets=12)
+    trades, now = [], 0
+    for _ in range(5000):
+        now += rng.randrange(0, 120)
+        ts = now - rng.randrange(0, 600)  # some out-of-order arrivals
+        trade = (ts, rng.choice(("buy", "sell")), round(rng.uniform(1, 1000), 2))
+        if int(ts // w.bucket_seconds) > w.head - w.n:
+            trades.append(trade)
+        w.add(*trade)
+        if rng.random() < 0.05:
+            assert w.snapshot(now) == brute_force(trades, now, w)
+
+
+def test_aggregator_dedupes_by_tx_hash_and_flags_whale_buys():
+    agg = WhaleAggregator(window=3600, buckets=4)
+    trade = {"txHash": "0x1", "symbol": "PEPE", "side": "buy", "amountUSD": 2_000_000, "timestamp": 1000}
+    assert agg.ingest(trade)
+    assert not agg.ingest(trade)
+    assert agg.duplicates == 1
+    assert not agg.ingest({"txHash": "0x2", "symbol": "PEPE", "side": "transfer", "timestamp": 1000})
+    assert agg.signals(now=1000)["PEPE"]["signal"] == "whale_buy"
+
+
+def test_poll_source_survives_failed_polls(monkeypatch):
+    import requests
+
+    import fetch_whales
+    import whale_stream
+
+    results = [requests.ConnectionError("down"), ValueError("not json"), [{"txHash": "a"}]]
+
+    def fetch():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    sleeps = []
+    monkeypatch.setattr(fetch_whales, "fetch_whale_trades", fetch)
+    monkeypatch.setattr(whale_stream.time, "sleep", sleeps.append)
+    assert next(whale_stream.poll_source(interval=30)) == [{"txHash": "a"}]
+    assert len(sleeps) == 2 and all(0 <= s <= 2 for s in sleeps)